@@ -0,0 +1,16 @@
+# "xlwings" drives a running Excel over COM; "openpyxl" works on the files
+# directly and needs no Excel (e.g. on the Linux merge servers).
+ENGINES = ("xlwings", "openpyxl")
+
+
+def open_workbook(path, engine="xlwings", data_only=False):
+    """Opens a workbook through the backend for the given engine."""
+    if engine == "openpyxl":
+        from backends.openpyxl_backend import open_workbook as open_file_workbook
+
+        return open_file_workbook(path, data_only=data_only)
+    if engine == "xlwings":
+        from backends.xlwings_backend import open_workbook as open_excel_workbook
+
+        return open_excel_workbook(path, data_only=data_only)
+    raise ValueError(f"Unknown merge engine '{engine}', expected one of {ENGINES}")
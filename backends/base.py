@@ -0,0 +1,94 @@
+"""
+The narrow workbook interface the merge logic in handlers/handler_base.py is
+written against. Cells are addressed by 1-based (row, col) integers and
+colours are Excel BGR ints, the way COM reports them.
+
+Implementations:
+- backends.xlwings_backend: a running Excel over COM
+- backends.openpyxl_backend: workbook files on disk, no Excel required
+- backends.memory_backend: plain dicts, for timing handler logic in isolation
+"""
+
+from typing import List, Optional, Protocol, Tuple
+
+# What Excel reports as Interior.Color for a cell with no fill
+EXCEL_NO_FILL = 0xFFFFFF
+
+
+class SheetBackend(Protocol):
+    name: str
+
+    def get_value(self, row: int, col: int):
+        """Returns the cell value (formula cells yield their cached result)."""
+
+    def set_value(self, row: int, col: int, value) -> None:
+        ...
+
+    def read_block(
+        self, min_row: int, min_col: int, max_row: int, max_col: int
+    ) -> List[List]:
+        """Returns the values of a rectangle in one read, as a list of rows."""
+
+    def write_block(self, min_row: int, min_col: int, rows: List[List]) -> None:
+        """Writes a list of rows into the rectangle starting at (min_row, min_col)."""
+
+    def get_format(self, row: int, col: int) -> Tuple:
+        """Returns (bold, font_color, display_fill) as raw Excel values."""
+
+    def get_fill(self, row: int, col: int):
+        """Returns the static (non-conditional) Interior.Color of the cell."""
+
+    def set_font(self, row: int, col: int, bold=None, color=None) -> None:
+        """Sets font bold/colour; arguments left as None are not touched."""
+
+    def set_fill(self, row: int, col: int, color: int) -> None:
+        ...
+
+    def set_font_block(
+        self,
+        min_row: int,
+        min_col: int,
+        max_row: int,
+        max_col: int,
+        bold=None,
+        color=None,
+    ) -> None:
+        """set_font applied to a whole rectangle in one operation."""
+
+    def set_fill_block(
+        self, min_row: int, min_col: int, max_row: int, max_col: int, color: int
+    ) -> None:
+        """set_fill applied to a whole rectangle in one operation."""
+
+    def set_comment(self, row: int, col: int, text: str) -> None:
+        """Replaces any existing comment on the cell with text."""
+
+    def hide_column(self, col: int) -> None:
+        ...
+
+
+class WorkbookBackend(Protocol):
+    name: str
+
+    @property
+    def sheet_names(self) -> List[str]:
+        ...
+
+    def sheet(self, name: str) -> SheetBackend:
+        ...
+
+    def add_sheet(self, name: str) -> SheetBackend:
+        ...
+
+    def save(self) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+def get_sheet(wb: WorkbookBackend, name: str) -> Optional[SheetBackend]:
+    """Returns the named sheet, or None if the workbook does not have it."""
+    if name in wb.sheet_names:
+        return wb.sheet(name)
+    return None
@@ -0,0 +1,109 @@
+"""
+Pure in-memory workbook backend.
+
+Cells live in dicts keyed by (row, col), so the real handler logic can be run
+and timed without Excel or file I/O. Cell keys may also be given as A1
+addresses when constructing a sheet.
+"""
+
+from backends.base import EXCEL_NO_FILL
+from utils.cell_refs import parse_address
+
+
+def _key(ref):
+    return parse_address(ref) if isinstance(ref, str) else tuple(ref)
+
+
+def _keyed(mapping):
+    return {_key(ref): val for ref, val in (mapping or {}).items()}
+
+
+class MemorySheet:
+    def __init__(self, name, values=None, fonts=None, fills=None, display_fills=None):
+        """
+        values: {cell: value}
+        fonts: {cell: (bold, font_color)}
+        fills: {cell: static fill colour}
+        display_fills: {cell: fill shown by conditional formatting}, if any
+        """
+        self.name = name
+        self.values = _keyed(values)
+        self.fonts = _keyed(fonts)
+        self.fills = _keyed(fills)
+        self.display_fills = _keyed(display_fills)
+        self.comments = {}
+        self.hidden_columns = set()
+
+    def get_value(self, row, col):
+        return self.values.get((row, col))
+
+    def set_value(self, row, col, value):
+        self.values[(row, col)] = value
+
+    def read_block(self, min_row, min_col, max_row, max_col):
+        return [
+            [self.values.get((row, col)) for col in range(min_col, max_col + 1)]
+            for row in range(min_row, max_row + 1)
+        ]
+
+    def write_block(self, min_row, min_col, rows):
+        for r, values in enumerate(rows):
+            for c, value in enumerate(values):
+                self.values[(min_row + r, min_col + c)] = value
+
+    def get_format(self, row, col):
+        bold, font_color = self.fonts.get((row, col), (False, 0))
+        fill = self.display_fills.get((row, col), self.get_fill(row, col))
+        return (bold, font_color, fill)
+
+    def get_fill(self, row, col):
+        return self.fills.get((row, col), EXCEL_NO_FILL)
+
+    def set_font(self, row, col, bold=None, color=None):
+        cur_bold, cur_color = self.fonts.get((row, col), (False, 0))
+        self.fonts[(row, col)] = (
+            cur_bold if bold is None else bold,
+            cur_color if color is None else color,
+        )
+
+    def set_fill(self, row, col, color):
+        self.fills[(row, col)] = color
+
+    def set_font_block(self, min_row, min_col, max_row, max_col, bold=None, color=None):
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                self.set_font(row, col, bold=bold, color=color)
+
+    def set_fill_block(self, min_row, min_col, max_row, max_col, color):
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                self.fills[(row, col)] = color
+
+    def set_comment(self, row, col, text):
+        self.comments[(row, col)] = text
+
+    def hide_column(self, col):
+        self.hidden_columns.add(col)
+
+
+class MemoryWorkbook:
+    def __init__(self, name, sheets=None):
+        self.name = name
+        self._sheets = {sheet.name: sheet for sheet in (sheets or [])}
+
+    @property
+    def sheet_names(self):
+        return list(self._sheets)
+
+    def sheet(self, name):
+        return self._sheets[name]
+
+    def add_sheet(self, name):
+        self._sheets[name] = MemorySheet(name)
+        return self._sheets[name]
+
+    def save(self):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,236 @@
+"""
+File-based workbook backend built on openpyxl; needs no running Excel.
+
+Colours are reported the way Excel reports them through COM: BGR integers,
+``0`` for an automatic font colour and ``0xFFFFFF`` for "no fill". Theme and
+indexed colours are resolved against the workbook theme. Conditional
+formatting is not evaluated, so the display fill is the static fill.
+
+openpyxl rewrites the whole file on save and drops what it doesn't model:
+form controls (the template's checkboxes), ActiveX controls and drawing
+shapes. A workbook opened for writing has those read up front and put back
+into the saved file (see backends.package_parts).
+"""
+
+import colorsys
+import os
+import xml.etree.ElementTree as ET
+from copy import copy
+
+from openpyxl import load_workbook
+from openpyxl.comments import Comment
+from openpyxl.styles import PatternFill
+from openpyxl.styles.colors import COLOR_INDEX, Color
+from openpyxl.utils.cell import get_column_letter
+
+from backends.base import EXCEL_NO_FILL
+from backends.package_parts import KeptParts
+
+COMMENT_AUTHOR = "V8 Merger"
+
+_DRAWING_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+# Order of the colours in <a:clrScheme>, indexed the way cell styles refer to
+# them (Excel swaps the light/dark pairs relative to the XML order).
+_THEME_SLOTS = [
+    "lt1",
+    "dk1",
+    "lt2",
+    "dk2",
+    "accent1",
+    "accent2",
+    "accent3",
+    "accent4",
+    "accent5",
+    "accent6",
+    "hlink",
+    "folHlink",
+]
+
+
+def parse_theme_colors(theme_xml):
+    """Returns the workbook theme palette as a list of 'RRGGBB' strings."""
+    if not theme_xml:
+        return []
+    try:
+        root = ET.fromstring(theme_xml)
+    except ET.ParseError:
+        return []
+    scheme = root.find(f".//{_DRAWING_NS}clrScheme")
+    if scheme is None:
+        return []
+
+    colors = {}
+    for slot in scheme:
+        tag = slot.tag.replace(_DRAWING_NS, "")
+        for child in slot:
+            value = child.get("lastClr") or child.get("val")
+            if value and len(value) == 6:
+                colors[tag] = value
+    return [colors.get(name) for name in _THEME_SLOTS]
+
+
+def apply_tint(hex_rgb, tint):
+    """Applies an Excel tint (-1.0 .. 1.0) to an 'RRGGBB' colour."""
+    if not tint:
+        return hex_rgb
+    r, g, b = (int(hex_rgb[i : i + 2], 16) / 255 for i in (0, 2, 4))
+    hue, lum, sat = colorsys.rgb_to_hls(r, g, b)
+    if tint < 0:
+        lum = lum * (1 + tint)
+    else:
+        lum = lum * (1 - tint) + tint
+    r, g, b = colorsys.hls_to_rgb(hue, lum, sat)
+    return "".join(f"{round(c * 255):02X}" for c in (r, g, b))
+
+
+def color_to_bgr(color, theme_colors):
+    """Converts an openpyxl Color into an Excel BGR int, or None if unset."""
+    if color is None:
+        return None
+
+    hex_rgb = None
+    if color.type == "rgb" and isinstance(color.rgb, str):
+        hex_rgb = color.rgb[-6:]
+    elif color.type == "indexed" and color.indexed is not None:
+        if 0 <= color.indexed < len(COLOR_INDEX):
+            hex_rgb = COLOR_INDEX[color.indexed][-6:]
+    elif color.type == "theme" and color.theme is not None:
+        if 0 <= color.theme < len(theme_colors):
+            hex_rgb = theme_colors[color.theme]
+        if hex_rgb:
+            hex_rgb = apply_tint(hex_rgb, color.tint)
+
+    if not hex_rgb or len(hex_rgb) != 6:
+        return None
+    try:
+        r = int(hex_rgb[0:2], 16)
+        g = int(hex_rgb[2:4], 16)
+        b = int(hex_rgb[4:6], 16)
+    except ValueError:
+        return None
+    return (b << 16) | (g << 8) | r
+
+
+def bgr_to_argb(color_int):
+    """Converts an Excel BGR int into the 'FFRRGGBB' string openpyxl expects."""
+    r = color_int & 0xFF
+    g = (color_int >> 8) & 0xFF
+    b = (color_int >> 16) & 0xFF
+    return f"FF{r:02X}{g:02X}{b:02X}"
+
+
+class OpenpyxlSheet:
+    def __init__(self, ws, theme_colors):
+        self._ws = ws
+        self._theme_colors = theme_colors
+        self.name = ws.title
+
+    def _cell(self, row, col):
+        return self._ws.cell(row=row, column=col)
+
+    def get_value(self, row, col):
+        return self._cell(row, col).value
+
+    def set_value(self, row, col, value):
+        self._cell(row, col).value = value
+
+    def read_block(self, min_row, min_col, max_row, max_col):
+        rows = self._ws.iter_rows(
+            min_row=min_row,
+            min_col=min_col,
+            max_row=max_row,
+            max_col=max_col,
+            values_only=True,
+        )
+        return [list(row) for row in rows]
+
+    def write_block(self, min_row, min_col, rows):
+        for r, values in enumerate(rows):
+            for c, value in enumerate(values):
+                self.set_value(min_row + r, min_col + c, value)
+
+    def get_format(self, row, col):
+        cell = self._cell(row, col)
+        font_color = color_to_bgr(cell.font.color, self._theme_colors)
+        if font_color is None:
+            font_color = 0  # Automatic -> black, like COM
+        return (bool(cell.font.b), font_color, self._fill_of(cell))
+
+    def get_fill(self, row, col):
+        return self._fill_of(self._cell(row, col))
+
+    def _fill_of(self, cell):
+        fill = cell.fill
+        if fill is None or fill.fill_type != "solid":
+            return EXCEL_NO_FILL
+        color = color_to_bgr(fill.fgColor, self._theme_colors)
+        return EXCEL_NO_FILL if color is None else color
+
+    def set_font(self, row, col, bold=None, color=None):
+        cell = self._cell(row, col)
+        font = copy(cell.font)
+        if bold is not None:
+            font.b = bool(bold)
+        if isinstance(color, int):
+            font.color = Color(rgb=bgr_to_argb(color))
+        cell.font = font
+
+    def set_fill(self, row, col, color):
+        if not isinstance(color, int):
+            return
+        argb = bgr_to_argb(color)
+        self._cell(row, col).fill = PatternFill(
+            fill_type="solid", fgColor=argb, bgColor=argb
+        )
+
+    def set_font_block(self, min_row, min_col, max_row, max_col, bold=None, color=None):
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                self.set_font(row, col, bold=bold, color=color)
+
+    def set_fill_block(self, min_row, min_col, max_row, max_col, color):
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                self.set_fill(row, col, color)
+
+    def set_comment(self, row, col, text):
+        self._cell(row, col).comment = Comment(text, COMMENT_AUTHOR)
+
+    def hide_column(self, col):
+        self._ws.column_dimensions[get_column_letter(col)].hidden = True
+
+
+class OpenpyxlWorkbook:
+    def __init__(self, path, data_only=False):
+        self.path = path
+        self.name = os.path.basename(path)
+        # Inputs are only read; the output gets back what openpyxl drops
+        self._kept = None if data_only else KeptParts.read(path)
+        self._wb = load_workbook(path, data_only=data_only)
+        self._theme_colors = parse_theme_colors(self._wb.loaded_theme)
+
+    @property
+    def sheet_names(self):
+        return self._wb.sheetnames
+
+    def sheet(self, name):
+        return OpenpyxlSheet(self._wb[name], self._theme_colors)
+
+    def add_sheet(self, name):
+        return OpenpyxlSheet(self._wb.create_sheet(title=name), self._theme_colors)
+
+    def save(self):
+        self._wb.save(self.path)
+        if self._kept is not None:
+            self._kept.restore(self.path)
+
+    def close(self):
+        self._wb.close()
+
+
+def open_workbook(path, data_only=False):
+    """
+    Opens a workbook file. Technician inputs should be opened with
+    data_only=True so formula cells yield their cached values like Excel does.
+    """
+    return OpenpyxlWorkbook(path, data_only=data_only)
@@ -0,0 +1,554 @@
+"""
+Carries over the parts of a workbook package that openpyxl drops on save.
+
+openpyxl writes a workbook from its own object model, which has no form
+controls, ActiveX controls or drawing shapes. The V8 template's checkboxes
+are form controls: each is a <control> in the sheet XML pointing at a
+ctrlProp part (which holds the linked cell) and at a shape in the sheet's
+VML drawing, and Excel 2010 and later keep a hidden copy of that shape in
+the sheet's DrawingML drawing. KeptParts reads these from the file before
+openpyxl loads it and puts them back into the file openpyxl saved:
+
+- the sheet's <controls> element, as written (inside its
+  mc:AlternateContent wrapper, if any), and every part it refers to;
+- its VML drawing. A sheet has a single VML drawing, so when the saved
+  sheet has comments their shapes are moved into the original drawing,
+  numbered past the shapes already there;
+- its DrawingML drawing when that holds shapes, in place of the one
+  openpyxl wrote, which only has pictures and charts the original
+  drawing has as well.
+
+Copied parts keep their name unless openpyxl used it already, and their
+content types come from the original [Content_Types].xml. XML is spliced
+as text, so what openpyxl doesn't understand goes back byte for byte.
+"""
+
+import os
+import posixpath
+import re
+import tempfile
+import xml.etree.ElementTree as ET
+import zipfile
+from xml.parsers import expat
+from xml.sax.saxutils import quoteattr
+
+CONTENT_TYPES = "[Content_Types].xml"
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+VML_NS = "urn:schemas-microsoft-com:vml"
+OFFICE_NS = "urn:schemas-microsoft-com:office:office"
+EXCEL_NS = "urn:schemas-microsoft-com:office:excel"
+
+OFFICE_DOCUMENT_REL = f"{REL_NS}/officeDocument"
+DRAWING_REL = f"{REL_NS}/drawing"
+VML_DRAWING_REL = f"{REL_NS}/vmlDrawing"
+
+# Children of <worksheet> from <drawing> on, in schema order
+SHEET_TAIL = (
+    "drawing",
+    "legacyDrawing",
+    "legacyDrawingHF",
+    "drawingHF",
+    "picture",
+    "oleObjects",
+    "controls",
+    "webPublishItems",
+    "tableParts",
+    "extLst",
+)
+
+# VML shape ids come in blocks of this many per <o:idmap> entry
+SHAPES_PER_BLOCK = 1024
+COMMENT_SHAPE_TYPE = b"#_x0000_t202"
+
+# DrawingML that openpyxl doesn't read back
+_DRAWN_SHAPE = re.compile(rb"<(?:\w+:)?(?:sp|grpSp|cxnSp|AlternateContent)[\s>/]")
+_VML_SHAPE = re.compile(rb"<v:shape\s[^>]*>")
+_VML_COMMENT = re.compile(
+    rb'<v:shape\s[^>]*type="#_x0000_t202"[^>]*>.*?</v:shape>\s*', re.DOTALL
+)
+_VML_SHAPE_ID = re.compile(rb'\bid="_x0000_s(\d+)"')
+_VML_IDMAP = re.compile(rb'(<o:idmap\s[^>]*\bdata=")([^"]*)(")')
+_XMLNS = re.compile(rb'\sxmlns:([\w.-]+)="([^"]*)"')
+
+for _prefix, _uri in (("v", VML_NS), ("o", OFFICE_NS), ("x", EXCEL_NS)):
+    ET.register_namespace(_prefix, _uri)
+
+
+def rels_path(part):
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", f"{name}.rels")
+
+
+def read_rels(files, part):
+    """{Id: (Type, target, external)} of a part; targets are part names."""
+    data = files.get(rels_path(part))
+    if data is None:
+        return {}
+    rels = {}
+    for rel in ET.fromstring(data).iter(f"{{{PACKAGE_REL_NS}}}Relationship"):
+        target = rel.get("Target")
+        external = rel.get("TargetMode") == "External"
+        if not external:
+            target = (
+                target[1:]
+                if target.startswith("/")
+                else posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+            )
+        rels[rel.get("Id")] = (rel.get("Type"), target, external)
+    return rels
+
+
+def write_rels(rels):
+    """Serializes {Id: (Type, target, external)} as a .rels part."""
+    lines = [
+        b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n',
+        f'<Relationships xmlns="{PACKAGE_REL_NS}">'.encode(),
+    ]
+    for rel_id, (rel_type, target, external) in rels.items():
+        attrs = (
+            f"Id={quoteattr(rel_id)} Type={quoteattr(rel_type)} "
+            f"Target={quoteattr(target if external else '/' + target)}"
+        )
+        if external:
+            attrs += ' TargetMode="External"'
+        lines.append(f"<Relationship {attrs}/>".encode())
+    lines.append(b"</Relationships>")
+    return b"".join(lines)
+
+
+def sheet_parts(files):
+    """{sheet name: worksheet part name} of a package."""
+    workbook = next(
+        target
+        for rel_type, target, _ in read_rels(files, "").values()
+        if rel_type == OFFICE_DOCUMENT_REL
+    )
+    rels = read_rels(files, workbook)
+    root = ET.fromstring(files[workbook])
+    return {
+        sheet.get("name"): rels[sheet.get(f"{{{REL_NS}}}id")][1]
+        for sheet in root.iter(f"{{{MAIN_NS}}}sheet")
+    }
+
+
+def tag_end(data, start):
+    """Offset just past the tag starting at data[start] ('<')."""
+    quote = None
+    for idx in range(start + 1, len(data)):
+        char = data[idx : idx + 1]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in (b'"', b"'"):
+            quote = char
+        elif char == b">":
+            return idx + 1
+    raise ValueError("Unterminated tag")
+
+
+class XmlOutline:
+    """
+    Byte offsets of an XML part's root element and its children, so they
+    can be cut and spliced without re-serializing the document.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.root_start = self.root_end = None
+        self.children = []  # [local name, start, end, attrs, descendant names]
+        depth = 0
+        parser = expat.ParserCreate(namespace_separator=" ")
+
+        def start(name, attrs):
+            nonlocal depth
+            depth += 1
+            local = name.rsplit(" ", 1)[-1]
+            if depth == 1:
+                self.root_start = parser.CurrentByteIndex
+            elif depth == 2:
+                self.children.append(
+                    [local, parser.CurrentByteIndex, None, attrs, set()]
+                )
+            else:
+                self.children[-1][4].add(local)
+
+        def end(name):
+            nonlocal depth
+            if depth == 1:
+                self.root_end = parser.CurrentByteIndex
+            elif depth == 2:
+                self.children[-1][2] = tag_end(data, parser.CurrentByteIndex)
+            depth -= 1
+
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.Parse(data, True)
+
+    def namespaces(self):
+        """{prefix: uri} declared on the root element."""
+        root_tag = self.data[self.root_start : tag_end(self.data, self.root_start)]
+        return {
+            prefix.decode(): uri.decode() for prefix, uri in _XMLNS.findall(root_tag)
+        }
+
+    def child(self, name):
+        return next((child for child in self.children if child[0] == name), None)
+
+    def insert_position(self, name):
+        """Where a new <name> child goes in a worksheet, in schema order."""
+        later = SHEET_TAIL[SHEET_TAIL.index(name) + 1 :]
+        for local, start, _, _, _ in self.children:
+            if local in later:
+                return start
+        return self.root_end
+
+
+class KeptSheet:
+    """What openpyxl would drop from one worksheet of the original file."""
+
+    def __init__(self, outline, rels, controls, vml, drawing):
+        self.namespaces = outline.namespaces()
+        self.rels = rels
+        self.controls = controls  # the <controls> element (or its wrapper)
+        self.vml = vml  # VML drawing part holding more than comments
+        self.drawing = drawing  # DrawingML part holding shapes
+
+    @classmethod
+    def read(cls, files, part):
+        outline = XmlOutline(files[part])
+        rels = read_rels(files, part)
+
+        def target(name):
+            child = outline.child(name)
+            rel = rels.get(child[3].get(f"{REL_NS} id")) if child else None
+            return rel[1] if rel and rel[1] in files else None
+
+        controls = next(
+            (
+                files[part][start:end]
+                for local, start, end, _, inner in outline.children
+                if local == "controls" or "controls" in inner
+            ),
+            None,
+        )
+        vml = target("legacyDrawing")
+        if vml and not any(
+            COMMENT_SHAPE_TYPE not in shape for shape in _VML_SHAPE.findall(files[vml])
+        ):
+            vml = None
+        drawing = target("drawing")
+        if drawing and not _DRAWN_SHAPE.search(files[drawing]):
+            drawing = None
+        if controls is None and vml is None and drawing is None:
+            return None
+        return cls(outline, rels, controls, vml, drawing)
+
+
+class KeptParts:
+    """The controls, VML and shapes of a workbook file, by sheet name."""
+
+    def __init__(self, files, sheets):
+        self.files = files
+        self.sheets = sheets
+
+    @classmethod
+    def read(cls, path):
+        """None when openpyxl would lose nothing from the file at path."""
+        with zipfile.ZipFile(path) as zf:
+            files = {name: zf.read(name) for name in zf.namelist()}
+        sheets = {}
+        for name, part in sheet_parts(files).items():
+            kept = KeptSheet.read(files, part) if part in files else None
+            if kept is not None:
+                sheets[name] = kept
+        return cls(files, sheets) if sheets else None
+
+    def restore(self, path):
+        """Puts the kept parts back into the workbook openpyxl saved at path."""
+        with zipfile.ZipFile(path) as zf:
+            saved = {name: zf.read(name) for name in zf.namelist()}
+        package = _Graft(self.files, saved)
+        parts = sheet_parts(saved)
+        for name, kept in self.sheets.items():
+            if name in parts:
+                package.restore_sheet(parts[name], kept)
+        package.write(path)
+
+
+class _Graft:
+    """Edits the saved package, copying parts over from the original."""
+
+    def __init__(self, original, saved):
+        self.original = original
+        self.saved = saved
+        self.copied = {}  # original part name -> name in the saved package
+        self.removed = set()
+        self.overrides, self.defaults = self.content_types(original)
+        self.saved_overrides, self.saved_defaults = self.content_types(saved)
+        self.new_types = []
+
+    @staticmethod
+    def content_types(files):
+        root = ET.fromstring(files[CONTENT_TYPES])
+        ns = root.tag[: root.tag.index("}") + 1]
+        overrides = {
+            item.get("PartName").lstrip("/"): item.get("ContentType")
+            for item in root.iter(f"{ns}Override")
+        }
+        defaults = {
+            item.get("Extension").lower(): item.get("ContentType")
+            for item in root.iter(f"{ns}Default")
+        }
+        return overrides, defaults
+
+    def free_name(self, name):
+        if name not in self.saved:
+            return name
+        stem, ext = posixpath.splitext(name)
+        stem = stem.rstrip("0123456789")
+        number = 1
+        while f"{stem}{number}{ext}" in self.saved:
+            number += 1
+        return f"{stem}{number}{ext}"
+
+    def copy_part(self, name):
+        """Copies an original part and what it links to; returns its new name."""
+        if name in self.copied:
+            return self.copied[name]
+        new_name = self.copied[name] = self.free_name(name)
+        self.saved[new_name] = self.original[name]
+
+        if name in self.overrides:
+            self.new_types.append(
+                ("Override", "PartName", f"/{new_name}", self.overrides[name])
+            )
+        else:
+            ext = posixpath.splitext(name)[1][1:].lower()
+            if ext not in self.saved_defaults and ext in self.defaults:
+                self.saved_defaults[ext] = self.defaults[ext]
+                self.new_types.append(("Default", "Extension", ext, self.defaults[ext]))
+
+        rels = read_rels(self.original, name)
+        if rels:
+            self.saved[rels_path(new_name)] = write_rels(self.copy_targets(rels))
+        return new_name
+
+    def copy_targets(self, rels):
+        return {
+            rel_id: (
+                rel_type,
+                (
+                    self.copy_part(target)
+                    if not external and target in self.original
+                    else target
+                ),
+                external,
+            )
+            for rel_id, (rel_type, target, external) in rels.items()
+        }
+
+    def remove_part(self, name):
+        """Drops a part openpyxl wrote, with its rels and orphaned targets."""
+        targets = read_rels(self.saved, name)
+        self.saved.pop(name, None)
+        self.saved.pop(rels_path(name), None)
+        self.removed.add(name)
+        referenced = {
+            target
+            for rels_name in self.saved
+            if rels_name.endswith(".rels")
+            for _, target, _ in read_rels_file(self.saved, rels_name)
+        }
+        for _, target, external in targets.values():
+            if not external and target not in referenced:
+                self.saved.pop(target, None)
+                self.removed.add(target)
+
+    def restore_sheet(self, part, kept):
+        data = self.saved[part]
+        outline = XmlOutline(data)
+        rels = read_rels(self.saved, part)
+        inserts = []  # (offset, schema position, bytes)
+
+        def add_rel(rel_type, target):
+            number = len(rels) + 1
+            while f"rId{number}" in rels:
+                number += 1
+            rel_id = f"rId{number}"
+            rels[rel_id] = (rel_type, target, False)
+            return rel_id
+
+        def insert(name, fragment):
+            position = outline.insert_position(name)
+            inserts.append((position, SHEET_TAIL.index(name), fragment))
+
+        def related(name, rel_id):
+            return f'<{name} xmlns:r="{REL_NS}" r:id={quoteattr(rel_id)}/>'.encode()
+
+        def existing(rel_type):
+            return next(
+                (rel_id for rel_id, rel in rels.items() if rel[0] == rel_type), None
+            )
+
+        if kept.drawing:
+            drawing = self.copy_part(kept.drawing)
+            rel_id = existing(DRAWING_REL)
+            if rel_id is None:
+                insert("drawing", related("drawing", add_rel(DRAWING_REL, drawing)))
+            else:
+                self.remove_part(rels[rel_id][1])
+                rels[rel_id] = (DRAWING_REL, drawing, False)
+
+        if kept.vml:
+            rel_id = existing(VML_DRAWING_REL)
+            if rel_id is None:
+                vml = self.copy_part(kept.vml)
+                insert(
+                    "legacyDrawing",
+                    related("legacyDrawing", add_rel(VML_DRAWING_REL, vml)),
+                )
+            else:
+                # openpyxl wrote the sheet's comments; they join the controls
+                vml = rels[rel_id][1]
+                self.saved[vml] = merge_vml(self.original[kept.vml], self.saved[vml])
+                vml_rels = read_rels(self.original, kept.vml)
+                if vml_rels:
+                    self.saved[rels_path(vml)] = write_rels(self.copy_targets(vml_rels))
+
+        if kept.controls:
+            prefix = next(
+                (p for p, uri in kept.namespaces.items() if uri == REL_NS), None
+            )
+            fragment = kept.controls
+            relinked = {}  # a control is named in both mc:Choice and mc:Fallback
+            if prefix:
+
+                def relink(match):
+                    old_id = match.group(2).decode()
+                    rel = kept.rels.get(old_id)
+                    if rel is None:
+                        return match.group(0)
+                    if old_id not in relinked:
+                        rel_type, target, external = rel
+                        if not external and target in self.original:
+                            target = self.copy_part(target)
+                        rel_id = relinked[old_id] = add_rel(rel_type, target)
+                        rels[rel_id] = (rel_type, target, external)
+                    return match.group(1) + relinked[old_id].encode() + b'"'
+
+                fragment = re.sub(
+                    rb"(\b" + re.escape(prefix.encode()) + rb':[\w]+=")([^"]*)"',
+                    relink,
+                    fragment,
+                )
+            insert("controls", fragment)
+
+        # The spliced XML uses the original root's namespace prefixes
+        declared = outline.namespaces()
+        missing = b"".join(
+            f" xmlns:{prefix}={quoteattr(uri)}".encode()
+            for prefix, uri in kept.namespaces.items()
+            if prefix not in declared
+        )
+        if missing:
+            inserts.append((tag_end(data, outline.root_start) - 1, -1, missing))
+
+        pieces, last = [], 0
+        for offset, _, fragment in sorted(inserts, key=lambda item: item[:2]):
+            pieces += [data[last:offset], fragment]
+            last = offset
+        pieces.append(data[last:])
+        self.saved[part] = b"".join(pieces)
+        self.saved[rels_path(part)] = write_rels(rels)
+
+    def write(self, path):
+        types = self.saved[CONTENT_TYPES]
+        for name in self.removed:
+            types = re.sub(
+                rb'<Override\s+PartName="/' + re.escape(name.encode()) + rb'"[^>]*/>',
+                b"",
+                types,
+            )
+        added = b"".join(
+            f"<{tag} {key}={quoteattr(value)} ContentType={quoteattr(ct)}/>".encode()
+            for tag, key, value, ct in self.new_types
+        )
+        end = types.rindex(b"</Types>")
+        self.saved[CONTENT_TYPES] = types[:end] + added + types[end:]
+
+        folder = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(suffix=".xlsx", dir=folder)
+        try:
+            with os.fdopen(fd, "wb") as f, zipfile.ZipFile(
+                f, "w", zipfile.ZIP_DEFLATED
+            ) as zf:
+                zf.writestr(CONTENT_TYPES, self.saved[CONTENT_TYPES])
+                for name, data in self.saved.items():
+                    if name != CONTENT_TYPES:
+                        zf.writestr(name, data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def read_rels_file(files, rels_name):
+    """The (Type, target, external) entries of a .rels part by its own name."""
+    folder = posixpath.dirname(posixpath.dirname(rels_name))
+    part = posixpath.join(folder, posixpath.basename(rels_name)[: -len(".rels")])
+    return read_rels(files, part).values()
+
+
+def merge_vml(controls_vml, comments_vml):
+    """
+    The original VML drawing with the comment shapes openpyxl wrote in place
+    of its own; they are numbered past the shapes already there.
+    """
+    text = _VML_COMMENT.sub(b"", controls_vml)
+    root = ET.fromstring(comments_vml)
+    shapes = [
+        shape
+        for shape in root.iter(f"{{{VML_NS}}}shape")
+        if shape.get("type") == COMMENT_SHAPE_TYPE.decode()
+    ]
+
+    used = [int(number) for number in _VML_SHAPE_ID.findall(text)]
+    next_id = max(used, default=SHAPES_PER_BLOCK) + 1
+    new_ids = []
+    for shape in shapes:
+        if next_id % SHAPES_PER_BLOCK == 0:
+            next_id += 1
+        shape.set("id", f"_x0000_s{next_id}")
+        new_ids.append(next_id)
+        next_id += 1
+
+    fragments = []
+    if b'"_x0000_t202"' not in text:
+        shape_type = root.find(f"{{{VML_NS}}}shapetype[@id='_x0000_t202']")
+        if shape_type is not None:
+            fragments.append(ET.tostring(shape_type))
+    fragments += [ET.tostring(shape) for shape in shapes]
+    # The root declares v:, o: and x:; drop the copies on each fragment
+    added = b"".join(_XMLNS.sub(b"", fragment) for fragment in fragments)
+
+    blocks = {number // SHAPES_PER_BLOCK for number in used + new_ids}
+    match = _VML_IDMAP.search(text)
+    if match:
+        blocks |= {int(b) for b in match.group(2).split(b",") if b.strip().isdigit()}
+        data = ",".join(str(block) for block in sorted(blocks)).encode()
+        text = text[: match.start(2)] + data + text[match.end(2) :]
+
+    root_end = tag_end(text, text.index(b"<xml"))
+    declarations = b"".join(
+        f' xmlns:{prefix}="{uri}"'.encode()
+        for prefix, uri in (("v", VML_NS), ("o", OFFICE_NS), ("x", EXCEL_NS))
+        if f"xmlns:{prefix}=".encode() not in text[:root_end]
+    )
+    if declarations:
+        text = text[: root_end - 1] + declarations + text[root_end - 1 :]
+
+    end = text.rindex(b"</xml>")
+    return text[:end] + added + text[end:]
@@ -0,0 +1,100 @@
+"""Workbook backend that drives a running Excel through xlwings/COM."""
+
+import xlwings as xw
+
+
+class XlwingsSheet:
+    def __init__(self, sheet):
+        self._sheet = sheet
+        self.name = sheet.name
+
+    def _cell(self, row, col):
+        return self._sheet.range((row, col))
+
+    def get_value(self, row, col):
+        return self._cell(row, col).value
+
+    def set_value(self, row, col, value):
+        self._cell(row, col).value = value
+
+    def read_block(self, min_row, min_col, max_row, max_col):
+        rng = self._sheet.range((min_row, min_col), (max_row, max_col))
+        return rng.options(ndim=2).value
+
+    def write_block(self, min_row, min_col, rows):
+        self._sheet.range((min_row, min_col)).value = rows
+
+    def get_format(self, row, col):
+        api = self._cell(row, col).api
+        bold = api.Font.Bold
+        font_color = api.Font.Color
+        try:
+            fill = api.DisplayFormat.Interior.Color
+        except Exception:
+            fill = api.Interior.Color  # fallback
+        return (bold, font_color, fill)
+
+    def get_fill(self, row, col):
+        return self._cell(row, col).api.Interior.Color
+
+    def set_font(self, row, col, bold=None, color=None):
+        api = self._cell(row, col).api
+        if bold is not None:
+            api.Font.Bold = bold
+        if color is not None:
+            api.Font.Color = color
+
+    def set_fill(self, row, col, color):
+        self._cell(row, col).api.Interior.Color = color
+
+    def set_font_block(self, min_row, min_col, max_row, max_col, bold=None, color=None):
+        api = self._sheet.range((min_row, min_col), (max_row, max_col)).api
+        if bold is not None:
+            api.Font.Bold = bold
+        if color is not None:
+            api.Font.Color = color
+
+    def set_fill_block(self, min_row, min_col, max_row, max_col, color):
+        rng = self._sheet.range((min_row, min_col), (max_row, max_col))
+        rng.api.Interior.Color = color
+
+    def set_comment(self, row, col, text):
+        api = self._cell(row, col).api
+        try:
+            api.ClearComments()
+        except Exception as e:
+            print(f"could not clear comment with error {e}. Deleting instead.")
+            if getattr(api, "Comment", None):
+                api.Comment.Delete()
+        api.AddComment(text)
+
+    def hide_column(self, col):
+        self._sheet.range((1, col)).api.EntireColumn.Hidden = True
+
+
+class XlwingsWorkbook:
+    def __init__(self, path):
+        self._book = xw.Book(path)
+        self.name = self._book.name
+
+    @property
+    def sheet_names(self):
+        return [sheet.name for sheet in self._book.sheets]
+
+    def sheet(self, name):
+        return XlwingsSheet(self._book.sheets[name])
+
+    def add_sheet(self, name):
+        return XlwingsSheet(self._book.sheets.add(name=name))
+
+    def save(self):
+        self._book.save()
+
+    def close(self):
+        self._book.close()
+
+
+def open_workbook(path, data_only=False):
+    # Excel always reports calculated values, data_only is accepted for
+    # signature compatibility with the file-based backend.
+    return XlwingsWorkbook(path)
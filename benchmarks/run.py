@@ -0,0 +1,209 @@
+"""
+End-to-end merge benchmarks on synthetic sites (see benchmarks.synthetic).
+
+    python -m benchmarks.run [--technicians 2,8,32] [--pages 1,3,5]
+                             [--repeat 3] [--out results.json]
+                             [--compare baseline.json]
+
+Every (technicians, pages) case generates a site once, then merges it
+--repeat times with the openpyxl engine and no caches. Each run is split
+into phases by the metrics merge() returns (see core.metrics):
+
+- template: opening the output workbook;
+- open: extracting every input workbook;
+- sheets: merging and writing every handler sheet (and, per sheet, its
+  handler's run time plus the time to write its output);
+- save: saving the output.
+
+Timings are the median over the repeats, in seconds. The cell, comment and
+page counts and the peak memory of the last repeat are kept next to them.
+
+The JSON output has the environment under "meta" and one entry per case
+under "cases", keyed the same way on every run, so two result files can be
+compared with --compare (current time / baseline time per phase and sheet).
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+import numpy
+import openpyxl
+
+from benchmarks.synthetic import SiteSpec, generate_site, generate_template
+from config.sheet_definitions import plan_version
+from core.merger import merge
+
+PHASES = ("template", "open", "sheets", "save", "total")
+# Totals of core.metrics kept per case (from the last repeat)
+COUNTS = (
+    "cells_read",
+    "format_reads",
+    "cells_written",
+    "comments_written",
+    "pages_skipped",
+    "peak_memory",
+    "worker_peak_memory",
+)
+
+# --compare flags a timing as slower past this ratio and absolute difference
+SLOWER_RATIO = 1.25
+SLOWER_SECONDS = 0.005
+
+
+def run_case(directory, template, technicians, pages, repeat, workers, **spec):
+    """Generates one site and returns its benchmark entry."""
+    site_dir = os.path.join(directory, f"t{technicians}-p{pages}")
+    spec = SiteSpec(technicians=technicians, pages=pages, **spec)
+    paths = generate_site(site_dir, spec)
+    output = os.path.join(site_dir, "merged.xlsx")
+
+    runs, sheet_runs, conflicts, metrics = [], [], None, None
+    for _ in range(repeat):
+        shutil.copyfile(template, output)
+        with redirect_stdout(io.StringIO()):
+            conflicts, metrics = merge(
+                paths, output, engine="openpyxl", workers=workers
+            )
+        runs.append(metrics.phases)
+        sheet_runs.append(
+            {
+                name: sheet["handler_seconds"] + sheet["write_seconds"]
+                for name, sheet in metrics.sheets.items()
+            }
+        )
+    totals = metrics.to_dict()
+
+    return {
+        "case": f"{technicians} technicians x {pages} pages",
+        "technicians": technicians,
+        "pages": pages,
+        "spec": spec.as_dict(),
+        "conflicts": len(conflicts),
+        "counts": {key: totals[key] for key in COUNTS},
+        "phases": {
+            phase: round(statistics.median(run[phase] for run in runs), 4)
+            for phase in PHASES
+        },
+        "sheets": {
+            sheet: round(statistics.median(run[sheet] for run in sheet_runs), 4)
+            for sheet in sorted(sheet_runs[0])
+        },
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    """Prints current / baseline time for every phase and sheet both have."""
+    old_cases = {case["case"]: case for case in baseline["cases"]}
+    for case in current["cases"]:
+        old = old_cases.get(case["case"])
+        if not old:
+            continue
+        print(case["case"])
+        for group in ("phases", "sheets"):
+            for name, seconds in case[group].items():
+                before = old[group].get(name)
+                if before:
+                    ratio = seconds / before
+                    slower = ratio > SLOWER_RATIO and seconds - before > SLOWER_SECONDS
+                    flag = "  <-- slower" if slower else ""
+                    print(
+                        f"  {name:32} {before:8.3f}s -> {seconds:8.3f}s "
+                        f"x{ratio:5.2f}{flag}"
+                    )
+
+
+def parse_ints(text):
+    return [int(value) for value in text.split(",") if value]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Time every phase of merge() on synthetic sites.",
+    )
+    parser.add_argument("--technicians", type=parse_ints, default=[2, 8, 32])
+    parser.add_argument("--pages", type=parse_ints, default=[1, 3, 5])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="benchmark-results.json")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--work-dir", help="keep generated sites here")
+    args = parser.parse_args(argv)
+
+    directory = args.work_dir or tempfile.mkdtemp(prefix="v8-bench-")
+    os.makedirs(directory, exist_ok=True)
+    template = generate_template(os.path.join(directory, "template.xlsx"))
+
+    results = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "plan_version": plan_version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": numpy.__version__,
+            "openpyxl": openpyxl.__version__,
+            "engine": "openpyxl",
+            "workers": args.workers,
+            "repeat": args.repeat,
+        },
+        "cases": [],
+    }
+    try:
+        for technicians in args.technicians:
+            for pages in args.pages:
+                case = run_case(
+                    directory,
+                    template,
+                    technicians,
+                    pages,
+                    args.repeat,
+                    args.workers,
+                    seed=args.seed,
+                )
+                results["cases"].append(case)
+                phases = case["phases"]
+                print(
+                    f"{case['case']:28} total {phases['total']:7.3f}s  "
+                    f"open {phases['open']:7.3f}s  sheets {phases['sheets']:7.3f}s  "
+                    f"save {phases['save']:6.3f}s  ({case['conflicts']} conflicts)"
+                )
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Synthetic V8 technician workbooks, generated from the handlers' merge plans.
+
+A site is simulated the way it is actually inspected: every input cell of
+the first `pages` pages of each handler sheet may hold a value recorded by
+one technician (its owner), and other technicians may record a different
+value for the same cell, which is a conflict. Checkbox groups are answered
+the same way, special rows get highlighted values, and anchors are filled
+so the pages count as used. Every workbook has all of REQUIRED_SHEETS, so it
+passes is_valid_excel_file.
+
+    python -m benchmarks.synthetic OUT_DIR --technicians 8 --pages 2
+
+All randomness comes from the seed, so the same parameters always produce
+the same files.
+"""
+
+import argparse
+import os
+import random
+
+from openpyxl import Workbook
+from openpyxl.styles import Font, PatternFill
+
+from config.sheet_definitions import (
+    REQUIRED_SHEETS,
+    SHEET_MERGE_HANDLERS,
+    get_merge_plan,
+)
+from utils.cell_refs import format_address
+
+# Highlight colours technicians use: red, green and orange (ARGB)
+HIGHLIGHT_FILLS = ("FFFF0000", "FF00B050", "FFFFC000")
+FONT_COLORS = ("FF000000", "FFFF0000", "FF0070C0")
+VALUES = ("Pass", "Fail", "N/A", "OK", "Replaced", "See notes", 1, 2, 12, 24.5)
+
+
+class SiteSpec:
+    """Parameters of a synthetic site; see generate_site."""
+
+    def __init__(
+        self,
+        technicians=8,
+        pages=2,
+        fill=0.35,
+        conflict=0.1,
+        highlight=0.1,
+        bold=0.1,
+        checkbox=0.5,
+        seed=0,
+    ):
+        self.technicians = technicians
+        self.pages = pages
+        self.fill = fill  # share of input cells someone recorded
+        self.conflict = conflict  # chance another technician contradicts it
+        self.highlight = highlight  # share of values with a highlight fill
+        self.bold = bold  # share of values in bold / coloured font
+        self.checkbox = checkbox  # share of checkbox groups answered
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def _record(ws, row, col, value, rnd, spec, fill=None):
+    cell = ws[format_address(row, col)]
+    cell.value = value
+    if fill or rnd.random() < spec.highlight:
+        color = fill or rnd.choice(HIGHLIGHT_FILLS)
+        cell.fill = PatternFill("solid", fgColor=color)
+    if rnd.random() < spec.bold:
+        cell.font = Font(b=True, color=rnd.choice(FONT_COLORS))
+
+
+def _other(technician, spec, rnd):
+    """A technician other than the given one."""
+    other = rnd.randrange(spec.technicians - 1)
+    return other + 1 if other >= technician else other
+
+
+def fill_sheets(sheets, plan, spec, rnd):
+    """Writes one handler sheet of every technician (sheets[t])."""
+    count = spec.technicians
+    pages = range(min(spec.pages, plan.page_count))
+    special_rows = set()
+
+    for page in pages:
+        # Anchors make the page count as used
+        for row, col in plan.page_anchors[page]:
+            owner = rnd.randrange(count)
+            sheets[owner][format_address(row, col)] = f"Device {row}"
+
+        start, stop = plan.page_cells[page]
+        for i in range(start, stop):
+            row, col = plan.cell_rows[i], plan.cell_cols[i]
+            if row in plan.special_rows:
+                special_rows.add(row)
+                continue
+            if rnd.random() >= spec.fill:
+                continue
+            owner = rnd.randrange(count)
+            _record(sheets[owner], row, col, rnd.choice(VALUES), rnd, spec)
+            if count > 1 and rnd.random() < spec.conflict:
+                other = _other(owner, spec, rnd)
+                _record(sheets[other], row, col, rnd.choice(VALUES), rnd, spec)
+
+        start, stop = plan.page_groups[page]
+        for g in range(start, stop):
+            if rnd.random() >= spec.checkbox:
+                continue
+            options = plan.group_options(g)
+            owner = rnd.randrange(count)
+            ticked = rnd.randrange(len(options))
+            sheets[owner][format_address(*options[ticked])] = True
+            if count > 1 and len(options) > 1 and rnd.random() < spec.conflict:
+                other = _other(owner, spec, rnd)
+                row, col = options[(ticked + 1) % len(options)]
+                sheets[other][format_address(row, col)] = True
+
+    # Special rows on those pages: a value plus a highlight across the row
+    for row in sorted(special_rows):
+        if rnd.random() >= spec.fill:
+            continue
+        value_col, highlight_cols = plan.special_rows[row]
+        writers = [rnd.randrange(count)]
+        if count > 1 and rnd.random() < spec.conflict:
+            writers.append(_other(writers[0], spec, rnd))
+        for t in writers:
+            color = rnd.choice(HIGHLIGHT_FILLS)
+            _record(sheets[t], row, value_col, rnd.choice(VALUES), rnd, spec, color)
+            for col in highlight_cols:
+                cell = sheets[t][format_address(row, col)]
+                cell.fill = PatternFill("solid", fgColor=color)
+
+
+def blank_workbook():
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name in REQUIRED_SHEETS:
+        wb.create_sheet(name)
+    return wb
+
+
+def generate_template(path):
+    """A blank V8 template: every required sheet, no data."""
+    blank_workbook().save(path)
+    return path
+
+
+def generate_site(directory, spec=None, **params):
+    """
+    Writes one workbook per technician to directory and returns their paths
+    in technician order. Pass a SiteSpec, or its parameters as keywords.
+    """
+    spec = spec or SiteSpec(**params)
+    rnd = random.Random(spec.seed)
+    os.makedirs(directory, exist_ok=True)
+
+    books = [blank_workbook() for _ in range(spec.technicians)]
+    for sheet_name in sorted(SHEET_MERGE_HANDLERS):
+        plan = get_merge_plan(sheet_name)
+        fill_sheets([wb[sheet_name] for wb in books], plan, spec, rnd)
+
+    paths = []
+    for t, wb in enumerate(books):
+        path = os.path.join(directory, f"tech{t:02d}.xlsx")
+        wb.save(path)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.synthetic",
+        description="Generate synthetic V8 technician workbooks and a template.",
+    )
+    parser.add_argument("out_dir")
+    defaults = SiteSpec()
+    for name, value in defaults.as_dict().items():
+        parser.add_argument(f"--{name}", type=type(value), default=value)
+    args = vars(parser.parse_args(argv))
+    out_dir = args.pop("out_dir")
+
+    paths = generate_site(out_dir, **args)
+    generate_template(os.path.join(out_dir, "template.xlsx"))
+    print(f"Wrote {len(paths)} technician workbooks and template.xlsx to {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import hashlib
+from functools import lru_cache
+
 from handlers import (
     sheet_20_1,
     sheet_20_3,
@@ -11,6 +14,7 @@ from handlers import (
     sheet_22_7,
     # Add other sheet handler modules as needed
 )
+from handlers.merge_plan import module_plan
 
 # List of sheet names that should exist in a valid V8 Excel file
 REQUIRED_SHEETS = [
@@ -67,3 +71,21 @@ SHEET_MERGE_HANDLERS = {
 
 def get_merge_handler(sheet_name):
     return SHEET_MERGE_HANDLERS.get(sheet_name)
+
+
+def get_merge_plan(sheet_name):
+    """Returns the compiled merge plan of the sheet's handler module, if any."""
+    handler = get_merge_handler(sheet_name)
+    if handler is None:
+        return None
+    return module_plan(handler.__module__)
+
+
+@lru_cache(maxsize=None)
+def plan_version():
+    """Fingerprint of every handler's merge plan, for keying extracted data."""
+    digest = hashlib.blake2b(digest_size=8)
+    for sheet_name in sorted(SHEET_MERGE_HANDLERS):
+        digest.update(sheet_name.encode())
+        digest.update(get_merge_plan(sheet_name).fingerprint().encode())
+    return digest.hexdigest()
@@ -0,0 +1,24 @@
+import os
+
+# Blank V8 report every merge starts from
+TEMPLATE_FILENAME = "Annual ULC Template - CAN,ULC-S536-19 v8.xlsx"
+
+# Where the template lives under the user's OneDrive-synced profile
+TEMPLATE_SUBFOLDER = (
+    r"Cantec Fire Alarms\Cantec Office - "
+    r"Documents\Cantec\Operations\Templates\Report Templates\Log Templates"
+)
+
+
+def default_template_path():
+    """
+    The V8 template to merge into: V8_MERGER_TEMPLATE if set, else the
+    template in the user's synced Templates folder (None off Windows).
+    """
+    configured = os.environ.get("V8_MERGER_TEMPLATE")
+    if configured:
+        return configured
+    user_profile = os.environ.get("USERPROFILE")
+    if not user_profile:
+        return None
+    return os.path.join(user_profile, TEMPLATE_SUBFOLDER, TEMPLATE_FILENAME)
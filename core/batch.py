@@ -0,0 +1,307 @@
+"""
+Headless batch merging of many sites in one run.
+
+    python -m core.batch manifest.json [--jobs N] [--summary summary.json]
+
+The manifest is JSON describing the sites to merge:
+
+    {
+        "template": "Annual ULC Template.xlsx",
+        "engine": "openpyxl",
+        "sites": [
+            {
+                "name": "123 Main St",
+                "inputs": ["main-st/tech-a.xlsx", "main-st/*.xlsx"],
+                "output": "merged/123 Main St.xlsx",
+                "template": "optional per-site template.xlsx"
+            }
+        ]
+    }
+
+Relative paths are resolved against the manifest's folder. Inputs keep the
+order given (it decides which technician wins a cell); a glob pattern
+expands to its matches in name order, and a file listed twice is merged
+once. The top-level template defaults to config.templates.default_template_path
+and engine to "openpyxl".
+
+Each site copies its template to its output and merges into it, exactly as
+the GUI does. Sites run on a pool of --jobs processes. When several sites
+run at once each merge works in-process, so the machine is shared between
+sites rather than oversubscribed. A summary of per-site status, timings,
+conflict counts and merge metrics (see core.metrics) is written as JSON;
+--metrics also appends each site's metrics to a JSONL log.
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import shutil
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+
+from config.templates import default_template_path
+from core.cancellation import MergeCancelled
+from core.disk_cache import ExtractionCache
+from core.merger import merge
+
+DEFAULT_ENGINE = "openpyxl"
+
+
+def load_manifest(path):
+    """Reads a manifest into a list of site dicts with absolute paths."""
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(p):
+        return os.path.normpath(os.path.join(base, os.path.expanduser(p)))
+
+    template = manifest.get("template")
+    template = resolve(template) if template else default_template_path()
+    engine = manifest.get("engine", DEFAULT_ENGINE)
+
+    sites = []
+    for idx, site in enumerate(manifest.get("sites", []), start=1):
+        if "output" not in site or not site.get("inputs"):
+            raise ValueError(f"Site {idx} in {path} needs 'inputs' and 'output'")
+        inputs = []
+        for pattern in site["inputs"]:
+            pattern = resolve(pattern)
+            matches = (
+                sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+            )
+            for match in matches:
+                if match not in inputs:
+                    inputs.append(match)
+        output = resolve(site["output"])
+        name = site.get("name") or os.path.splitext(os.path.basename(output))[0]
+        site_template = resolve(site["template"]) if site.get("template") else None
+        sites.append(
+            {
+                "name": name,
+                "template": site_template or template,
+                "inputs": inputs,
+                "output": output,
+                "engine": site.get("engine", engine),
+            }
+        )
+    return sites
+
+
+def run_site(
+    site,
+    workers=None,
+    time_budget=None,
+    cache_dir=None,
+    cache=None,
+    metrics_path=None,
+):
+    """
+    Merges one site and returns its summary entry. Never raises: a failed
+    site, including one whose input globs matched nothing, is reported with
+    status "failed" (or "cancelled" when it ran out of time_budget) and its
+    output file removed. The handlers' console
+    output is swallowed. cache is an optional core.merge_cache.MergeCache
+    kept by the caller between runs of the same site; metrics_path is
+    handed to merge(). Runs in the batch worker processes, so it must stay
+    module-level.
+    """
+    result = {
+        "name": site["name"],
+        "output": site["output"],
+        "inputs": len(site["inputs"]),
+        "status": "ok",
+        "elapsed": 0.0,
+        "conflicts": 0,
+        "conflict_sheets": {},
+        "error": None,
+        "metrics": None,
+    }
+    start = time.perf_counter()
+    copied = False
+    try:
+        template = site["template"]
+        if not template or not os.path.exists(template):
+            raise FileNotFoundError(f"Template not found: {template}")
+        if not site["inputs"]:
+            raise FileNotFoundError("No inputs matched")
+        missing = [path for path in site["inputs"] if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"Input not found: {missing[0]}")
+
+        os.makedirs(os.path.dirname(site["output"]) or ".", exist_ok=True)
+        shutil.copyfile(template, site["output"])
+        copied = True
+
+        disk_cache = ExtractionCache(cache_dir) if cache_dir != "" else None
+        with redirect_stdout(io.StringIO()):
+            conflicts, metrics = merge(
+                site["inputs"],
+                site["output"],
+                engine=site["engine"],
+                workers=workers,
+                cache=cache,
+                disk_cache=disk_cache,
+                time_budget=time_budget,
+                metrics_path=metrics_path,
+            )
+        result["conflicts"] = len(conflicts)
+        result["conflict_sheets"] = dict(sorted(Counter(conflicts).items()))
+        result["metrics"] = metrics.to_dict()
+    except MergeCancelled as e:
+        result["status"] = "cancelled"
+        result["error"] = e.reason
+        if e.metrics:
+            result["metrics"] = e.metrics.to_dict()
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    if result["status"] != "ok" and copied:
+        try:
+            os.remove(site["output"])
+        except OSError:
+            pass
+    result["elapsed"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_batch(
+    sites, jobs=1, workers=None, time_budget=None, cache_dir=None, metrics_path=None
+):
+    """
+    Merges every site, jobs at a time, and returns the batch summary. With
+    jobs > 1 each merge defaults to in-process (workers=1); a single job
+    gets the usual per-merge worker pool.
+    """
+    if workers is None and jobs > 1:
+        workers = 1
+
+    started = time.time()
+    start = time.perf_counter()
+    results = [None] * len(sites)
+
+    def report(idx):
+        entry = results[idx]
+        print(
+            f"[{sum(r is not None for r in results)}/{len(sites)}] {entry['name']}: "
+            f"{entry['status']} in {entry['elapsed']:.1f}s, "
+            f"{entry['conflicts']} conflicts"
+            + (f" ({entry['error']})" if entry["error"] else "")
+        )
+
+    if jobs <= 1:
+        for idx, site in enumerate(sites):
+            results[idx] = run_site(
+                site, workers, time_budget, cache_dir, metrics_path=metrics_path
+            )
+            report(idx)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                pool.submit(
+                    run_site,
+                    site,
+                    workers,
+                    time_budget,
+                    cache_dir,
+                    metrics_path=metrics_path,
+                ): idx
+                for idx, site in enumerate(sites)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                results[idx] = future.result()
+                report(idx)
+
+    statuses = Counter(result["status"] for result in results)
+    return {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "elapsed": round(time.perf_counter() - start, 3),
+        "jobs": jobs,
+        "sites": len(sites),
+        "ok": statuses.get("ok", 0),
+        "failed": statuses.get("failed", 0),
+        "cancelled": statuses.get("cancelled", 0),
+        "conflicts": sum(result["conflicts"] for result in results),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m core.batch",
+        description="Merge the V8 reports of many sites from a job manifest.",
+    )
+    parser.add_argument("manifest", help="JSON job manifest (see core.batch)")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="sites merged at once (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="processes per merge (default: 1 when --jobs > 1)",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=None,
+        help="seconds a single site may take before it is cancelled",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="extraction cache folder ('' disables the cache)",
+    )
+    parser.add_argument(
+        "--metrics",
+        default=None,
+        help="JSONL file to append every site's merge metrics to",
+    )
+    parser.add_argument(
+        "--summary",
+        default=None,
+        help="where to write the JSON summary (default: next to the manifest)",
+    )
+    args = parser.parse_args(argv)
+
+    sites = load_manifest(args.manifest)
+    summary = run_batch(
+        sites,
+        jobs=max(1, args.jobs),
+        workers=args.workers,
+        time_budget=args.time_budget,
+        cache_dir=args.cache_dir,
+        metrics_path=args.metrics,
+    )
+    summary["manifest"] = os.path.abspath(args.manifest)
+
+    summary_path = args.summary or (
+        os.path.splitext(args.manifest)[0] + ".summary.json"
+    )
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    print(
+        f"{summary['ok']}/{summary['sites']} sites merged in "
+        f"{summary['elapsed']:.1f}s; summary written to {summary_path}"
+    )
+    return 0 if summary["ok"] == summary["sites"] else 1
+
+
+if __name__ == "__main__":
+    from multiprocessing import freeze_support
+
+    freeze_support()
+    sys.exit(main())
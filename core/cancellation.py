@@ -0,0 +1,120 @@
+"""
+Cooperative cancellation of a running merge.
+
+A CancelToken is a flag the caller sets (from another thread, or another
+process when it wraps a multiprocessing.Event) plus an optional wall-clock
+deadline. merge() activates its token with cancellation_scope(), and the
+merge checks it between files, between sheets and between the pages of
+each sheet (check_cancelled); once it is set or the deadline has passed
+the next check raises MergeCancelled.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import contextmanager
+
+from backends.base import get_sheet
+
+# Name of the sheet added to a partially merged output
+INCOMPLETE_SHEET = "MERGE INCOMPLETE"
+
+# How often a merge waiting on its worker processes checks for cancellation
+CANCEL_POLL_SECONDS = 0.1
+
+_scope = threading.local()
+
+
+class MergeCancelled(Exception):
+    """
+    The merge was cancelled or ran out of time. partial is True when the
+    output was saved with the sheets merged so far and an INCOMPLETE_SHEET
+    marker, False when it was left untouched. metrics is the run's
+    core.metrics.MergeMetrics once merge() has stamped it.
+    """
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+        self.partial = False
+        self.metrics = None
+
+
+class CancelToken:
+    """Cancellation flag with an optional deadline (a time.time() value)."""
+
+    def __init__(self, event=None, deadline=None):
+        self._event = event if event is not None else threading.Event()
+        self.deadline = deadline
+
+    def cancel(self):
+        self._event.set()
+
+    def with_budget(self, seconds):
+        """The same flag, with the deadline moved to at most seconds from now."""
+        deadline = time.time() + seconds
+        if self.deadline is not None:
+            deadline = min(deadline, self.deadline)
+        return CancelToken(self._event, deadline)
+
+    def reason(self):
+        """Why the merge should stop, or None if it can carry on."""
+        if self._event.is_set():
+            return "Merge cancelled"
+        if self.deadline is not None and time.time() >= self.deadline:
+            return "Merge time budget exceeded"
+        return None
+
+    def check(self):
+        reason = self.reason()
+        if reason:
+            raise MergeCancelled(reason)
+
+
+@contextmanager
+def cancellation_scope(token):
+    """Makes token the one check_cancelled() consults on this thread."""
+    previous = getattr(_scope, "token", None)
+    _scope.token = token
+    try:
+        yield token
+    finally:
+        _scope.token = previous
+
+
+def check_cancelled():
+    """Raises MergeCancelled if this thread's active token says to stop."""
+    token = getattr(_scope, "token", None)
+    if token is not None:
+        token.check()
+
+
+def iter_completed(futures):
+    """
+    Yields futures as they finish, like concurrent.futures.as_completed, but
+    calls check_cancelled() every CANCEL_POLL_SECONDS while it waits, so a
+    cancelled merge stops waiting without the next job having to finish.
+    """
+    pending = set(futures)
+    while pending:
+        done, pending = wait(
+            pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED
+        )
+        check_cancelled()
+        yield from done
+
+
+def mark_incomplete(output_wb, reason, merged_sheets, skipped_sheets):
+    """Adds the INCOMPLETE_SHEET marker describing a partial merge."""
+    ws = get_sheet(output_wb, INCOMPLETE_SHEET) or output_wb.add_sheet(INCOMPLETE_SHEET)
+    lines = [
+        f"{reason} — this workbook is only partially merged.",
+        "",
+        "Merged sheets:",
+        *merged_sheets,
+        "",
+        "Not merged:",
+        *skipped_sheets,
+    ]
+    for row, line in enumerate(lines, start=1):
+        ws.set_value(row, 1, line)
@@ -0,0 +1,213 @@
+"""
+Persistent on-disk cache of extracted technician workbooks.
+
+The same technician files are often merged several times a day (a draft,
+then the final). ExtractionCache keeps what core.extraction pulls out of a
+workbook — the handler sheets' values and format arrays — in a cache
+directory, so a later merge of an unchanged file skips parsing it.
+
+Entries are keyed by the file's content hash, the engine that read it and
+the plan version (see config.sheet_definitions.plan_version), so editing
+a handler's cell layout invalidates old entries. Each entry is a small
+header, an HMAC-SHA256 of the payload and a zlib-compressed pickle. The
+directory is bounded in size; the least recently used entries (by mtime,
+refreshed on every hit) are evicted first.
+
+Unpickling runs code, so an entry is only unpickled when its HMAC checks
+out under a random key private to the current user (see cache_key), which
+is kept outside the cache directory. Entries written by anyone else,
+including another user sharing a V8_MERGER_CACHE_DIR, are ignored as
+misses. Even so, the cache is meant for one user and should not be pointed
+at a shared or network folder.
+"""
+
+import hashlib
+import hmac
+import os
+import pickle
+import secrets
+import sys
+import tempfile
+import threading
+import zlib
+
+from config.sheet_definitions import plan_version
+
+# Bump when the layout of the pickled snapshot data or entries changes
+CACHE_FORMAT = 2
+MAGIC = b"V8XC"
+SUFFIX = ".v8x"
+KEY_FILENAME = "cache.key"
+KEY_BYTES = 32
+SIGNATURE_BYTES = hashlib.sha256().digest_size
+
+_key_lock = threading.Lock()
+_keys = {}  # key file path -> key
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_dir():
+    """V8_MERGER_CACHE_DIR, else the per-user cache directory."""
+    configured = os.environ.get("V8_MERGER_CACHE_DIR")
+    if configured:
+        return configured
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "v8-merger", "extracted")
+
+
+def user_state_dir():
+    """The per-user v8-merger folder, never shared between users."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(base, "v8-merger")
+
+
+def cache_key(path=None):
+    """
+    The current user's cache signing key, created on first use with
+    owner-only permissions. path defaults to cache.key in user_state_dir().
+    """
+    path = path or os.path.join(user_state_dir(), KEY_FILENAME)
+    with _key_lock:
+        if path not in _keys:
+            _keys[path] = _read_key(path) or _create_key(path)
+        return _keys[path]
+
+
+def _read_key(path):
+    try:
+        with open(path, "rb") as f:
+            key = f.read()
+    except FileNotFoundError:
+        return None
+    return key if len(key) == KEY_BYTES else None
+
+
+def _create_key(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    key = secrets.token_bytes(KEY_BYTES)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))  # owner-only
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    try:
+        os.link(tmp_path, path)
+    except FileExistsError:
+        # Another process created it first: use theirs unless it is damaged
+        existing = _read_key(path)
+        if existing:
+            return existing
+        os.replace(tmp_path, path)
+    except OSError:
+        os.replace(tmp_path, path)  # no hard links on this file system
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    return key
+
+
+def sign(key, payload):
+    return hmac.new(key, payload, hashlib.sha256).digest()
+
+
+class ExtractionCache:
+    """
+    Directory of extracted workbooks. Holds only the directory and size
+    bound, so it can be handed to extraction worker processes.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, key_path=None):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.key_path = key_path
+
+    def entry_path(self, digest, engine):
+        name = f"{digest}-{engine}-{plan_version()}-{CACHE_FORMAT}{SUFFIX}"
+        return os.path.join(self.directory, name)
+
+    def load(self, digest, engine):
+        """Returns the cached ExtractedWorkbook, or None on a miss."""
+        path = self.entry_path(digest, engine)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if not data.startswith(MAGIC):
+            return None
+        signature = data[len(MAGIC) : len(MAGIC) + SIGNATURE_BYTES]
+        payload = data[len(MAGIC) + SIGNATURE_BYTES :]
+        if not hmac.compare_digest(signature, sign(self.key(), payload)):
+            return None  # not written by this user; never unpickle it
+        try:
+            wb = pickle.loads(zlib.decompress(payload))
+        except Exception as e:
+            print(f"⚠️ Discarding unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)  # most recently used
+        except OSError:
+            pass
+        return wb
+
+    def store(self, digest, engine, wb):
+        """Writes an ExtractedWorkbook, then evicts down to max_bytes."""
+        os.makedirs(self.directory, exist_ok=True)
+        payload = zlib.compress(pickle.dumps(wb, pickle.HIGHEST_PROTOCOL), 6)
+        data = MAGIC + sign(self.key(), payload) + payload
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.entry_path(digest, engine))
+        except OSError as e:
+            print(f"⚠️ Could not write extraction cache entry: {e}")
+            self._remove(tmp_path)
+            return
+        self.evict()
+
+    def key(self):
+        return cache_key(self.key_path)
+
+    def evict(self):
+        """Deletes least recently used entries until the directory fits."""
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(SUFFIX):
+                self._remove(os.path.join(self.directory, name))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,122 @@
+"""
+Extraction of technician workbooks.
+
+Each input workbook is opened once, every sheet that has a merge handler is
+snapshotted against its merge plan (see core.snapshot), and the workbook is
+closed again. What is left is an ExtractedWorkbook: a small, picklable
+object that the merge reads exactly like an open workbook.
+
+With the openpyxl engine the files are parsed on a pool of worker
+processes and handed back as each one finishes, so opening N files costs
+roughly as long as the slowest one. xlwings drives a single Excel instance
+over COM and is always extracted in-process, one file at a time.
+
+Given a core.disk_cache.ExtractionCache, a file whose content was extracted
+before is loaded from the cache instead of being opened at all.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from backends import open_workbook
+from config.sheet_definitions import get_merge_handler, get_merge_plan
+from core.cancellation import iter_completed
+from core.merge_cache import file_digest
+from core.metrics import peak_memory
+from core.snapshot import snapshot_sheet
+
+
+class ExtractedWorkbook:
+    """Detached sheet snapshots of one technician workbook."""
+
+    def __init__(self, name, path, sheet_names, sheets):
+        self.name = name
+        self.path = path
+        self.sheet_names = sheet_names
+        self._sheets = sheets
+        self.sheet_digests = {
+            sheet_name: snapshot.digest() for sheet_name, snapshot in sheets.items()
+        }
+        # What extracting it cost, for core.metrics (zero when cached)
+        self.cells_read = sum(snapshot.cells_read for snapshot in sheets.values())
+        self.format_reads = sum(snapshot.format_reads for snapshot in sheets.values())
+        self.peak_memory = None
+
+    def sheet(self, name):
+        return self._sheets[name]
+
+    def close(self):
+        pass
+
+
+def extract_workbook(path, engine="openpyxl", disk_cache=None):
+    """
+    Opens path, snapshots every sheet with a merge handler and closes it.
+    Runs in the extraction worker processes, so it must stay module-level.
+    """
+    if disk_cache:
+        digest = file_digest(path)
+        cached = disk_cache.load(digest, engine)
+        if cached is not None:
+            cached.name = os.path.basename(path)
+            cached.path = path
+            cached.cells_read = cached.format_reads = 0
+            cached.peak_memory = peak_memory()
+            return cached
+
+    wb = open_workbook(path, engine, data_only=True)
+    try:
+        sheets = {
+            name: snapshot_sheet(wb.sheet(name), get_merge_plan(name)).detach()
+            for name in wb.sheet_names
+            if get_merge_handler(name)
+        }
+        extracted = ExtractedWorkbook(wb.name, path, list(wb.sheet_names), sheets)
+    finally:
+        wb.close()
+    extracted.peak_memory = peak_memory()
+
+    if disk_cache:
+        disk_cache.store(digest, engine, extracted)
+    return extracted
+
+
+def default_workers(file_count):
+    """One worker per file, capped at the number of CPUs."""
+    return max(1, min(file_count, os.cpu_count() or 1))
+
+
+def extract_workbooks(
+    file_paths, engine="openpyxl", workers=None, pool=None, disk_cache=None
+):
+    """
+    Extracts every file, yielding (index into file_paths, ExtractedWorkbook)
+    in completion order. Work goes to pool if given, else to a pool of
+    workers processes (None = default_workers). workers=1 or the xlwings
+    engine extracts in-process. disk_cache is an optional ExtractionCache.
+    """
+    if workers is None:
+        workers = default_workers(len(file_paths))
+
+    if engine == "xlwings" or (pool is None and workers <= 1):
+        for idx, path in enumerate(file_paths):
+            yield idx, extract_workbook(path, engine, disk_cache)
+        return
+
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=workers) as own_pool:
+            yield from extract_workbooks(
+                file_paths, engine, pool=own_pool, disk_cache=disk_cache
+            )
+        return
+
+    futures = {
+        pool.submit(extract_workbook, path, engine, disk_cache): idx
+        for idx, path in enumerate(file_paths)
+    }
+    try:
+        for future in iter_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        for future in futures:
+            future.cancel()
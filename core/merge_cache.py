@@ -0,0 +1,67 @@
+"""
+In-process memory of previous merges, for quick re-merges.
+
+A correction cycle usually changes one technician file. Passing the same
+MergeCache to successive merge() calls makes a re-run re-extract only the
+inputs whose content changed (or that are new) and re-merge only the sheets
+whose inputs changed; every other sheet re-applies its remembered writes.
+"""
+
+import hashlib
+import os
+
+# Bytes read at a time when hashing an input file
+HASH_CHUNK = 1 << 20
+
+
+def file_digest(path):
+    """Content hash of a file (BLAKE2b, hex)."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MergeCache:
+    """
+    Extracted workbooks keyed by (path, content hash), and merged sheets
+    keyed by the name and extracted-sheet digest of every input they were
+    merged from plus what the handler read from the output sheet. A resent
+    file therefore only re-merges the sheets whose data actually changed.
+    """
+
+    def __init__(self):
+        self._workbooks = {}  # abs path -> (digest, ExtractedWorkbook)
+        self._sheets = {}  # sheet name -> (key, BufferedOutputSheet, conflicts)
+
+    def workbook(self, path, digest):
+        """The extracted workbook for this path and content, or None."""
+        cached = self._workbooks.get(os.path.abspath(path))
+        if cached and cached[0] == digest:
+            return cached[1]
+        return None
+
+    def store_workbook(self, path, digest, wb):
+        self._workbooks[os.path.abspath(path)] = (digest, wb)
+
+    def sheet(self, sheet_name, key):
+        """(buffer, conflicts) of a sheet merged from the same inputs, or None."""
+        cached = self._sheets.get(sheet_name)
+        if cached and cached[0] == key:
+            return cached[1], cached[2]
+        return None
+
+    def store_sheet(self, sheet_name, key, buffer, conflicts):
+        self._sheets[sheet_name] = (key, buffer, list(conflicts))
+
+    def retain(self, paths):
+        """Forgets extracted workbooks that are no longer among paths."""
+        keep = {os.path.abspath(path) for path in paths}
+        for path in list(self._workbooks):
+            if path not in keep:
+                del self._workbooks[path]
+
+    def clear(self):
+        self._workbooks.clear()
+        self._sheets.clear()
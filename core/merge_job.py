@@ -0,0 +1,112 @@
+"""
+Running a merge in the background.
+
+A MergeJob runs core.merger.merge away from the caller's thread and reports
+back through a queue of events, so a UI can keep its event loop running and
+drain the queue on its own schedule:
+
+- ("progress", percentage, message) for every progress_callback call;
+- ("done", conflicts, metrics) once the merge has been saved, metrics
+  being the run's core.metrics.MergeMetrics.to_dict();
+- ("cancelled", reason, partial) if it was cancelled (see MergeJob.cancel)
+  or ran out of its time_budget;
+- ("error", message) if it failed.
+
+The openpyxl engine runs on a worker thread (merge() already farms the heavy
+work out to processes). xlwings drives Excel over COM, which is tied to the
+thread that initialised it, so that engine runs in a child process of its own.
+"""
+
+import multiprocessing
+import queue
+import threading
+import traceback
+
+from core.cancellation import CancelToken, MergeCancelled
+from core.merger import merge
+
+# Engines whose merge runs in a child process instead of a thread
+PROCESS_ENGINES = ("xlwings",)
+
+
+def run_merge(events, file_paths, output_path, engine, merge_kwargs):
+    """
+    Calls merge() and posts its progress and outcome to events. Runs in the
+    job's thread or process, so it must stay module-level.
+    """
+
+    def report(percentage, message):
+        events.put(("progress", percentage, message))
+
+    try:
+        conflicts, metrics = merge(
+            file_paths,
+            output_path,
+            progress_callback=report,
+            engine=engine,
+            **merge_kwargs,
+        )
+    except MergeCancelled as e:
+        events.put(("cancelled", e.reason, e.partial))
+    except Exception as e:
+        traceback.print_exc()
+        events.put(("error", str(e) or type(e).__name__))
+    else:
+        events.put(("done", list(conflicts), metrics.to_dict()))
+
+
+class MergeJob:
+    """One background merge; see the module docstring."""
+
+    def __init__(self, file_paths, output_path, engine="xlwings", **merge_kwargs):
+        self.file_paths = list(file_paths)
+        self.output_path = output_path
+        self.engine = engine
+        self.in_child_process = engine in PROCESS_ENGINES
+        if self.in_child_process:
+            self.events = multiprocessing.Queue()
+            self.token = CancelToken(multiprocessing.Event())
+        else:
+            self.events = queue.Queue()
+            self.token = CancelToken()
+        self.merge_kwargs = dict(merge_kwargs, cancel=self.token)
+        self.worker = None
+
+    def start(self):
+        args = (
+            self.events,
+            self.file_paths,
+            self.output_path,
+            self.engine,
+            self.merge_kwargs,
+        )
+        if self.in_child_process:
+            self.worker = multiprocessing.Process(target=run_merge, args=args)
+        else:
+            self.worker = threading.Thread(target=run_merge, args=args, daemon=True)
+        self.worker.start()
+        return self
+
+    def cancel(self):
+        """Asks the merge to stop at its next file, sheet or page boundary."""
+        self.token.cancel()
+
+    def is_alive(self):
+        return self.worker is not None and self.worker.is_alive()
+
+    def poll(self):
+        """Events posted since the last poll, without blocking."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        if (
+            not events
+            and self.in_child_process
+            and self.worker.exitcode not in (None, 0)
+        ):
+            # The child died without reporting (crashed or was killed)
+            events.append(("error", f"Merge process exited ({self.worker.exitcode})"))
+        return events
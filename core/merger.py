@@ -1,69 +1,433 @@
-import xlwings as xw
-from config.sheet_definitions import get_merge_handler
-from handlers.handler_base import merge_conflict_log
+from backends import ENGINES, open_workbook
+from backends.memory_backend import MemorySheet
+from concurrent.futures import ProcessPoolExecutor
+from config.sheet_definitions import get_merge_handler, get_merge_plan
+from core.cancellation import (
+    CancelToken,
+    MergeCancelled,
+    cancellation_scope,
+    iter_completed,
+    mark_incomplete,
+)
+from core.extraction import default_workers, extract_workbooks
+from core.merge_cache import file_digest
+from core.metrics import MergeMetrics, peak_memory
+from core.output_buffer import BufferedOutputSheet
+from core.streaming import fold_merge
+from handlers.handler_base import merge_conflict_log, skipped_page_log
+import multiprocessing
 import os
+import time
 
+# What merge() does with the output when it is cancelled
+ON_CANCEL = ("discard", "partial")
 
-def merge(file_paths, output_path, progress_callback=None):
-    output_wb = xw.Book(output_path)
-    input_wbs = []
+# Engines whose workbooks are never handed to a worker pool (COM is tied to
+# the thread that opened Excel)
+IN_PROCESS_ENGINES = ("xlwings",)
+
+# In a merge worker process: the merge's shared cancel flag (init_merge_worker)
+_worker_cancel_event = None
+
+# Fixed per-page overhead of a handler, in plan cells (anchor checks, stacking)
+PAGE_COST = 25
+
+
+def merge_cost(plan, file_count):
+    """Rough relative cost of merging one sheet, used to schedule big ones first."""
+    return (len(plan.coords) + PAGE_COST * plan.page_count) * file_count
+
+
+def output_base_sheet(output_ws, plan):
+    """
+    In-memory copy of what a handler may read back from the output sheet
+    (the technician column over the plan's rows), so the handler can run
+    away from the real workbook.
+    """
+    base = MemorySheet(output_ws.name)
+    if plan.tech_col and plan.coords:
+        min_row, max_row = plan.coords[0][0], plan.coords[-1][0]
+        column = output_ws.read_block(min_row, plan.tech_col, max_row, plan.tech_col)
+        for offset, (value,) in enumerate(column):
+            if value is not None:
+                base.values[(min_row + offset, plan.tech_col)] = value
+    return base
+
+
+def init_merge_worker(cancel_event):
+    """Pool initializer: hands each worker the merge's shared cancel flag."""
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+
+
+def merge_sheet_job(sheet_name, ws_file_list, base_ws, deadline=None):
+    """
+    Runs one sheet handler against a detached output buffer. Returns the
+    buffer (pending writes), the conflicts the handler logged and its stats
+    (seconds, pages skipped, peak memory of the process that ran it). Runs
+    in the merge worker processes, so it must stay module-level. A worker
+    can't see the caller's token, so it checks the pool's shared cancel flag
+    and the merge's deadline instead; in-process the caller's cancellation
+    scope applies.
+    """
+    logged = len(merge_conflict_log)
+    skipped = len(skipped_page_log)
+    output_ws = BufferedOutputSheet(base_ws)
+    start = time.perf_counter()
+    if _worker_cancel_event is None and deadline is None:
+        get_merge_handler(sheet_name)(ws_file_list, output_ws)
+    else:
+        token = CancelToken(_worker_cancel_event, deadline)
+        with cancellation_scope(token):
+            get_merge_handler(sheet_name)(ws_file_list, output_ws)
+    seconds = time.perf_counter() - start
+    conflicts = merge_conflict_log[logged:]
+    del merge_conflict_log[logged:]
+    pages_skipped = len(skipped_page_log) - skipped
+    del skipped_page_log[skipped:]
+    return output_ws, conflicts, (seconds, pages_skipped, peak_memory())
+
+
+def merge(
+    file_paths,
+    output_path,
+    progress_callback=None,
+    engine="xlwings",
+    workers=None,
+    streaming=False,
+    cache=None,
+    disk_cache=None,
+    cancel=None,
+    time_budget=None,
+    on_cancel="discard",
+    metrics_path=None,
+):
+    """
+    Merges the technician workbooks in file_paths into output_path and
+    returns (conflicts, metrics): this run's conflict log (one sheet name
+    per conflict) and its core.metrics.MergeMetrics. Given metrics_path,
+    the metrics of every run, failed or not, are appended to that JSONL file.
+
+    workers sets how many processes extract the input files and merge the
+    sheets (None = one per job up to the CPU count, 1 = all in-process).
+    Only the calling thread touches the output workbook. streaming=True
+    keeps a single input workbook open at a time instead (see
+    core.streaming); workers and cache are then ignored. Passing the same
+    core.merge_cache.MergeCache to successive runs re-extracts and
+    re-merges only what changed. disk_cache (a core.disk_cache.ExtractionCache)
+    persists extracted inputs across processes.
+
+    cancel (a core.cancellation.CancelToken) and time_budget (seconds) stop
+    the merge between files, sheets and pages by raising MergeCancelled.
+    on_cancel="discard" then closes the output without saving it, so the
+    file is untouched; "partial" saves the sheets merged so far together
+    with a "MERGE INCOMPLETE" sheet listing what is missing. The exception
+    carries the run's metrics.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown merge engine '{engine}', expected one of {ENGINES}")
+    if on_cancel not in ON_CANCEL:
+        raise ValueError(
+            f"Unknown on_cancel '{on_cancel}', expected one of {ON_CANCEL}"
+        )
+
+    token = cancel or CancelToken()
+    if time_budget is not None:
+        token = token.with_budget(time_budget)
+
+    del merge_conflict_log[:]
+    del skipped_page_log[:]
+    metrics = MergeMetrics(
+        len(file_paths), engine, "streaming" if streaming else "snapshot"
+    )
+
+    try:
+        with cancellation_scope(token):
+            if streaming:
+                fold_merge(
+                    file_paths,
+                    output_path,
+                    progress_callback,
+                    engine,
+                    on_cancel,
+                    metrics,
+                )
+            else:
+                _merge(
+                    file_paths,
+                    output_path,
+                    progress_callback,
+                    engine,
+                    workers,
+                    cache,
+                    disk_cache,
+                    token,
+                    on_cancel,
+                    metrics,
+                )
+    except MergeCancelled as e:
+        e.metrics = _finish(metrics, "cancelled", metrics_path)
+        raise
+    except Exception:
+        _finish(metrics, "failed", metrics_path)
+        raise
+
+    return list(merge_conflict_log), _finish(metrics, "ok", metrics_path)
+
+
+def _finish(metrics, status, metrics_path):
+    metrics.finish(status)
+    if metrics_path:
+        try:
+            metrics.append_jsonl(metrics_path)
+        except OSError as e:
+            print(f"⚠️ Could not write merge metrics to {metrics_path}: {e}")
+    return metrics
+
+
+def _merge(
+    file_paths,
+    output_path,
+    progress_callback,
+    engine,
+    workers,
+    cache,
+    disk_cache,
+    token,
+    on_cancel,
+    metrics,
+):
+    """merge() through snapshots of every input, in the active cancel scope."""
+    if workers is None:
+        workers = default_workers(max(len(file_paths), 2))
+    pool = cancel_event = None
+    if workers > 1 and engine not in IN_PROCESS_ENGINES:
+        cancel_event = multiprocessing.Event()
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_merge_worker,
+            initargs=(cancel_event,),
+        )
+
+    output_wb = None
+    finished = False
+    handler_sheet_names = []
+    merged_sheets = []
+    try:
+        with metrics.phase("template"):
+            output_wb = open_workbook(output_path, engine)
+        _merge_into(
+            output_wb,
+            file_paths,
+            progress_callback,
+            engine,
+            workers,
+            pool,
+            cache,
+            disk_cache,
+            token,
+            handler_sheet_names,
+            merged_sheets,
+            metrics,
+        )
+        output_wb.close()
+        output_wb = None
+        finished = True
+    except MergeCancelled as e:
+        if output_wb is not None and on_cancel == "partial":
+            skipped = [
+                name for name in handler_sheet_names if name not in merged_sheets
+            ]
+            mark_incomplete(output_wb, e.reason, merged_sheets, skipped)
+            output_wb.save()
+            e.partial = True
+        raise
+    finally:
+        # Any failure leaves the output closed without saving
+        if output_wb is not None:
+            output_wb.close()
+        if pool is not None and finished:
+            pool.shutdown()
+        elif pool is not None:
+            # Stop running sheet jobs at their next page and don't wait for
+            # the workers; they exit once their current job returns
+            cancel_event.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _merge_into(
+    output_wb,
+    file_paths,
+    progress_callback,
+    engine,
+    workers,
+    pool,
+    cache,
+    disk_cache,
+    token,
+    handler_sheet_names,
+    merged_sheets,
+    metrics,
+):
+    """
+    The body of merge(), writing into the open output_wb. Fills in
+    handler_sheet_names and merged_sheets as it goes, so a cancelled merge
+    knows what it has written, and metrics with where the time went.
+    """
+    input_wbs = [None] * len(file_paths)
     file_open_steps = len(file_paths)
 
     if progress_callback:
         progress_callback(0, "Starting merge...")
 
-    # Open files (first 50%)
-    for idx, path in enumerate(file_paths):
+    def opened(done, idx, verb):
         if progress_callback:
-            pct = ((idx + 1) / file_open_steps) * 50
-            progress_callback(pct, f"Opening file: {os.path.basename(path)}")
-        wb = xw.Book(path)
-        input_wbs.append(wb)
+            pct = (done / file_open_steps) * 50
+            name = os.path.basename(file_paths[idx])
+            progress_callback(pct, f"{verb} file: {name}")
 
-    # Get all handler-eligible sheets
-    all_sheet_names = set()
-    for wb in input_wbs:
-        all_sheet_names.update(sheet.name for sheet in wb.sheets)
+    # Extract files (first 50%), in whatever order they finish; input_wbs
+    # keeps the selection order, which decides who wins a cell
+    digests = [file_digest(path) for path in file_paths] if cache else None
+    pending = []
+    for idx, path in enumerate(file_paths):
+        wb = cache.workbook(path, digests[idx]) if cache else None
+        if wb is None:
+            pending.append(idx)
+        else:
+            input_wbs[idx] = wb
+            opened(idx + 1 - len(pending), idx, "Reused")
 
-    handler_sheet_names = sorted(
-        [name for name in all_sheet_names if get_merge_handler(name)]
-    )
-    sheet_merge_steps = len(handler_sheet_names)
-
-    # Merge sheets (next 40%)
-    for idx, sheet_name in enumerate(handler_sheet_names):
-        handler = get_merge_handler(sheet_name)
-        if handler:
-            step_pct = ((idx + 1) / sheet_merge_steps) * 40
-            pct = 50 + step_pct  # 50–90%
-            if progress_callback:
-                progress_callback(pct, f"Merging sheet: {sheet_name}")
+    done = metrics.files_reused = len(file_paths) - len(pending)
+    with metrics.phase("open"):
+        extracted = extract_workbooks(
+            [file_paths[idx] for idx in pending], engine, workers, pool, disk_cache
+        )
+        for done, (k, wb) in enumerate(extracted, start=done + 1):
+            idx = pending[k]
+            input_wbs[idx] = wb
+            metrics.add_reads(wb.cells_read, wb.format_reads)
+            if pool is not None:
+                metrics.add_worker_peak(wb.peak_memory)
+            if cache:
+                cache.store_workbook(file_paths[idx], digests[idx], wb)
+            opened(done, idx, "Opened")
+            token.check()
+    if cache:
+        cache.retain(file_paths)
+
+    with metrics.phase("sheets"):
+        # Get all handler-eligible sheets
+        all_sheet_names = set()
+        for wb in input_wbs:
+            all_sheet_names.update(wb.sheet_names)
+
+        handler_sheet_names.extend(
+            sorted([name for name in all_sheet_names if get_merge_handler(name)])
+        )
+        sheet_merge_steps = len(handler_sheet_names)
 
+        jobs = {}
+        for sheet_name in handler_sheet_names:
+            contributors = [
+                idx for idx, wb in enumerate(input_wbs) if sheet_name in wb.sheet_names
+            ]
             ws_file_list = [
-                (wb.sheets[sheet_name], wb.name)
-                for wb in input_wbs
-                if sheet_name in [s.name for s in wb.sheets]
+                (input_wbs[idx].sheet(sheet_name), input_wbs[idx].name)
+                for idx in contributors
             ]
-
             output_ws = (
-                output_wb.sheets[sheet_name]
-                if sheet_name in [s.name for s in output_wb.sheets]
-                else output_wb.sheets.add(name=sheet_name)
+                output_wb.sheet(sheet_name)
+                if sheet_name in output_wb.sheet_names
+                else output_wb.add_sheet(sheet_name)
+            )
+            base_ws = output_base_sheet(output_ws, get_merge_plan(sheet_name))
+            key = None
+            if cache:
+                key = (
+                    tuple(
+                        (input_wbs[idx].name, input_wbs[idx].sheet_digests[sheet_name])
+                        for idx in contributors
+                    ),
+                    tuple(sorted(base_ws.values.items())),
+                )
+            jobs[sheet_name] = (ws_file_list, output_ws, base_ws, key)
+
+        # Merge sheets (next 40%); this thread is the only writer
+        def write_sheet(sheet_name, buffer, conflicts, stats=None):
+            _, output_ws, _, key = jobs[sheet_name]
+            if cache:
+                cache.store_sheet(sheet_name, key, buffer, conflicts)
+            written = buffer.pending_counts()
+            start = time.perf_counter()
+            buffer.flush(output_ws, keep=bool(cache))
+            merge_conflict_log.extend(conflicts)
+
+            seconds, pages_skipped, peak = stats or (0.0, 0, None)
+            if pool is not None:
+                metrics.add_worker_peak(peak)
+            metrics.add_sheet(
+                sheet_name,
+                written,
+                conflicts,
+                seconds,
+                time.perf_counter() - start,
+                pages_skipped,
+                cached=stats is None,
             )
 
-            handler(ws_file_list, output_ws)
+            merged_sheets.append(sheet_name)
+            if progress_callback:
+                pct = 50 + (len(merged_sheets) / sheet_merge_steps) * 40  # 50–90%
+                progress_callback(pct, f"Merged sheet: {sheet_name}")
+
+        to_merge = []
+        for sheet_name in handler_sheet_names:
+            cached = cache.sheet(sheet_name, jobs[sheet_name][3]) if cache else None
+            if cached:
+                write_sheet(sheet_name, *cached)
+            else:
+                to_merge.append(sheet_name)
+
+        # Longest jobs first, so the big multi-page sheets don't end up last
+        schedule = sorted(
+            to_merge,
+            key=lambda name: merge_cost(get_merge_plan(name), len(jobs[name][0])),
+            reverse=True,
+        )
+
+        if pool is None:
+            for sheet_name in schedule:
+                token.check()
+                ws_file_list, _, base_ws, _ = jobs[sheet_name]
+                write_sheet(
+                    sheet_name, *merge_sheet_job(sheet_name, ws_file_list, base_ws)
+                )
+        else:
+            futures = {
+                pool.submit(
+                    merge_sheet_job,
+                    sheet_name,
+                    jobs[sheet_name][0],
+                    jobs[sheet_name][2],
+                    token.deadline,
+                ): sheet_name
+                for sheet_name in schedule
+            }
+            for future in iter_completed(futures):
+                write_sheet(futures[future], *future.result())
+
+    token.check()
 
     # Saving and closing (last 10%)
     if progress_callback:
         progress_callback(95, "Saving merged workbook...")
 
-    output_wb.save()
+    with metrics.phase("save"):
+        output_wb.save()
 
     if progress_callback:
         progress_callback(100, "Finalizing...")
 
-    output_wb.close()
     for wb in input_wbs:
         wb.close()
-
-    return merge_conflict_log
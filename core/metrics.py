@@ -0,0 +1,186 @@
+"""
+Per-run merge metrics.
+
+Every merge() call fills in a MergeMetrics and returns it next to the
+conflict log:
+
+- phases: wall time of each phase, in seconds ("template" opens the
+  output, "open" extracts the inputs, "sheets" merges and writes the
+  handler sheets, "save" saves the output, "total" is the whole call);
+- sheets: per handler sheet, the handler's own run time, the time spent
+  writing its output, cells and comments written, conflicts, pages skipped
+  (anchored pages no file had data on) and whether it came from a
+  MergeCache;
+- totals: input cells read, input cells whose format was read, cells and
+  comments written, conflicts and pages skipped;
+- peak memory, in bytes, of the merging process and of the busiest worker
+  process (peaks are per process lifetime, so a long-lived process reports
+  the largest merge it has run).
+
+Inputs reused from a MergeCache or loaded from an ExtractionCache were read
+by an earlier run and count no cells here. to_dict() is JSON-ready and
+append_jsonl() adds it as one line to a local log, so runs can be compared
+over time.
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Where the GUI logs its runs unless V8_MERGER_METRICS says otherwise
+METRICS_FILENAME = "metrics.jsonl"
+
+
+def default_metrics_path():
+    """
+    V8_MERGER_METRICS, else metrics.jsonl in the per-user v8-merger folder.
+    Setting V8_MERGER_METRICS to an empty string turns the log off (None).
+    """
+    configured = os.environ.get("V8_MERGER_METRICS")
+    if configured is not None:
+        return configured or None
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(base, "v8-merger", METRICS_FILENAME)
+
+
+def peak_memory():
+    """Peak resident memory of this process so far in bytes, or None."""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(
+            process, ctypes.byref(counters), counters.cb
+        ):
+            return None
+        return counters.PeakWorkingSetSize
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MergeMetrics:
+    """What one merge() call did and where its time went."""
+
+    def __init__(self, file_count=0, engine=None, mode="snapshot"):
+        self.started = time.time()
+        self.engine = engine
+        self.mode = mode  # "snapshot" (merge) or "streaming" (fold_merge)
+        self.status = "running"
+        self.files = file_count
+        self.files_reused = 0
+        self.phases = {}
+        self.sheets = {}
+        self.cells_read = 0
+        self.format_reads = 0
+        self.peak_memory = None
+        self.worker_peak_memory = None
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        """Adds the time spent in the with-block to phase name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def add_reads(self, cells, formats):
+        self.cells_read += cells
+        self.format_reads += formats
+
+    def add_worker_peak(self, peak):
+        if peak is not None:
+            self.worker_peak_memory = max(self.worker_peak_memory or 0, peak)
+
+    def add_sheet(
+        self,
+        name,
+        written,
+        conflicts,
+        handler_seconds=0.0,
+        write_seconds=0.0,
+        pages_skipped=0,
+        cached=False,
+    ):
+        """
+        Records one written sheet. written is its output buffer's
+        pending_counts() from before the flush.
+        """
+        cells, comments = written
+        self.sheets[name] = {
+            "handler_seconds": round(handler_seconds, 4),
+            "write_seconds": round(write_seconds, 4),
+            "cells_written": cells,
+            "comments_written": comments,
+            "conflicts": len(conflicts),
+            "pages_skipped": pages_skipped,
+            "cached": cached,
+        }
+
+    def finish(self, status):
+        """Stamps the outcome, total time and peak memory of the run."""
+        self.status = status
+        self.phases["total"] = time.perf_counter() - self._start
+        self.peak_memory = peak_memory()
+        return self
+
+    def total(self, key):
+        return sum(sheet[key] for sheet in self.sheets.values())
+
+    def to_dict(self):
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "status": self.status,
+            "engine": self.engine,
+            "mode": self.mode,
+            "files": self.files,
+            "files_reused": self.files_reused,
+            "phases": {name: round(s, 4) for name, s in self.phases.items()},
+            "cells_read": self.cells_read,
+            "format_reads": self.format_reads,
+            "cells_written": self.total("cells_written"),
+            "comments_written": self.total("comments_written"),
+            "conflicts": self.total("conflicts"),
+            "pages_skipped": self.total("pages_skipped"),
+            "peak_memory": self.peak_memory,
+            "worker_peak_memory": self.worker_peak_memory,
+            "sheets": dict(sorted(self.sheets.items())),
+        }
+
+    def append_jsonl(self, path):
+        """Appends to_dict() to path as one JSON line."""
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_dict(), default=str) + "\n")
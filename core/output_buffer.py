@@ -0,0 +1,161 @@
+"""
+Buffered writes to the merged output sheet.
+
+Handlers write the output one cell at a time (value, font, fill, comment).
+BufferedOutputSheet collects those writes for the whole handler run and
+flush() applies them as rectangular blocks: every run of cells that share a
+fill or font becomes one block operation, and neighbouring values are
+written as one 2-D range. On the 22.2 / 22.5 sheets that turns hundreds of
+output round trips into a few dozen.
+"""
+
+from collections import defaultdict
+
+
+def coalesce_cells(cells):
+    """
+    Groups (row, col) cells into rectangles, returned as
+    (min_row, min_col, max_row, max_col). Cells are first joined into vertical
+    runs per column, then runs spanning the same rows in adjacent columns are
+    joined into one rectangle.
+    """
+    rows_by_col = defaultdict(list)
+    for row, col in cells:
+        rows_by_col[col].append(row)
+
+    strips = []  # (min_row, max_row, col)
+    for col, rows in rows_by_col.items():
+        rows.sort()
+        start = prev = rows[0]
+        for row in rows[1:]:
+            if row != prev + 1:
+                strips.append((start, prev, col))
+                start = row
+            prev = row
+        strips.append((start, prev, col))
+
+    blocks = []
+    strips.sort()
+    for min_row, max_row, col in strips:
+        if blocks:
+            b_min_row, b_min_col, b_max_row, b_max_col = blocks[-1]
+            if (b_min_row, b_max_row) == (min_row, max_row) and b_max_col == col - 1:
+                blocks[-1] = (b_min_row, b_min_col, b_max_row, col)
+                continue
+        blocks.append((min_row, col, max_row, col))
+    return blocks
+
+
+class BufferedOutputSheet:
+    """
+    Output sheet backend that records writes and applies them on flush().
+    Reads see pending writes first, so handlers can read back what they
+    wrote earlier in the run (e.g. the technician column).
+    """
+
+    def __init__(self, ws):
+        self._ws = ws
+        self.name = ws.name
+        self.values = {}
+        self.fonts = {}
+        self.fills = {}
+        self.comments = {}
+        self.hidden_columns = set()
+
+    def get_value(self, row, col):
+        if (row, col) in self.values:
+            return self.values[(row, col)]
+        return self._ws.get_value(row, col)
+
+    def set_value(self, row, col, value):
+        self.values[(row, col)] = value
+
+    def read_block(self, min_row, min_col, max_row, max_col):
+        return [
+            [self.get_value(row, col) for col in range(min_col, max_col + 1)]
+            for row in range(min_row, max_row + 1)
+        ]
+
+    def get_format(self, row, col):
+        return self._ws.get_format(row, col)
+
+    def get_fill(self, row, col):
+        if (row, col) in self.fills:
+            return self.fills[(row, col)]
+        return self._ws.get_fill(row, col)
+
+    def set_font(self, row, col, bold=None, color=None):
+        cur_bold, cur_color = self.fonts.get((row, col), (None, None))
+        self.fonts[(row, col)] = (
+            cur_bold if bold is None else bold,
+            cur_color if color is None else color,
+        )
+
+    def set_fill(self, row, col, color):
+        self.fills[(row, col)] = color
+
+    def set_comment(self, row, col, text):
+        self.comments[(row, col)] = text
+
+    def hide_column(self, col):
+        self.hidden_columns.add(col)
+
+    def pending_counts(self):
+        """(cells with a pending value, font or fill; pending comments)."""
+        cells = self.values.keys() | self.fonts.keys() | self.fills.keys()
+        return len(cells), len(self.comments)
+
+    def flush(self, ws=None, keep=False):
+        """
+        Applies all pending writes to ws (default: the wrapped sheet) and
+        clears them, unless keep is set (to apply them again later).
+        """
+        ws = self._ws if ws is None else ws
+
+        for min_row, min_col, max_row, max_col in coalesce_cells(self.values):
+            rows = [
+                [self.values[(row, col)] for col in range(min_col, max_col + 1)]
+                for row in range(min_row, max_row + 1)
+            ]
+            ws.write_block(min_row, min_col, rows)
+
+        for (bold, color), cells in _group_by_value(self.fonts).items():
+            for block in coalesce_cells(cells):
+                try:
+                    ws.set_font_block(*block, bold=bold, color=color)
+                except Exception as e:
+                    print(f"⚠️ Font error on block {block}: {e}")
+
+        for color, cells in _group_by_value(self.fills).items():
+            for block in coalesce_cells(cells):
+                try:
+                    ws.set_fill_block(*block, color)
+                except Exception as e:
+                    print(f"⚠️ Fill error on block {block}: {e}")
+
+        for (row, col), text in self.comments.items():
+            try:
+                ws.set_comment(row, col, text)
+            except Exception as e:
+                print(f"❌ Failed to write comment at row {row}, col {col}: {e}")
+
+        for col in sorted(self.hidden_columns):
+            try:
+                ws.hide_column(col)
+            except Exception as e:
+                print(f"⚠️ Could not hide column {col}: {e}")
+
+        if keep:
+            return
+        self.values.clear()
+        self.fonts.clear()
+        self.fills.clear()
+        self.comments.clear()
+        self.hidden_columns.clear()
+
+
+def _group_by_value(cells):
+    groups = defaultdict(list)
+    for coord, value in cells.items():
+        groups[value].append(coord)
+    return groups
@@ -0,0 +1,478 @@
+"""
+Local HTTP merge service.
+
+    python -m core.service [--port 8765] [--workers 2] [--queue 8]
+
+Serves on 127.0.0.1 only, using nothing beyond the standard library.
+
+POST /merge takes either:
+
+- a JSON body referencing files on local disk:
+      {"inputs": ["/path/tech-a.xlsx", ...], "template": "/path/template.xlsx",
+       "output": "site/merged.xlsx", "engine": "openpyxl", "time_budget": 60}
+  template, output, engine and time_budget are optional. output is a path
+  inside the service's --output-dir and is refused when none is set;
+- or multipart/form-data uploads: one or more "inputs" files (merged in the
+  order sent), an optional "template" file and optional "engine" and
+  "time_budget" fields. Uploads are streamed to the work folder, never
+  held in memory whole.
+
+The reply is a JSON summary (core.batch.run_site's, plus an "id"). Unless an
+output was named, the merged workbook is kept in the service's work folder
+and can be fetched from GET /results/<id>/merged.xlsx; the summary stays at
+GET /results/<id>. The last --keep results are kept.
+
+Merges run on a pool of --workers processes, each merging in-process. At
+most --queue further requests wait for a worker; beyond that the service
+answers 503 with Retry-After straight away instead of piling up work. The
+workers stay up between requests with every handler plan compiled, so a
+request pays only for its own files.
+
+GET /health reports the pool size and how many requests are in flight.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from email.parser import BytesHeaderParser
+from email.policy import HTTP
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backends import ENGINES
+from config.sheet_definitions import SHEET_MERGE_HANDLERS, get_merge_plan, plan_version
+from config.templates import default_template_path
+from core.batch import DEFAULT_ENGINE, run_site
+
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE = 8
+DEFAULT_KEEP = 50
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+MAX_JSON_BYTES = 1024 * 1024
+MAX_FIELD_BYTES = 64 * 1024
+MAX_PART_HEADER_BYTES = 16 * 1024
+CHUNK_BYTES = 64 * 1024
+
+# Reply status per core.batch.run_site status
+RESULT_STATUS = {
+    "ok": HTTPStatus.OK,
+    "cancelled": HTTPStatus.GATEWAY_TIMEOUT,
+    "failed": HTTPStatus.INTERNAL_SERVER_ERROR,
+}
+
+RESULT_PATH = re.compile(r"^/results/([0-9a-f]{32})(/merged\.xlsx)?$")
+
+
+def warm_worker():
+    """Pool initializer: compiles every handler's plan once per worker."""
+    for sheet_name in SHEET_MERGE_HANDLERS:
+        get_merge_plan(sheet_name)
+    plan_version()
+
+
+class MultipartReader:
+    """
+    Reads a multipart/form-data body from a stream in chunks, so a part's
+    content can be written out as it arrives.
+    """
+
+    def __init__(self, stream, length, boundary):
+        self.stream = stream
+        self.remaining = length
+        # The leading CRLF lets the first delimiter match like the others
+        self.buffer = bytearray(b"\r\n")
+        self.delimiter = b"\r\n--" + boundary.encode("latin-1")
+
+    def fill(self):
+        if not self.remaining:
+            raise ValueError("Truncated multipart body")
+        chunk = self.stream.read(min(CHUNK_BYTES, self.remaining))
+        if not chunk:
+            raise ValueError("Truncated multipart body")
+        self.remaining -= len(chunk)
+        self.buffer += chunk
+
+    def read_until(self, marker, write, limit=None):
+        """Passes everything before marker to write and consumes the marker."""
+        written = 0
+        while True:
+            idx = self.buffer.find(marker)
+            end = idx if idx >= 0 else len(self.buffer) - (len(marker) - 1)
+            if end > 0:
+                written += end
+                if limit is not None and written > limit:
+                    raise ValueError("Multipart part too large")
+                write(bytes(self.buffer[:end]))
+                del self.buffer[:end]
+            if idx >= 0:
+                del self.buffer[: len(marker)]
+                return
+            self.fill()
+
+    def peek(self, size):
+        while len(self.buffer) < size:
+            self.fill()
+        return bytes(self.buffer[:size])
+
+    def parts(self, open_part):
+        """
+        Reads every part. open_part(name, filename) returns a write callable
+        for the part's content and the most bytes it accepts (None: any).
+        """
+        self.read_until(self.delimiter, lambda data: None)  # preamble
+        while self.peek(2) != b"--":
+            raw = bytearray()
+            self.read_until(b"\r\n\r\n", raw.extend, MAX_PART_HEADER_BYTES)
+            headers = BytesHeaderParser(policy=HTTP).parsebytes(
+                bytes(raw).lstrip(b"\r\n") + b"\r\n\r\n"
+            )
+            name = headers.get_param("name", header="content-disposition")
+            write, limit = open_part(name, headers.get_filename())
+            self.read_until(self.delimiter, write, limit)
+
+
+class MergeService:
+    """The pool, admission control and result storage behind the handler."""
+
+    def __init__(
+        self,
+        workers=2,
+        queue=DEFAULT_QUEUE,
+        work_dir=None,
+        keep=DEFAULT_KEEP,
+        cache_dir=None,
+        template=None,
+        output_dir=None,
+    ):
+        self.workers = workers
+        self.capacity = workers + queue
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=warm_worker)
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="v8-merge-service-")
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.keep = keep
+        self.cache_dir = cache_dir
+        self.template = template or default_template_path()
+        self.output_dir = output_dir
+        self.results = []  # ids with a result folder, oldest first
+
+    def try_admit(self):
+        """Takes a slot if one is free; False means the caller should back off."""
+        if not self.slots.acquire(blocking=False):
+            return False
+        with self.lock:
+            self.in_flight += 1
+        return True
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+        self.slots.release()
+
+    def job_dir(self, job_id):
+        return os.path.join(self.work_dir, job_id)
+
+    def output_path(self, name):
+        """Resolves a request's output name; it must stay inside output_dir."""
+        if not self.output_dir:
+            raise ValueError("This service keeps results itself; omit 'output'")
+        root = os.path.realpath(self.output_dir)
+        path = os.path.realpath(os.path.join(root, name))
+        if path == root or os.path.commonpath([root, path]) != root:
+            raise ValueError(
+                f"Output must be inside the service's output folder: {name}"
+            )
+        if not path.lower().endswith(".xlsx"):
+            raise ValueError(f"Output must be an .xlsx file: {name}")
+        return path
+
+    def run(self, job_id, inputs, template, output, engine, time_budget):
+        """Copies template to output, merges on the pool and waits."""
+        site = {
+            "name": job_id,
+            "template": template,
+            "inputs": inputs,
+            "output": output,
+            "engine": engine,
+        }
+        future = self.pool.submit(run_site, site, 1, time_budget, self.cache_dir)
+        return dict(future.result(), id=job_id)
+
+    def store_result(self, job_id, result):
+        with open(os.path.join(self.job_dir(job_id), "summary.json"), "w") as f:
+            json.dump(result, f, indent=2)
+        with self.lock:
+            self.results.append(job_id)
+            expired = self.results[: -self.keep] if self.keep else []
+            self.results = self.results[len(expired) :]
+        for old_id in expired:
+            shutil.rmtree(self.job_dir(old_id), ignore_errors=True)
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+class MergeRequestHandler(BaseHTTPRequestHandler):
+    server_version = "V8MergeService/1"
+    service = None  # set by make_server
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} {format % args}")
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status, message, headers=None):
+        self.send_json(status, {"error": message}, headers)
+
+    def do_GET(self):
+        service = self.service
+        if self.path == "/health":
+            self.send_json(
+                HTTPStatus.OK,
+                {
+                    "status": "ok",
+                    "workers": service.workers,
+                    "capacity": service.capacity,
+                    "in_flight": service.in_flight,
+                    "plan_version": plan_version(),
+                },
+            )
+            return
+
+        match = RESULT_PATH.match(self.path)
+        if not match:
+            self.send_error_json(HTTPStatus.NOT_FOUND, "Not found")
+            return
+        job_dir = service.job_dir(match.group(1))
+        if match.group(2):
+            path = os.path.join(job_dir, "merged.xlsx")
+            content_type = (
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+        else:
+            path = os.path.join(job_dir, "summary.json")
+            content_type = "application/json"
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self.send_error_json(HTTPStatus.NOT_FOUND, "No such result")
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path != "/merge":
+            self.send_error_json(HTTPStatus.NOT_FOUND, "Not found")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        is_json = self.headers.get("Content-Type", "").startswith("application/json")
+        if length > (MAX_JSON_BYTES if is_json else MAX_UPLOAD_BYTES):
+            self.send_error_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Upload too big")
+            return
+
+        service = self.service
+        # Backpressure: refuse before reading the body when the queue is full
+        if not service.try_admit():
+            self.send_error_json(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                "Merge queue is full, retry later",
+                {"Retry-After": "5"},
+            )
+            return
+        job_id = uuid.uuid4().hex
+        try:
+            try:
+                job = self.parse_job(job_id, length)
+            except (ValueError, TypeError, OSError) as e:
+                shutil.rmtree(service.job_dir(job_id), ignore_errors=True)
+                self.send_error_json(HTTPStatus.BAD_REQUEST, str(e))
+                return
+
+            inputs, template, output, engine, time_budget = job
+            keep_result = output is None
+            if keep_result:
+                output = os.path.join(service.job_dir(job_id), "merged.xlsx")
+
+            start = time.perf_counter()
+            result = service.run(job_id, inputs, template, output, engine, time_budget)
+            result["wall"] = round(time.perf_counter() - start, 3)
+            if keep_result:
+                job_dir = service.job_dir(job_id)
+                shutil.rmtree(os.path.join(job_dir, "inputs"), ignore_errors=True)
+                if template.startswith(job_dir):
+                    os.remove(template)
+                if result["status"] == "ok":
+                    result["workbook"] = f"/results/{job_id}/merged.xlsx"
+                service.store_result(job_id, result)
+            else:
+                shutil.rmtree(service.job_dir(job_id), ignore_errors=True)
+        finally:
+            service.release()
+
+        self.send_json(RESULT_STATUS[result["status"]], result)
+
+    def parse_job(self, job_id, length):
+        """
+        Reads the request body into (inputs, template path, output, engine,
+        time_budget); output is None when the service should keep the result.
+        """
+        service = self.service
+        content_type = self.headers.get("Content-Type", "")
+
+        if content_type.startswith("application/json"):
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("The JSON body must be an object")
+            paths = request.get("inputs", [])
+            if not isinstance(paths, list) or not all(
+                isinstance(path, str) for path in paths
+            ):
+                raise ValueError("'inputs' must be a list of paths")
+            inputs = [os.path.abspath(path) for path in paths]
+            for path in inputs:
+                if not os.path.isfile(path):
+                    raise ValueError(f"Input not found: {path}")
+            template = request.get("template") or service.template
+            output = request.get("output")
+            if output is not None:
+                if not isinstance(output, str):
+                    raise ValueError("'output' must be a path")
+                output = service.output_path(output)
+            fields = request
+        elif content_type.startswith("multipart/form-data"):
+            boundary = self.headers.get_param("boundary")
+            if not boundary:
+                raise ValueError("Malformed multipart body")
+            job_dir = service.job_dir(job_id)
+            inputs_dir = os.path.join(job_dir, "inputs")
+            os.makedirs(inputs_dir, exist_ok=True)
+            inputs, template, fields = [], None, {}
+            files = []
+
+            def open_part(name, filename):
+                nonlocal template
+                if name == "inputs" and filename:
+                    path = os.path.join(inputs_dir, os.path.basename(filename))
+                    if path in inputs:
+                        raise ValueError(f"Duplicate input: {filename}")
+                    inputs.append(path)
+                elif name == "template" and filename:
+                    path = template = os.path.join(job_dir, "template.xlsx")
+                elif name:
+                    value = fields[name] = bytearray()
+                    return value.extend, MAX_FIELD_BYTES
+                else:
+                    return (lambda data: None), None
+                f = open(path, "wb")
+                files.append(f)
+                return f.write, None
+
+            try:
+                MultipartReader(self.rfile, length, boundary).parts(open_part)
+            finally:
+                for f in files:
+                    f.close()
+            fields = {name: bytes(value).decode() for name, value in fields.items()}
+            template = template or service.template
+            output = None
+        else:
+            raise ValueError("Send application/json or multipart/form-data")
+
+        if not inputs:
+            raise ValueError("No input workbooks given")
+        if not isinstance(template, str) or not os.path.isfile(template):
+            raise ValueError(f"Template not found: {template}")
+        engine = fields.get("engine") or DEFAULT_ENGINE
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown merge engine: {engine}")
+        time_budget = fields.get("time_budget")
+        time_budget = float(time_budget) if time_budget not in (None, "") else None
+        return inputs, template, output, engine, time_budget
+
+
+def make_server(port=DEFAULT_PORT, **options):
+    """A ThreadingHTTPServer on 127.0.0.1 bound to a new MergeService."""
+    service = MergeService(**options)
+    handler = type("Handler", (MergeRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m core.service",
+        description="Serve V8 merges over HTTP on localhost.",
+    )
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--workers", type=int, default=max(1, (os.cpu_count() or 1) // 2)
+    )
+    parser.add_argument(
+        "--queue",
+        type=int,
+        default=DEFAULT_QUEUE,
+        help="requests that may wait for a worker before new ones get 503",
+    )
+    parser.add_argument("--work-dir", help="where uploads and results are kept")
+    parser.add_argument(
+        "--keep", type=int, default=DEFAULT_KEEP, help="results kept for download"
+    )
+    parser.add_argument("--template", help="default template for requests")
+    parser.add_argument(
+        "--output-dir", help="folder JSON requests may name an 'output' in"
+    )
+    parser.add_argument(
+        "--cache-dir", help="extraction cache folder ('' disables the cache)"
+    )
+    args = parser.parse_args(argv)
+
+    server = make_server(
+        args.port,
+        workers=args.workers,
+        queue=args.queue,
+        work_dir=args.work_dir,
+        keep=args.keep,
+        cache_dir=args.cache_dir,
+        template=args.template,
+        output_dir=args.output_dir,
+    )
+    print(f"Serving merges on http://127.0.0.1:{server.server_port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    from multiprocessing import freeze_support
+
+    freeze_support()
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Bulk per-sheet snapshots of technician workbooks.
+
+Handlers read cells one address at a time. Over COM every read is a round
+trip, so before a handler runs each input sheet is read once as a single
+2-D block covering the bounding box of every address the handler uses, and
+the handler is served from that block instead.
+
+Formats (bold, font colour, display fill, static fill) are captured in the
+same pass for the planned addresses and kept as parallel arrays indexed by
+plan position, so signature lookups are array indexing rather than COM calls.
+
+A detached snapshot no longer needs its workbook: it can be pickled (e.g.
+back from an extraction worker process) and reads outside the plan see a
+blank cell.
+"""
+
+import hashlib
+import pickle
+from array import array
+
+from backends.base import EXCEL_NO_FILL
+from handlers.handler_base import is_meaningful_value, normalize_fill
+from handlers.merge_plan import module_plan
+
+# Sentinel stored in the format arrays for "unset" (None / no fill)
+UNSET = -1
+
+
+def bounding_box(coords):
+    """Returns (min_row, min_col, max_row, max_col) of (row, col) pairs."""
+    rows = [row for row, _ in coords]
+    cols = [col for _, col in coords]
+    return min(rows), min(cols), max(rows), max(cols)
+
+
+def _to_code(value):
+    if value is None:
+        return UNSET
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return UNSET
+
+
+def _from_code(code):
+    return None if code == UNSET else code
+
+
+class BlankSheet:
+    """Stands in for the workbook sheet behind a detached snapshot."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_value(self, row, col):
+        return None
+
+    def get_format(self, row, col):
+        return None, None, EXCEL_NO_FILL
+
+    def get_fill(self, row, col):
+        return None
+
+
+class SheetSnapshot:
+    """
+    Wraps an input sheet backend and serves values inside the bounding box
+    of a compiled merge plan from one bulk read. Formats of planned cells
+    that hold a value (plus the plan's special-row highlight cells) are
+    captured up front; any other read goes to the wrapped sheet.
+    """
+
+    def __init__(self, ws, plan):
+        self._ws = ws
+        self.name = ws.name
+        self.plan_name = plan.name
+        coords = plan.coords
+        if coords:
+            self.min_row, self.min_col, self.max_row, self.max_col = bounding_box(
+                coords
+            )
+            self._block = ws.read_block(
+                self.min_row, self.min_col, self.max_row, self.max_col
+            )
+        else:
+            self.min_row = self.min_col = 1
+            self.max_row = self.max_col = 0
+            self._block = []
+        # Input reads, for core.metrics
+        self.cells_read = (self.max_row - self.min_row + 1) * (
+            self.max_col - self.min_col + 1
+        )
+        self.format_reads = 0
+
+        # Parallel value and format arrays indexed by plan position
+        self.positions = plan.positions
+        self.values = [self.get_value(row, col) for row, col in coords]
+        self.captured = array("b", bytes(len(coords)))
+        self.bold = array("b", [UNSET]) * len(coords)
+        self.font_color = array("q", [UNSET]) * len(coords)
+        self.fill = array("q", [UNSET]) * len(coords)
+        self.static_fill = array("q", [UNSET]) * len(coords)
+
+        always = set(plan.highlight_coords())
+        for i, (row, col) in enumerate(coords):
+            if (row, col) in always or is_meaningful_value(self.values[i]):
+                self._capture_format(i, row, col)
+
+    def _capture_format(self, i, row, col):
+        bold, font_color, display_fill = self._ws.get_format(row, col)
+        self.bold[i] = UNSET if bold is None else int(bool(bold))
+        self.font_color[i] = _to_code(font_color)
+        fill = normalize_fill(display_fill)
+        self.fill[i] = UNSET if fill is None else fill
+        self.static_fill[i] = _to_code(self._ws.get_fill(row, col))
+        self.captured[i] = 1
+        self.format_reads += 1
+
+    def detach(self):
+        """Drops the wrapped sheet; reads outside the plan then see blanks."""
+        self._ws = BlankSheet(self.name)
+        return self
+
+    def digest(self):
+        """Hash of everything the merge can read from this snapshot."""
+        content = (
+            self.plan_name,
+            (self.min_row, self.min_col, self.max_row, self.max_col),
+            self._block,
+            self.captured.tobytes(),
+            self.bold.tobytes(),
+            self.font_color.tobytes(),
+            self.fill.tobytes(),
+            self.static_fill.tobytes(),
+        )
+        return hashlib.blake2b(pickle.dumps(content), digest_size=20).hexdigest()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["positions"]  # re-linked to the cached plan on load
+        if not isinstance(self._ws, BlankSheet):
+            state["_ws"] = BlankSheet(self.name)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.positions = module_plan(self.plan_name).positions
+
+    def format_index(self, row, col):
+        """Returns the plan position of a captured cell, or None."""
+        i = self.positions.get((row, col))
+        if i is None or not self.captured[i]:
+            return None
+        return i
+
+    def get_value(self, row, col):
+        if self.min_row <= row <= self.max_row and self.min_col <= col <= self.max_col:
+            return self._block[row - self.min_row][col - self.min_col]
+        return self._ws.get_value(row, col)
+
+    def read_block(self, min_row, min_col, max_row, max_col):
+        return [
+            [self.get_value(row, col) for col in range(min_col, max_col + 1)]
+            for row in range(min_row, max_row + 1)
+        ]
+
+    def get_format(self, row, col):
+        i = self.format_index(row, col)
+        if i is None:
+            return self._ws.get_format(row, col)
+        bold = self.bold[i]
+        fill = self.fill[i]
+        return (
+            None if bold == UNSET else bool(bold),
+            _from_code(self.font_color[i]),
+            EXCEL_NO_FILL if fill == UNSET else fill,
+        )
+
+    def get_fill(self, row, col):
+        i = self.format_index(row, col)
+        if i is None:
+            return self._ws.get_fill(row, col)
+        return _from_code(self.static_fill[i])
+
+
+def snapshot_sheet(ws, plan):
+    """Takes a value and format snapshot of everything plan will read."""
+    return SheetSnapshot(ws, plan)
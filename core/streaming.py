@@ -0,0 +1,313 @@
+"""
+Streaming (fold) merge.
+
+merge() holds a snapshot of every technician workbook until all sheets are
+merged, so memory grows with the number of files. fold_merge() instead
+opens one workbook at a time, folds its contribution into a per-sheet
+SheetAccumulator and closes it before opening the next. An accumulator
+holds only what the merge decision needs:
+
+- per cell: the first meaningful value (winner) with its format, and the
+  entries that conflict with it;
+- per special row: the technicians who highlighted a recorded value;
+- per checkbox option: who ticked it, and the first ticker's format;
+- per page: whether any file had a meaningful anchor.
+
+Peak memory is one open workbook plus the accumulators, whether a site has
+3 files or 30. Accumulators are written out through the same apply_*
+functions the handlers use, so the output is identical to merge() (first
+meaningful value wins, files taking precedence in the order given).
+"""
+
+import os
+import time
+
+import numpy as np
+
+from backends import ENGINES, open_workbook
+from backends.base import get_sheet
+from config.sheet_definitions import get_merge_handler, get_merge_plan
+from core.cancellation import MergeCancelled, check_cancelled, mark_incomplete
+from core.metrics import MergeMetrics
+from core.output_buffer import BufferedOutputSheet
+from core.snapshot import snapshot_sheet
+from handlers.handler_base import (
+    apply_cell_result,
+    apply_checkbox_agreement,
+    apply_checkbox_conflict,
+    apply_special_row,
+    find_winners,
+    get_cell_format_signature,
+    is_cell_meaningful,
+    merge_conflict_log,
+    skipped_page_log,
+    special_row_candidate,
+    stack_checkbox_groups,
+    stack_plan_cells,
+)
+
+
+class SheetAccumulator:
+    """Running merge state of one sheet, fed one technician sheet at a time."""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.files = 0
+
+        # Default cells (not on a special row): column j is plan cell cells[j]
+        self.cells = [
+            i
+            for i in range(plan.cell_count)
+            if plan.cell_rows[i] not in plan.special_rows
+        ]
+        self.column = {i: j for j, i in enumerate(self.cells)}
+        count = len(self.cells)
+        self.has_winner = np.zeros(count, dtype=bool)
+        self.winner_values = np.empty(count, dtype=object)
+        self.winner_bold = np.full(count, -1, dtype=np.int64)
+        self.winner_font = np.full(count, -1, dtype=np.int64)
+        self.winner_fill = np.full(count, -1, dtype=np.int64)
+        self.winners = {}  # j -> (filename, value, fmt, fill)
+        self.conflicts = {}  # j -> [(filename, value, fmt, fill), ...]
+
+        self.candidates = {}  # special row -> [special_row_candidate(), ...]
+
+        self.ticks = {}  # option k -> [(file number, filename), ...]
+        self.tick_formats = {}  # option k -> format signature of first ticker
+
+        self.page_meaningful = [False] * plan.page_count
+
+    def fold(self, ws, filename):
+        """Adds one technician's sheet (usually a snapshot) to the state."""
+        plan = self.plan
+        file_number = self.files
+        self.files += 1
+        ws_file_list = [(ws, filename)]
+
+        # Anchors
+        for page, anchors in enumerate(plan.page_anchors):
+            if not self.page_meaningful[page]:
+                self.page_meaningful[page] = any(
+                    is_cell_meaningful(ws.get_value(row, col)) for row, col in anchors
+                )
+
+        # Default cells: compare this file against the running winners
+        values, meaningful, bold, font, fill = stack_plan_cells(
+            ws_file_list, plan, self.cells
+        )
+        stacked = (
+            np.vstack([self.winner_values, values[0]]),
+            np.vstack([self.has_winner, meaningful[0]]),
+            np.vstack([self.winner_bold, bold[0]]),
+            np.vstack([self.winner_font, font[0]]),
+            np.vstack([self.winner_fill, fill[0]]),
+        )
+        _, _, conflict = find_winners(*stacked)
+
+        for j in np.flatnonzero(meaningful[0] & ~self.has_winner):
+            i = self.cells[j]
+            self.winners[j] = (
+                filename,
+                values[0, j],
+                get_cell_format_signature(ws, plan.cell_rows[i], plan.cell_cols[i]),
+                int(fill[0, j]) if fill[0, j] != -1 else None,
+            )
+            self.winner_values[j] = values[0, j]
+            self.winner_bold[j] = bold[0, j]
+            self.winner_font[j] = font[0, j]
+            self.winner_fill[j] = fill[0, j]
+            self.has_winner[j] = True
+
+        for j in np.flatnonzero(conflict[1]):
+            i = self.cells[j]
+            entry = (
+                filename,
+                values[0, j],
+                get_cell_format_signature(ws, plan.cell_rows[i], plan.cell_cols[i]),
+                int(fill[0, j]) if fill[0, j] != -1 else None,
+            )
+            entries = self.conflicts.setdefault(j, [])
+            if entry not in entries:
+                entries.append(entry)
+
+        # Special rows
+        for row, (value_col, highlight_cols) in plan.special_rows.items():
+            candidate = special_row_candidate(
+                ws, filename, row, value_col, highlight_cols
+            )
+            if candidate:
+                self.candidates.setdefault(row, []).append(candidate)
+
+        # Checkboxes
+        checked = stack_checkbox_groups(ws_file_list, plan, 0, plan.group_count)[0]
+        for g, option in np.argwhere(checked):
+            k = plan.group_starts[g] + option
+            if k not in self.ticks:
+                row, col = plan.option_rows[k], plan.option_cols[k]
+                self.tick_formats[k] = get_cell_format_signature(ws, row, col)
+            self.ticks.setdefault(k, []).append((file_number, filename))
+
+    def apply(self, output_ws):
+        """Writes the merged sheet's occupied pages, the way merge_sheet does."""
+        plan = self.plan
+        for page in range(plan.page_count):
+            if plan.page_anchors[page] and not self.page_meaningful[page]:
+                print(f"Page {page + 1} is blank — skipping it.")
+                skipped_page_log.append(output_ws.name)
+                continue
+
+            start, stop = plan.page_cells[page]
+            for i in range(start, stop):
+                row_index = plan.cell_rows[i]
+                col_index = plan.cell_cols[i]
+                if row_index in plan.special_rows:
+                    apply_special_row(
+                        output_ws,
+                        plan,
+                        row_index,
+                        col_index,
+                        self.candidates.get(row_index, []),
+                    )
+                    continue
+                j = self.column[i]
+                if j in self.winners:
+                    apply_cell_result(
+                        output_ws,
+                        plan,
+                        row_index,
+                        col_index,
+                        self.winners[j],
+                        self.conflicts.get(j, []),
+                    )
+
+            start, stop = plan.page_groups[page]
+            conflicting = []
+            for g in range(start, stop):
+                first = plan.group_starts[g]
+                ticked = [
+                    k for k in range(first, plan.group_starts[g + 1]) if k in self.ticks
+                ]
+                if len(ticked) == 1:
+                    k = ticked[0]
+                    _, filename = self.ticks[k][0]
+                    row, col = plan.option_rows[k], plan.option_cols[k]
+                    apply_checkbox_agreement(
+                        output_ws, plan, row, col, filename, self.tick_formats[k]
+                    )
+                elif len(ticked) > 1:
+                    conflicting.append((g, ticked))
+
+            for g, ticked in conflicting:
+                first = plan.group_starts[g]
+                ticks = sorted(
+                    (file_number, k - first, filename)
+                    for k in ticked
+                    for file_number, filename in self.ticks[k]
+                )
+                apply_checkbox_conflict(
+                    output_ws,
+                    plan.group_options(g),
+                    [(filename, option) for _, option, filename in ticks],
+                )
+
+
+def fold_merge(
+    file_paths,
+    output_path,
+    progress_callback=None,
+    engine="xlwings",
+    on_cancel="discard",
+    metrics=None,
+):
+    """
+    merge() with one input workbook open at a time; see the module docstring.
+    Every handler in SHEET_MERGE_HANDLERS is plan-driven (merge_sheet), so
+    sheets are folded straight from their compiled plans. Cancellation is
+    checked between files and sheets and handled as merge() describes.
+    metrics, a core.metrics.MergeMetrics, is filled in as it goes.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown merge engine '{engine}', expected one of {ENGINES}")
+    metrics = metrics or MergeMetrics(len(file_paths), engine, "streaming")
+
+    if progress_callback:
+        progress_callback(0, "Starting merge...")
+
+    accumulators = {}
+
+    # Fold files in one at a time (first 80%)
+    for idx, path in enumerate(file_paths):
+        if progress_callback:
+            pct = (idx / len(file_paths)) * 80
+            progress_callback(pct, f"Reading file: {os.path.basename(path)}")
+        check_cancelled()
+        with metrics.phase("open"):
+            wb = open_workbook(path, engine, data_only=True)
+            try:
+                for sheet_name in wb.sheet_names:
+                    if not get_merge_handler(sheet_name):
+                        continue
+                    check_cancelled()
+                    plan = get_merge_plan(sheet_name)
+                    if sheet_name not in accumulators:
+                        accumulators[sheet_name] = SheetAccumulator(plan)
+                    snapshot = snapshot_sheet(wb.sheet(sheet_name), plan)
+                    metrics.add_reads(snapshot.cells_read, snapshot.format_reads)
+                    accumulators[sheet_name].fold(snapshot, wb.name)
+            finally:
+                wb.close()
+
+    # Write the merged sheets (next 10%)
+    with metrics.phase("template"):
+        output_wb = open_workbook(output_path, engine)
+    merged_sheets = []
+    try:
+        for idx, sheet_name in enumerate(sorted(accumulators), start=1):
+            check_cancelled()
+            if progress_callback:
+                pct = 80 + (idx / len(accumulators)) * 10
+                progress_callback(pct, f"Merging sheet: {sheet_name}")
+            with metrics.phase("sheets"):
+                output_ws = BufferedOutputSheet(
+                    get_sheet(output_wb, sheet_name) or output_wb.add_sheet(sheet_name)
+                )
+                logged = len(merge_conflict_log)
+                skipped = len(skipped_page_log)
+                start = time.perf_counter()
+                accumulators[sheet_name].apply(output_ws)
+                applied = time.perf_counter()
+                written = output_ws.pending_counts()
+                output_ws.flush()
+                metrics.add_sheet(
+                    sheet_name,
+                    written,
+                    merge_conflict_log[logged:],
+                    applied - start,
+                    time.perf_counter() - applied,
+                    len(skipped_page_log) - skipped,
+                )
+            merged_sheets.append(sheet_name)
+        check_cancelled()
+
+        # Saving and closing (last 10%)
+        if progress_callback:
+            progress_callback(95, "Saving merged workbook...")
+
+        with metrics.phase("save"):
+            output_wb.save()
+
+        if progress_callback:
+            progress_callback(100, "Finalizing...")
+    except MergeCancelled as e:
+        if on_cancel == "partial":
+            skipped = [
+                name for name in sorted(accumulators) if name not in merged_sheets
+            ]
+            mark_incomplete(output_wb, e.reason, merged_sheets, skipped)
+            output_wb.save()
+            e.partial = True
+        raise
+    finally:
+        output_wb.close()
+
+    return merge_conflict_log
@@ -0,0 +1,303 @@
+"""
+Watch mode: merge a site automatically once its technicians' files are in.
+
+    python -m core.watch ROOT [--expect N] [--quiet SECONDS] [--output-dir DIR]
+
+Every folder directly under ROOT is a site, and the .xlsx files in it are
+its technician reports. The tree is polled every --interval seconds, which
+needs nothing beyond the standard library and works on network shares that
+don't deliver file system events. A file counts once its size and mtime
+have held still for --settle seconds, so a copy in progress is never read
+half-written. A settled file is checked with is_valid_excel_file; invalid
+ones are reported and left out.
+
+A site is merged when its valid files are complete or when nothing in it
+has changed for --quiet seconds, whichever comes first. Complete means:
+
+- every file named in the site's expected.txt (one name per line) is
+  there; or
+- expected.txt holds a single number, or --expect N is given, and at least
+  that many files are there.
+
+A site with no expectation is merged on quiet alone. Inputs are merged in
+name order into OUTPUT_DIR/<site>.xlsx, with OUTPUT_DIR defaulting to
+ROOT/_merged. A site is merged again whenever its set of valid files
+changes. A merge that fails (say the output is open in Excel) is retried
+every RETRY_SECONDS until it succeeds or the files change. Each site keeps
+a MergeCache while it is active and all sites share the extraction cache,
+so a re-merge re-reads only the files that changed; the MergeCache is
+dropped once a merged site has been quiet for --quiet seconds.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from config.sheet_definitions import REQUIRED_SHEETS
+from config.templates import default_template_path
+from core.batch import DEFAULT_ENGINE, run_site
+from core.merge_cache import MergeCache
+from utils.file_handling import is_valid_excel_file
+
+EXPECTED_FILE = "expected.txt"
+
+DEFAULT_INTERVAL = 2.0
+DEFAULT_SETTLE = 5.0
+DEFAULT_QUIET = 300.0
+RETRY_SECONDS = 60.0
+
+
+class SiteState:
+    """What the watcher knows about one site folder."""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.files = {}  # filename -> (size, mtime_ns, time last changed)
+        self.changed_at = None  # last time anything in the folder changed
+        self.merged_signature = None  # files of the last successful merge
+        self.failed_signature = None  # files of the last failed merge attempt
+        self.retry_at = None  # when that failed merge may be attempted again
+        self.invalid = set()  # (filename, size, mtime_ns) already reported
+        self.cache = MergeCache()
+
+    def expected(self, default_count=None):
+        """(names, count) this site waits for; either may be None."""
+        path = os.path.join(self.path, EXPECTED_FILE)
+        try:
+            with open(path, encoding="utf-8") as f:
+                lines = [line.strip() for line in f if line.strip()]
+        except OSError:
+            return None, default_count
+        if len(lines) == 1 and lines[0].isdigit():
+            return None, int(lines[0])
+        return lines, None
+
+
+class FolderWatcher:
+    """Polls a folder tree of sites and merges the ones that are ready."""
+
+    def __init__(
+        self,
+        root,
+        output_dir=None,
+        template=None,
+        expect=None,
+        quiet=DEFAULT_QUIET,
+        settle=DEFAULT_SETTLE,
+        engine=DEFAULT_ENGINE,
+        cache_dir=None,
+        metrics_path=None,
+    ):
+        self.root = os.path.abspath(root)
+        self.output_dir = os.path.abspath(output_dir or os.path.join(root, "_merged"))
+        self.template = template or default_template_path()
+        self.expect = expect
+        self.quiet = quiet
+        self.settle = settle
+        self.engine = engine
+        self.cache_dir = cache_dir
+        self.metrics_path = metrics_path
+        self.sites = {}
+
+    def site_folders(self):
+        try:
+            entries = sorted(os.scandir(self.root), key=lambda entry: entry.name)
+        except OSError:
+            return []
+        return [
+            entry
+            for entry in entries
+            if entry.is_dir()
+            and not entry.name.startswith((".", "_"))
+            and os.path.abspath(entry.path) != self.output_dir
+        ]
+
+    def scan(self, now):
+        """Records new, changed and removed files since the last scan."""
+        seen_sites = set()
+        for folder in self.site_folders():
+            seen_sites.add(folder.name)
+            site = self.sites.get(folder.name)
+            if site is None:
+                site = self.sites[folder.name] = SiteState(folder.name, folder.path)
+
+            current = {}
+            try:
+                entries = list(os.scandir(folder.path))
+            except OSError:
+                # Removed or renamed since site_folders(); gone next scan
+                continue
+            for entry in entries:
+                # Skip Excel's "~$name.xlsx" lock files
+                if not entry.name.endswith(".xlsx") or entry.name.startswith("~$"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                current[entry.name] = (stat.st_size, stat.st_mtime_ns)
+
+            for filename, version in current.items():
+                known = site.files.get(filename)
+                if known is None or known[:2] != version:
+                    site.files[filename] = (*version, now)
+                    site.changed_at = now
+            for filename in set(site.files) - set(current):
+                del site.files[filename]
+                site.changed_at = now
+
+        for name in set(self.sites) - seen_sites:
+            del self.sites[name]
+
+    def valid_files(self, site, now):
+        """Settled, valid files of a site in name order, or None if unsettled."""
+        valid = []
+        for filename in sorted(site.files):
+            size, mtime_ns, changed = site.files[filename]
+            if now - changed < self.settle:
+                return None
+            path = os.path.join(site.path, filename)
+            if is_valid_excel_file(path, REQUIRED_SHEETS):
+                valid.append((filename, size, mtime_ns))
+            elif (filename, size, mtime_ns) not in site.invalid:
+                site.invalid.add((filename, size, mtime_ns))
+                print(f"⚠️ {site.name}: {filename} is not a valid V8 report, ignoring")
+        return valid
+
+    def is_ready(self, site, valid, now):
+        names, count = site.expected(self.expect)
+        filenames = {filename for filename, _, _ in valid}
+        if names is not None and set(names) <= filenames:
+            return True
+        if count is not None and len(valid) >= count:
+            return True
+        return site.changed_at is not None and now - site.changed_at >= self.quiet
+
+    def ready_sites(self, now):
+        """Sites whose valid files changed since their last merge and are ready."""
+        ready = []
+        for site in self.sites.values():
+            valid = self.valid_files(site, now)
+            if not valid or tuple(valid) == site.merged_signature:
+                continue
+            if tuple(valid) == site.failed_signature and now < site.retry_at:
+                continue
+            if self.is_ready(site, valid, now):
+                ready.append((site, valid))
+        return ready
+
+    def merge_site(self, site, valid, now):
+        inputs = [os.path.join(site.path, filename) for filename, _, _ in valid]
+        site.cache.retain(inputs)
+        result = run_site(
+            {
+                "name": site.name,
+                "template": self.template,
+                "inputs": inputs,
+                "output": os.path.join(self.output_dir, f"{site.name}.xlsx"),
+                "engine": self.engine,
+            },
+            cache_dir=self.cache_dir,
+            cache=site.cache,
+            metrics_path=self.metrics_path,
+        )
+        print(
+            f"{time.strftime('%H:%M:%S')} {site.name}: {result['status']} "
+            f"({result['inputs']} files, {result['conflicts']} conflicts, "
+            f"{result['elapsed']:.1f}s)"
+            + (f" — {result['error']}" if result["error"] else "")
+        )
+        if result["status"] == "ok":
+            site.merged_signature = tuple(valid)
+            site.failed_signature = site.retry_at = None
+        else:
+            site.failed_signature = tuple(valid)
+            site.retry_at = now + RETRY_SECONDS
+        return result
+
+    def release_caches(self, now):
+        """Drops the MergeCache of merged sites that have gone quiet."""
+        for site in self.sites.values():
+            if (
+                site.merged_signature is not None
+                and site.changed_at is not None
+                and now - site.changed_at >= self.quiet
+            ):
+                site.cache.clear()
+
+    def poll(self, now=None):
+        """One scan of the tree; merges every ready site and returns the results."""
+        now = time.time() if now is None else now
+        self.scan(now)
+        results = [
+            self.merge_site(site, valid, now) for site, valid in self.ready_sites(now)
+        ]
+        self.release_caches(now)
+        return results
+
+
+def watch(root, interval=DEFAULT_INTERVAL, **options):
+    """Polls root until interrupted; see the module docstring."""
+    watcher = FolderWatcher(root, **options)
+    print(f"Watching {watcher.root} → {watcher.output_dir} (Ctrl+C to stop)")
+    try:
+        while True:
+            watcher.poll()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m core.watch",
+        description="Merge each site folder once its technician files are in.",
+    )
+    parser.add_argument("root", help="folder with one sub-folder per site")
+    parser.add_argument("--output-dir", help="where merged reports go")
+    parser.add_argument("--template", help="V8 template to merge into")
+    parser.add_argument(
+        "--expect", type=int, help="files a site needs when it has no expected.txt"
+    )
+    parser.add_argument(
+        "--quiet",
+        type=float,
+        default=DEFAULT_QUIET,
+        help="seconds without changes after which a site is merged anyway",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=DEFAULT_SETTLE,
+        help="seconds a file must stay unchanged before it is read",
+    )
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL)
+    parser.add_argument("--engine", default=DEFAULT_ENGINE)
+    parser.add_argument(
+        "--cache-dir", help="extraction cache folder ('' disables the cache)"
+    )
+    parser.add_argument("--metrics", help="JSONL file to append merge metrics to")
+    args = parser.parse_args(argv)
+
+    watch(
+        args.root,
+        interval=args.interval,
+        output_dir=args.output_dir,
+        template=args.template,
+        expect=args.expect,
+        quiet=args.quiet,
+        settle=args.settle,
+        engine=args.engine,
+        cache_dir=args.cache_dir,
+        metrics_path=args.metrics,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    from multiprocessing import freeze_support
+
+    freeze_support()
+    sys.exit(main())
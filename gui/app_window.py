@@ -6,10 +6,22 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 from PIL import Image, ImageTk
 import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from utils.file_handling import is_valid_excel_file
 from config.sheet_definitions import REQUIRED_SHEETS
+from config.templates import default_template_path
 
 ICON_PATH = os.path.join("assets", "excel_icon.png")
+
+# Dropped files are validated off the Tk thread; results are polled this often
+VALIDATION_WORKERS = 4
+VALIDATION_POLL_MS = 50
+
+CHECKING, VALID, INVALID = "checking", "valid", "invalid"
+
+# How often the Tk loop drains a running merge's progress events
+MERGE_POLL_MS = 50
 # ... [unchanged imports from previous version] ...
 
 
@@ -22,11 +34,24 @@ class V8MergerApp(TkinterDnD.Tk):
         self.configure(bg="white")
         self.resizable(False, False)
 
-        self.selected_files = []
-        self.file_tiles = []
+        self.selected_files = []  # valid files, in the order they were added
+        self.file_tiles = {}  # path -> (tile frame, tile status label)
+        self.file_status = {}  # path -> CHECKING, VALID or INVALID
+
+        self.validation_pool = ThreadPoolExecutor(max_workers=VALIDATION_WORKERS)
+        self.validation_results = queue.Queue()
+        self.validation_polling = False
+
+        self.merge_job = None
 
         self.create_widgets()
 
+    def destroy(self):
+        if self.merge_job:
+            self.merge_job.cancel()
+        self.validation_pool.shutdown(wait=False, cancel_futures=True)
+        super().destroy()
+
     def create_widgets(self):
         # Instruction Label
         self.instruction_label = ttk.Label(
@@ -106,6 +131,16 @@ class V8MergerApp(TkinterDnD.Tk):
         self.merge_button.grid(row=0, column=1, padx=10)
         self.merge_button.grid_remove()
 
+        self.cancel_button = ttk.Button(
+            self.actions_frame,
+            text="■ Cancel Merge",
+            command=self.cancel_merge,
+            bootstyle="danger-outline",
+            width=25,
+        )
+        self.cancel_button.grid(row=0, column=2, padx=10)
+        self.cancel_button.grid_remove()
+
         self.progress_var = tk.DoubleVar()
         self.progress_label = ttk.Label(self, text="Ready")
 
@@ -127,7 +162,6 @@ class V8MergerApp(TkinterDnD.Tk):
     def update_progress(self, percentage, message):
         self.progress_var.set(percentage)
         self.progress_label.config(text=message)
-        self.update_idletasks()  # Force immediate update
 
     def browse_files(self):
         files = filedialog.askopenfilenames(filetypes=[("Excel files", "*.xlsx")])
@@ -141,25 +175,18 @@ class V8MergerApp(TkinterDnD.Tk):
         added_count = 0
         for f in files:
             cleaned = f.strip('"')
-            if cleaned in self.selected_files:
+            # Files still being checked count as added, so duplicates are caught
+            if cleaned in self.file_tiles:
                 self.status_label.config(
                     text=f"File Error: Duplicate file '{os.path.basename(cleaned)}'",
                     bootstyle="danger",
                 )
                 continue
             elif cleaned.endswith(".xlsx"):
-                if is_valid_excel_file(cleaned, REQUIRED_SHEETS):
-                    self.selected_files.append(cleaned)
-                    self.add_file_tile(cleaned)
-                    added_count += 1
-                else:
-                    self.status_label.config(
-                        text=(
-                            f"File Error: Missing required "
-                            f"sheets in {os.path.basename(cleaned)}"
-                        ),
-                        bootstyle="danger",
-                    )
+                self.add_file_tile(cleaned)
+                self.file_status[cleaned] = CHECKING
+                self.validation_pool.submit(self.validate_file, cleaned)
+                added_count += 1
             else:
                 self.status_label.config(
                     text=(
@@ -170,10 +197,69 @@ class V8MergerApp(TkinterDnD.Tk):
                 )
 
         if added_count > 0:
-            self.status_label.config(
-                text=f"{len(self.selected_files)} files selected", bootstyle="secondary"
-            )
+            self.refresh_selection()
+            if not self.validation_polling:
+                self.validation_polling = True
+                self.after(VALIDATION_POLL_MS, self.poll_validation)
+
+    def validate_file(self, filepath):
+        """Runs on the validation pool; the result is handed back by queue."""
+        try:
+            valid = is_valid_excel_file(filepath, REQUIRED_SHEETS)
+        except Exception:
+            valid = False
+        self.validation_results.put((filepath, valid))
+
+    def poll_validation(self):
+        """Applies finished validations to their tiles (on the Tk thread)."""
+        while True:
+            try:
+                filepath, valid = self.validation_results.get_nowait()
+            except queue.Empty:
+                break
+            # Ignore files removed while they were being checked
+            if self.file_status.get(filepath) != CHECKING:
+                continue
+            self.file_status[filepath] = VALID if valid else INVALID
+            _, status = self.file_tiles[filepath]
+            if valid:
+                status.config(text="✓", bootstyle="success")
+            else:
+                status.config(text="Missing required sheets", bootstyle="danger")
+                self.status_label.config(
+                    text=(
+                        f"File Error: Missing required "
+                        f"sheets in {os.path.basename(filepath)}"
+                    ),
+                    bootstyle="danger",
+                )
+            self.refresh_selection(announce=valid)
+
+        if CHECKING in self.file_status.values():
+            self.after(VALIDATION_POLL_MS, self.poll_validation)
+        else:
+            self.validation_polling = False
+
+    def refresh_selection(self, announce=True):
+        """
+        Rebuilds selected_files from the tiles and shows the merge button
+        once every added file has been checked and at least one is valid.
+        """
+        self.selected_files = [
+            path for path, state in self.file_status.items() if state == VALID
+        ]
+        checking = sum(1 for state in self.file_status.values() if state == CHECKING)
+
+        if announce:
+            text = f"{len(self.selected_files)} files selected"
+            if checking:
+                text += f", checking {checking}..."
+            self.status_label.config(text=text, bootstyle="secondary")
+
+        if self.selected_files and not checking:
             self.merge_button.grid()
+        else:
+            self.merge_button.grid_remove()
 
     def add_file_tile(self, filepath):
         frame = ttk.Frame(self.tiles_container, padding=6, style="light.TFrame")
@@ -187,6 +273,11 @@ class V8MergerApp(TkinterDnD.Tk):
         label = ttk.Label(frame, text=os.path.basename(filepath), font=("Segoe UI", 9))
         label.pack(side="left")
 
+        status = ttk.Label(
+            frame, text="Checking...", font=("Segoe UI", 9), bootstyle="secondary"
+        )
+        status.pack(side="left", padx=(10, 0))
+
         remove_btn = ttk.Button(
             frame,
             text="✕",
@@ -196,44 +287,36 @@ class V8MergerApp(TkinterDnD.Tk):
         )
         remove_btn.pack(side="right", padx=5)
 
-        self.file_tiles.append(frame)
+        self.file_tiles[filepath] = (frame, status)
 
     def remove_file(self, filepath, frame):
-        if filepath in self.selected_files:
-            self.selected_files.remove(filepath)
+        if filepath in self.file_tiles:
+            del self.file_tiles[filepath]
+            del self.file_status[filepath]
             frame.destroy()
-            self.status_label.config(
-                text=f"{len(self.selected_files)} files selected", bootstyle="secondary"
-            )
-        if not self.selected_files:
-            self.merge_button.grid_remove()
+        self.refresh_selection()
 
     def clear_all_files(self):
         if messagebox.askyesno(
             "Confirm", "Are you sure you want to remove all selected files?"
         ):
-            for frame in self.file_tiles:
+            for frame, _ in self.file_tiles.values():
                 frame.destroy()
             self.selected_files.clear()
             self.file_tiles.clear()
+            self.file_status.clear()
             self.status_label.config(text="No files selected", bootstyle="secondary")
             self.merge_button.grid_remove()
 
     def start_merge(self):
-        from core.merger import merge
+        from core.disk_cache import ExtractionCache
+        from core.merge_job import MergeJob
+        from core.metrics import default_metrics_path
         import shutil
 
-        TEMPLATE_FILENAME = "Annual ULC Template - CAN,ULC-S536-19 v8.xlsx"
-        template_subfolder = (
-            r"Cantec Fire Alarms\Cantec Office - "
-            r"Documents\Cantec\Operations\Templates\Report Templates\Log Templates"
-        )
-        user_profile = os.environ.get("USERPROFILE")
-        TEMPLATE_PATH = os.path.join(
-            user_profile, template_subfolder, TEMPLATE_FILENAME
-        )
+        TEMPLATE_PATH = default_template_path()
 
-        if not os.path.exists(TEMPLATE_PATH):
+        if not TEMPLATE_PATH or not os.path.exists(TEMPLATE_PATH):
             messagebox.showerror(
                 "Template Missing", f"Template not found:\n{TEMPLATE_PATH}"
             )
@@ -258,16 +341,72 @@ class V8MergerApp(TkinterDnD.Tk):
             messagebox.showerror("File Error", f"Could not copy template:\n{e}")
             return
 
+        # Show the progress bar and label
+        self.progress_label.pack(side="bottom", fill="x", padx=20, pady=5)
+        self.progress_bar.pack(side="bottom", fill="x", padx=10)
+        self.progress_var.set(0)
+        self.progress_label.config(text="Opening template...")
+        self.set_controls_enabled(False)
+
+        # The merge runs in the background; poll_merge relays its events
+        self.merge_job = MergeJob(
+            self.selected_files,
+            save_path,
+            disk_cache=ExtractionCache(),
+            metrics_path=default_metrics_path(),
+        ).start()
+        self.merge_save_path = save_path
+        self.cancel_button.grid()
+        self.after(MERGE_POLL_MS, self.poll_merge)
+
+    def cancel_merge(self):
+        if self.merge_job:
+            self.merge_job.cancel()
+            self.cancel_button.configure(state="disabled")
+            self.progress_label.config(text="Cancelling...")
+
+    def set_controls_enabled(self, enabled):
+        state = "normal" if enabled else "disabled"
+        for button in (self.browse_button, self.clear_button, self.merge_button):
+            button.configure(state=state)
+
+    def poll_merge(self):
+        """Applies a running merge's progress, completion or failure."""
+        for event in self.merge_job.poll():
+            kind = event[0]
+            if kind == "progress":
+                self.update_progress(*event[1:])
+            elif kind == "done":
+                self.end_merge()
+                self.finish_merge(event[1])
+                return
+            elif kind == "cancelled":
+                self.end_merge()
+                _, reason, partial = event
+                if not partial:
+                    # Nothing was merged into it; drop the copied template
+                    try:
+                        os.remove(self.merge_save_path)
+                    except OSError:
+                        pass
+                self.progress_label.config(text=f"{reason}.")
+                return
+            elif kind == "error":
+                self.end_merge()
+                messagebox.showerror(
+                    "Save Error", f"Could not save merged file:\n{event[1]}"
+                )
+                return
+        self.after(MERGE_POLL_MS, self.poll_merge)
+
+    def end_merge(self):
+        self.merge_job = None
+        self.cancel_button.configure(state="normal")
+        self.cancel_button.grid_remove()
+        self.set_controls_enabled(True)
+
+    def finish_merge(self, conflicts):
         try:
-            # Show the progress bar and label
-            self.progress_label.pack(side="bottom", fill="x", padx=20, pady=5)
-            self.progress_bar.pack(side="bottom", fill="x", padx=10)
-            self.progress_var.set(0)
-            self.progress_label.config(text="Opening template...")
-            self.update_idletasks()
-            conflicts = merge(
-                self.selected_files, save_path, progress_callback=self.update_progress
-            )
             self.progress_var.set(100)
             self.progress_bar.configure(bootstyle="success")
             self.progress_label.config(text="✅ Merge complete!")
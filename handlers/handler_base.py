@@ -1,52 +1,23 @@
+from functools import lru_cache
 from typing import List, Tuple
 
-from math import sqrt
+import numpy as np
 
-merge_conflict_log = []
-
-NAMED_COLORS = {
-    "Red": [(255, 0, 0), (192, 80, 77), (218, 150, 148)],
-    "Green": [(0, 255, 0), (0, 128, 0), (196, 215, 155), (0, 176, 80), (146, 208, 80)],
-    "Yellow": [(255, 255, 0)],
-}
-
-
-def closest_named_color(rgb, threshold=90):
-    if rgb is None:
-        return "No fill"
+from core.cancellation import check_cancelled
+from handlers.merge_plan import compile_plan
+from utils.cell_refs import column_index, column_letter, format_address, parse_address
+from utils.colors import get_classifier
 
-    best_match = "Unknown"
-    min_dist = float("inf")
-
-    for name, color_list in NAMED_COLORS.items():
-        for std_rgb in color_list:
-            dist = sqrt(sum((c1 - c2) ** 2 for c1, c2 in zip(rgb, std_rgb)))
-            if dist < min_dist:
-                min_dist = dist
-                best_match = name
-
-    if min_dist > threshold:
-        return f"RGB{rgb}"  # fallback to raw RGB if too far from any label
-    return best_match
+merge_conflict_log = []
+# One sheet name per page merge_sheet skipped because no file had data on it
+skipped_page_log = []
 
+# Pastel purple (#DDD2E9) as an Excel BGR int
+CONFLICT_FILL = (233 << 16) | (210 << 8) | 221
 
-def int_to_rgb(color_int):
-    """Converts Excel BGR color int into RGB tuple."""
-    if not isinstance(color_int, int):
-        return None
-    r = color_int & 0xFF
-    g = (color_int >> 8) & 0xFF
-    b = (color_int >> 16) & 0xFF
-    return (r, g, b)
 
-
-def get_cell_format_signature(cell) -> Tuple:
-    bold = cell.api.Font.Bold
-    font_rgb = cell.api.Font.Color
-    try:
-        raw_fill = cell.api.DisplayFormat.Interior.Color
-    except Exception:
-        raw_fill = cell.api.Interior.Color  # fallback
+def get_cell_format_signature(ws, row: int, col: int) -> Tuple:
+    bold, font_rgb, raw_fill = ws.get_format(row, col)
     norm = normalize_fill(raw_fill)
     fill_rgb = norm if norm is not None else "NO_FILL"
 
@@ -92,71 +63,114 @@ def merge_checkbox_groups(
     Flags conflicts when multiple boxes are checked by different techs.
     Allows merging if all techs agree on the same box.
     """
-    for group in checkbox_groups:
-        true_cells = []  # (address, value, filename, format_signature)
+    plan = compile_plan(
+        output_ws.name, [], [checkbox_groups], tech_col_letter=tech_col_letter
+    )
+    merge_plan_checkbox_groups(ws_file_list, output_ws, plan, 0, plan.group_count)
 
-        for ws, filename in ws_file_list:
-            for addr in group:
-                val = ws.range(addr).value
-                if isinstance(val, bool) and val is True:
-                    sig = get_cell_format_signature(ws.range(addr))
-                    true_cells.append((addr, val, filename, sig))
 
-        if not true_cells:
-            # No box checked by any tech — skip
-            continue
-
-        addresses = {entry[0] for entry in true_cells}
-
-        if len(addresses) == 1:
-            # ✅ All checkmarks are on the same cell — merge it
-            addr, val, filename, sig = true_cells[0]
-            cell = output_ws.range(addr)
-            cell.value = True
-            if sig[0]:
-                cell.api.Font.Bold = True
-            cell.api.Font.Color = sig[1]
-            if sig[2] != "NO_FILL":
-                cell.api.Interior.Color = sig[2]
-
-            if insert_or_fill_technician_column:
-                row_index = cell.row
-                insert_or_fill_technician_column(
-                    output_ws, row_index, filename, tech_col_letter
-                )
+def stack_checkbox_groups(ws_file_list, plan, start, stop):
+    """
+    Loads groups start..stop of a compiled plan into a (files x groups x
+    options) boolean array of ticked checkboxes. Groups with fewer options
+    than the widest one are padded with False.
+    """
+    starts = np.asarray(plan.group_starts[start : stop + 1], dtype=np.intp)
+    lengths = np.diff(starts)
+    width = int(lengths.max()) if len(lengths) else 0
+    slots = np.arange(width)
+    valid = slots < lengths[:, None]
+    options = np.where(valid, starts[:-1, None] + slots, 0)
+
+    checked = np.zeros((len(ws_file_list), len(lengths), width), dtype=bool)
+    if not valid.any():
+        return checked
+
+    positions = np.asarray(plan.option_positions, dtype=np.intp)[options[valid]]
+    for t, (ws, _) in enumerate(ws_file_list):
+        if is_plan_snapshot(ws, plan):
+            snapshot_values = ws.values
+            ticked = [snapshot_values[p] is True for p in positions]
         else:
-            # ❌ Conflict — multiple checkboxes selected by different techs
-
-            # Assign semantic labels: YES, NO, N/A (left to right)
-            labels = ["YES", "NO", "N/A"][: len(group)]
-            addr_to_label = dict(zip(group, labels))
-
-            # Build unified conflict data
-            conflict_data = []
-            for addr, val, filename, sig in true_cells:
-                label = addr_to_label.get(addr, "UNKNOWN")
-                tech = clean_filename(filename)
-                conflict_data.append((label, tech))
-
-            # Build shared comment
-            comment_text = "[Conflict]\n" + "\n".join(
-                f"{label}: {tech}" for label, tech in sorted(conflict_data)
-            )
+            ticked = [
+                ws.get_value(plan.option_rows[k], plan.option_cols[k]) is True
+                for k in options[valid]
+            ]
+        checked[t][valid] = ticked
+    return checked
 
-            # Apply comment and highlight to all checked cells
-            for addr, val, filename, sig in true_cells:
-                cell = output_ws.range(addr)
-                apply_conflict_highlight(cell)
-                try:
-                    if cell.api.Comment:
-                        cell.api.Comment.Delete()
-                    cell.api.AddComment(comment_text)
-                except Exception as e:
-                    print(f"❌ Failed to write comment to {addr}: {e}")
 
-                # Log conflict
-                if output_ws:
-                    merge_conflict_log.append(output_ws.name)
+def merge_plan_checkbox_groups(ws_file_list, output_ws, plan, start, stop):
+    """
+    merge_checkbox_groups over groups start..stop of a compiled plan. Which
+    groups nobody ticked, which everyone agrees on and which conflict is
+    decided for the whole range at once; only conflicting groups build a
+    comment.
+    """
+    checked = stack_checkbox_groups(ws_file_list, plan, start, stop)
+    ticked_options = checked.any(axis=0)  # groups x options
+    option_counts = ticked_options.sum(axis=1)
+
+    # ✅ All checkmarks are on the same cell — merge it
+    for g in np.flatnonzero(option_counts == 1):
+        option = int(ticked_options[g].argmax())
+        ws, filename = ws_file_list[int(checked[:, g, option].argmax())]
+        row, col = plan.group_options(start + g)[option]
+        sig = get_cell_format_signature(ws, row, col)
+        apply_checkbox_agreement(output_ws, plan, row, col, filename, sig)
+
+    # ❌ Conflict — multiple checkboxes selected by different techs
+    for g in np.flatnonzero(option_counts > 1):
+        ticks = [
+            (ws_file_list[t][1], option)
+            for t, option in np.argwhere(checked[:, g, :])  # file order
+        ]
+        apply_checkbox_conflict(output_ws, plan.group_options(start + g), ticks)
+
+
+def apply_checkbox_agreement(output_ws, plan, row, col, filename, sig):
+    """Writes the one option every ticking technician agreed on."""
+    output_ws.set_value(row, col, True)
+    output_ws.set_font(row, col, bold=True if sig[0] else None, color=sig[1])
+    if sig[2] != "NO_FILL":
+        output_ws.set_fill(row, col, sig[2])
+
+    if plan.tech_col:
+        fill_technician_column(output_ws, row, filename, plan.tech_col)
+
+
+def apply_checkbox_conflict(output_ws, group, ticks):
+    """
+    Highlights and comments every ticked option of a conflicting group.
+    ticks lists (filename, option index) pairs in file order.
+    """
+    # Assign semantic labels: YES, NO, N/A (left to right)
+    labels = ["YES", "NO", "N/A"][: len(group)]
+
+    # Build shared comment
+    conflict_data = [
+        (
+            labels[option] if option < len(labels) else "UNKNOWN",
+            clean_filename(filename),
+        )
+        for filename, option in ticks
+    ]
+    comment_text = "[Conflict]\n" + "\n".join(
+        f"{label}: {tech}" for label, tech in sorted(conflict_data)
+    )
+
+    # Apply comment and highlight to all checked cells
+    for _, option in ticks:
+        row, col = group[option]
+        apply_conflict_highlight(output_ws, row, col)
+        try:
+            output_ws.set_comment(row, col, comment_text)
+        except Exception as e:
+            print(f"❌ Failed to write comment to {format_address(row, col)}: {e}")
+
+        # Log conflict
+        if output_ws:
+            merge_conflict_log.append(output_ws.name)
 
 
 def normalize_fill(fill):
@@ -174,15 +188,96 @@ def is_page_meaningful(ws_file_list, cell_refs):
     Check if any file has a meaningful value in any of the given cell references.
     If so, the page is considered meaningful.
     """
+    return any_cell_meaningful(ws_file_list, [parse_address(ref) for ref in cell_refs])
+
+
+def any_cell_meaningful(ws_file_list, coords):
+    """is_page_meaningful for (row, col) coordinates."""
     for ws, _ in ws_file_list:
-        for ref in cell_refs:
-            if is_cell_meaningful(ws.range(ref).value):
+        for row, col in coords:
+            if is_cell_meaningful(ws.get_value(row, col)):
                 return True
     return False
 
 
-def strip_cells(conflicts_with_cells):
-    return [(filename, val, fmt) for filename, val, fmt, _ in conflicts_with_cells]
+@lru_cache(maxsize=None)
+def page_value_reads(plan):
+    """
+    Per page of a compiled plan, the (row, col) cells whose values decide
+    whether a file has data there, with their plan positions. A special row
+    is represented by its value cell, since that is what makes it count.
+    """
+    reads = []
+    for start, stop in plan.page_cells:
+        coords = []
+        for i in range(start, stop):
+            row = plan.cell_rows[i]
+            if row in plan.special_rows:
+                coord = (row, plan.special_rows[row][0])
+            else:
+                coord = (row, plan.cell_cols[i])
+            if coord not in coords:
+                coords.append(coord)
+        positions = [plan.positions[coord] for coord in coords]
+        reads.append((coords, positions))
+    return reads
+
+
+def page_occupancy(ws_file_list, plan):
+    """
+    Occupancy pass over a compiled plan: a (files x pages) boolean bitmap of
+    which file has meaningful data (a value or a ticked checkbox) on which
+    page. A page with anchors is occupied by nobody unless some file has a
+    meaningful anchor, so leftovers on an unused page don't count.
+    """
+    occupied = np.zeros((len(ws_file_list), plan.page_count), dtype=bool)
+    open_pages = [
+        page
+        for page, anchors in enumerate(plan.page_anchors)
+        if not anchors or any_cell_meaningful(ws_file_list, anchors)
+    ]
+    reads = page_value_reads(plan)
+
+    for t, (ws, _) in enumerate(ws_file_list):
+        snapshot_values = ws.values if is_plan_snapshot(ws, plan) else None
+        for page in open_pages:
+            coords, positions = reads[page]
+            if snapshot_values is not None:
+                found = any(is_meaningful_value(snapshot_values[p]) for p in positions)
+            else:
+                found = any(
+                    is_meaningful_value(ws.get_value(row, col)) for row, col in coords
+                )
+            occupied[t, page] = found
+
+    if plan.group_count:
+        ticked = stack_checkbox_groups(ws_file_list, plan, 0, plan.group_count)
+        ticked = ticked.any(axis=2)  # files x groups
+        for page in open_pages:
+            start, stop = plan.page_groups[page]
+            occupied[:, page] |= ticked[:, start:stop].any(axis=1)
+    return occupied
+
+
+def merge_sheet(ws_file_list, output_ws, plan):
+    """
+    Merges the occupied pages of a compiled plan (see page_occupancy): cells
+    first, then checkbox groups, reading only the files that have data on
+    the page. A cancelled merge stops between pages (see core.cancellation).
+    """
+    occupied = page_occupancy(ws_file_list, plan)
+    for page in range(plan.page_count):
+        check_cancelled()
+        page_files = [ws_file_list[t] for t in np.flatnonzero(occupied[:, page])]
+        if not page_files:
+            # Only anchored pages count as skipped, as in a streaming merge
+            if plan.page_anchors[page]:
+                print(f"Page {page + 1} is blank — skipping it.")
+                skipped_page_log.append(output_ws.name)
+            continue
+
+        merge_plan_cells(page_files, output_ws, plan, *plan.page_cells[page])
+        merge_plan_checkbox_groups(page_files, output_ws, plan, *plan.page_groups[page])
 
 
 def merge_cells(
@@ -201,212 +296,272 @@ def merge_cells(
     to report full conflict details (sheet, value, fill color).
     """
 
-    def get_special_range(row_index: int, ranges: List[dict]):
-        if not ranges:
-            return None
-        for entry in ranges:
-            if row_index in entry.get("rows", []):
-                return entry
-        return None
+    plan = compile_plan(
+        output_ws.name,
+        [merge_cells_list],
+        special_row_ranges=special_row_ranges,
+        tech_col_letter=tech_col_letter,
+    )
+    merge_plan_cells(ws_file_list, output_ws, plan, 0, plan.cell_count)
 
-    for cell_address in merge_cells_list:
-        output_cell = output_ws.range(cell_address)
-        row_index = output_cell.row
-
-        # --- Special merging logic for highlighted rows ---
-        special = get_special_range(row_index, special_row_ranges)
-        if special:
-            value_col = special["value_col"]
-            highlight_cols = special["highlight_cols"]
-            candidates: List[Tuple[str, any, Tuple, any]] = []
-
-            for ws, filename in ws_file_list:
-                val_cell = ws.range(f"{value_col}{row_index}")
-                val = val_cell.value
-                if not is_meaningful_value(val):
-                    continue
-
-                # detect any highlight in the row
-                found_fill = None
-                for col in highlight_cols:
-                    raw_fill = ws.range(f"{col}{row_index}").api.Interior.Color
-                    norm_fill = normalize_fill(raw_fill)
-                    if norm_fill is not None and norm_fill not in (
-                        0xFFFF00,
-                        65535,
-                    ):  # skip yellow or Excel light yellow
-                        found_fill = norm_fill
-                        break
-                if found_fill is None:
-                    continue
-
-                fmt = get_cell_format_signature(val_cell)
-                # prefer explicit fill from cell format if set
-                fill_color = found_fill
-                candidates.append((filename, val, fmt, fill_color))
-
-            # exactly one highlighted candidate
-            if len(candidates) == 1:
-                fn, val, fmt, fill = candidates[0]
-                out_val_cell = output_ws.range(f"{value_col}{row_index}")
-                out_val_cell.value = val
-                # copy font
-                try:
-                    out_val_cell.api.Font.Bold = val_cell.api.Font.Bold
-                    out_val_cell.api.Font.Color = val_cell.api.Font.Color
-                except Exception as e:
-                    print(f"⚠️ Font error on row {row_index}: {e}")
-                # copy highlight cells
-                source_ws = next((w for w, f in ws_file_list if f == fn), None)
-                if source_ws:
-                    for col in highlight_cols:
-                        inp = source_ws.range(f"{col}{row_index}")
-                        out = output_ws.range(f"{col}{row_index}")
-                        try:
-                            out.api.Interior.Color = inp.api.Interior.Color
-                        except Exception as e:
-                            print(f"⚠️ Fill copy error {col}{row_index}: {e}")
-                # apply cell fill
-                fill = normalize_fill(fill)
-                if fill is not None:
-                    try:
-                        out_val_cell.api.Interior.Color = fill
-                    except Exception as e:
-                        print(f"⚠️ Fill apply error on {value_col}{row_index}: {e}")
-                # technician column
-                if insert_or_fill_technician_column:
-                    insert_or_fill_technician_column(
-                        output_ws, row_index, fn, tech_col_letter
-                    )
-
-            # conflict among multiple highlights
-            elif len(candidates) > 1:
-                apply_conflict_highlight(output_cell)
-                # build 4-tuples for comment
-                comment_entries = [
-                    (fn, val, fmt, fill) for fn, val, fmt, fill in candidates
-                ]
-                add_conflict_comment(
-                    output_cell,
-                    comment_entries,
-                    output_ws=output_ws,
-                    tech_col_letter=tech_col_letter,
-                )
-            continue  # skip default logic for this row
 
-        # --- Default merging logic below ---
-        conflicts: List[Tuple[str, any, Tuple, any]] = []
-        winner_value = None
-        winner_fmt = None
-        winner_filename = None
-        best_fill_rgb = None  # For display / comparison
-        best_fill_excel = None  # For setting in Excel
-        winner_fill = None
-
-        for ws, filename in ws_file_list:
-            cell = ws.range(cell_address)
-            val = cell.value
-            if not is_meaningful_value(val):
+def is_plan_snapshot(ws, plan):
+    """True if ws is a snapshot taken for this plan (core.snapshot)."""
+    return getattr(ws, "positions", None) is plan.positions
+
+
+def stack_plan_cells(ws_file_list, plan, cells):
+    """
+    Stacks plan cells (indices into plan.cell_rows/cell_cols) of every file
+    into (files x cells) arrays: values, meaningful mask, bold, font colour
+    and normalized fill. Unset formats and "no fill" are -1.
+    """
+    shape = (len(ws_file_list), len(cells))
+    values = np.empty(shape, dtype=object)
+    bold = np.full(shape, -1, dtype=np.int64)
+    font = np.full(shape, -1, dtype=np.int64)
+    fill = np.full(shape, -1, dtype=np.int64)
+    if not cells:
+        return values, np.zeros(shape, dtype=bool), bold, font, fill
+
+    positions = np.asarray(plan.cell_positions, dtype=np.intp)[cells]
+    for t, (ws, _) in enumerate(ws_file_list):
+        if is_plan_snapshot(ws, plan):
+            # Gather straight from the snapshot's arrays
+            snapshot_values = ws.values
+            values[t, :] = [snapshot_values[p] for p in positions]
+            bold[t] = np.frombuffer(ws.bold, dtype=np.int8)[positions]
+            font[t] = np.frombuffer(ws.font_color, dtype=np.int64)[positions]
+            fill[t] = np.frombuffer(ws.fill, dtype=np.int64)[positions]
+            continue
+
+        for j, i in enumerate(cells):
+            row, col = plan.cell_rows[i], plan.cell_cols[i]
+            values[t, j] = ws.get_value(row, col)
+            if not is_meaningful_value(values[t, j]):
                 continue
-            fmt = get_cell_format_signature(cell)
-            try:
-                raw_fill = cell.api.DisplayFormat.Interior.Color
-            except Exception:
-                raw_fill = cell.api.Interior.Color
-
-            norm_fill = normalize_fill(raw_fill)
-            rgb_fill = int_to_rgb(norm_fill)
-            has_hi = rgb_fill is not None
-            print(f"{cell_address} | norm_fill: {norm_fill} | rgb_fill: {rgb_fill}")
-
-            if winner_fill is None:
-                # adopt first meaningful value
-                output_cell.value = val
-                try:
-                    output_cell.api.Font.Bold = cell.api.Font.Bold
-                    output_cell.api.Font.Color = cell.api.Font.Color
-                except Exception as e:
-                    print(f"⚠️ Font error at {cell_address}: {e}")
-                winner_value = val
-                winner_fmt = fmt
-                winner_filename = filename
-                winner_fill = norm_fill
-
-                if has_hi:
-                    best_fill_rgb = rgb_fill
-                    best_fill_excel = norm_fill
-
-                if insert_or_fill_technician_column:
-                    insert_or_fill_technician_column(
-                        output_ws, row_index, filename, tech_col_letter
-                    )
-            else:
-                conflict_entry = (filename, val, fmt, norm_fill)
-                if (
-                    val != winner_value
-                    or not formats_equal(fmt, winner_fmt)
-                    or (has_hi and rgb_fill != best_fill_rgb)
-                ):
-                    if conflict_entry not in conflicts:
-                        conflicts.append(conflict_entry)
-
-        # apply best fill
-        if best_fill_excel not in (None, 0xFFFFFF, -4142):
-            try:
-                output_cell.api.Interior.Color = best_fill_excel
-            except Exception as e:
-                print(f"⚠️ Fill error at {cell_address}: {e}")
+            cell_bold, cell_font, cell_fill = ws.get_format(row, col)
+            bold[t, j] = -1 if cell_bold is None else int(bool(cell_bold))
+            font[t, j] = -1 if cell_font is None else int(cell_font)
+            cell_fill = normalize_fill(cell_fill)
+            fill[t, j] = -1 if cell_fill is None else cell_fill
 
-        if conflicts:
-            # find the original cell and use its actual fill
-            winner_ws = next(
-                (ws for ws, fn in ws_file_list if fn == winner_filename), None
-            )
-            if winner_ws:
-                winner_fmt = get_cell_format_signature(winner_ws.range(cell_address))
-                winner_fill = best_fill_excel
-            else:
-                winner_fill = best_fill_excel
-            conflicts.insert(
-                0, (winner_filename, winner_value, winner_fmt, winner_fill)
-            )
+    meaningful = np.frompyfunc(is_meaningful_value, 1, 1)(values).astype(bool)
+    return values, meaningful, bold, font, fill
 
-            apply_conflict_highlight(output_cell)
-            add_conflict_comment(
-                output_cell,
-                conflicts,
-                output_ws=output_ws,
-                tech_col_letter=tech_col_letter,
+
+def find_winners(values, meaningful, bold, font, fill):
+    """
+    Resolves stacked cells in one pass. Returns (has_value, winner, conflict):
+    whether any file has a meaningful value, the index of the first file that
+    does, and a (files x cells) mask of files whose meaningful value differs
+    from the winner's in value, bold, font colour, or fill (a fill only
+    conflicts when the file has one and it is not the winner's).
+    """
+    has_value = meaningful.any(axis=0)
+    winner = meaningful.argmax(axis=0)
+    cells = np.arange(meaningful.shape[1])
+
+    differs = (values != values[winner, cells]).astype(bool)
+    differs |= bold != bold[winner, cells]
+    differs |= font != font[winner, cells]
+    differs |= (fill != -1) & (fill != fill[winner, cells])
+
+    conflict = meaningful & differs
+    conflict[winner, cells] = False
+    return has_value, winner, conflict
+
+
+def merge_plan_cells(ws_file_list, output_ws, plan, start, stop):
+    """
+    merge_cells over cells start..stop of a compiled plan. Cells outside the
+    special rows are resolved for the whole range at once (see find_winners);
+    Python only walks the files again for cells that actually conflict.
+    """
+    cells = [
+        i for i in range(start, stop) if plan.cell_rows[i] not in plan.special_rows
+    ]
+    values, meaningful, bold, font, fill = stack_plan_cells(ws_file_list, plan, cells)
+    has_value, winner, conflict = find_winners(values, meaningful, bold, font, fill)
+    column = {i: j for j, i in enumerate(cells)}
+
+    for i in range(start, stop):
+        row_index = plan.cell_rows[i]
+        col_index = plan.cell_cols[i]
+
+        if row_index in plan.special_rows:
+            merge_special_row(ws_file_list, output_ws, plan, row_index, col_index)
+            continue
+
+        # --- Default merging logic: first meaningful value wins ---
+        j = column[i]
+        if not has_value[j]:
+            continue
+
+        t = winner[j]
+        winner_ws, winner_filename = ws_file_list[t]
+        winner_entry = (
+            winner_filename,
+            values[t, j],
+            get_cell_format_signature(winner_ws, row_index, col_index),
+            int(fill[t, j]) if fill[t, j] != -1 else None,
+        )
+
+        conflicts: List[Tuple[str, any, Tuple, any]] = []
+        for t in np.flatnonzero(conflict[:, j]):
+            ws, filename = ws_file_list[t]
+            conflict_entry = (
+                filename,
+                values[t, j],
+                get_cell_format_signature(ws, row_index, col_index),
+                int(fill[t, j]) if fill[t, j] != -1 else None,
             )
+            if conflict_entry not in conflicts:
+                conflicts.append(conflict_entry)
 
+        apply_cell_result(
+            output_ws, plan, row_index, col_index, winner_entry, conflicts
+        )
 
-def formats_equal(fmt1, fmt2) -> bool:
+
+def apply_cell_result(output_ws, plan, row_index, col_index, winner, conflicts):
     """
-    Returns True if formatting is considered equivalent.
-    Ignores fill conflicts if one side is NO_FILL.
-    Assumes format is a tuple: (bold, font_rgb, fill_rgb)
+    Writes one resolved cell. winner is the (filename, value, fmt, fill) of
+    the first meaningful value; conflicts are the entries that differ from it.
     """
-    bold1, font1, fill1 = fmt1
-    bold2, font2, fill2 = fmt2
+    winner_filename, winner_value, winner_fmt, winner_fill = winner
 
-    if fill1 == "NO_FILL" or fill2 == "NO_FILL":
-        fill_matches = True
-    else:
-        fill_matches = fill1 == fill2
+    output_ws.set_value(row_index, col_index, winner_value)
+    try:
+        output_ws.set_font(
+            row_index, col_index, bold=winner_fmt[0], color=winner_fmt[1]
+        )
+    except Exception as e:
+        print(f"⚠️ Font error at {format_address(row_index, col_index)}: {e}")
+    if plan.tech_col:
+        fill_technician_column(output_ws, row_index, winner_filename, plan.tech_col)
 
-    return bold1 == bold2 and font1 == font2 and fill_matches
+    # apply winner's fill
+    if winner_fill is not None:
+        try:
+            output_ws.set_fill(row_index, col_index, winner_fill)
+        except Exception as e:
+            print(f"⚠️ Fill error at {format_address(row_index, col_index)}: {e}")
 
+    if not conflicts:
+        return
 
-def apply_conflict_highlight(cell):
+    apply_conflict_highlight(output_ws, row_index, col_index)
+    add_conflict_comment(
+        output_ws,
+        row_index,
+        col_index,
+        [winner] + list(conflicts),
+        tech_col_letter=plan.tech_col_letter,
+    )
+
+
+def merge_special_row(ws_file_list, output_ws, plan, row_index, col_index):
+    """
+    Special merging logic for highlighted rows: the value comes from the one
+    technician who highlighted the row; several highlights are a conflict.
+    """
+    value_col, highlight_cols = plan.special_rows[row_index]
+    candidates = []
+    for ws, filename in ws_file_list:
+        candidate = special_row_candidate(
+            ws, filename, row_index, value_col, highlight_cols
+        )
+        if candidate:
+            candidates.append(candidate)
+    apply_special_row(output_ws, plan, row_index, col_index, candidates)
+
+
+def special_row_candidate(ws, filename, row_index, value_col, highlight_cols):
+    """
+    Returns (filename, value, fmt, fill, highlight_fills) if ws recorded a
+    value on a special row and highlighted the row, otherwise None.
+    """
+    val = ws.get_value(row_index, value_col)
+    if not is_meaningful_value(val):
+        return None
+
+    # detect any highlight in the row
+    found_fill = None
+    for col in highlight_cols:
+        raw_fill = ws.get_fill(row_index, col)
+        norm_fill = normalize_fill(raw_fill)
+        if norm_fill is not None and norm_fill not in (
+            0xFFFF00,
+            65535,
+        ):  # skip yellow or Excel light yellow
+            found_fill = norm_fill
+            break
+    if found_fill is None:
+        return None
+
+    fmt = get_cell_format_signature(ws, row_index, value_col)
+    # prefer explicit fill from cell format if set
+    fill_color = found_fill
+    highlight_fills = tuple(ws.get_fill(row_index, col) for col in highlight_cols)
+    return (filename, val, fmt, fill_color, highlight_fills)
+
+
+def apply_special_row(output_ws, plan, row_index, col_index, candidates):
+    """Writes a special row from its special_row_candidate entries."""
+    value_col, highlight_cols = plan.special_rows[row_index]
+
+    # exactly one highlighted candidate
+    if len(candidates) == 1:
+        fn, val, fmt, fill, highlight_fills = candidates[0]
+        output_ws.set_value(row_index, value_col, val)
+        # copy font
+        try:
+            output_ws.set_font(row_index, value_col, bold=fmt[0], color=fmt[1])
+        except Exception as e:
+            print(f"⚠️ Font error on row {row_index}: {e}")
+        # copy highlight cells
+        for col, source_fill in zip(highlight_cols, highlight_fills):
+            try:
+                output_ws.set_fill(row_index, col, source_fill)
+            except Exception as e:
+                address = format_address(row_index, col)
+                print(f"⚠️ Fill copy error {address}: {e}")
+        # apply cell fill
+        fill = normalize_fill(fill)
+        if fill is not None:
+            try:
+                output_ws.set_fill(row_index, value_col, fill)
+            except Exception as e:
+                print(f"⚠️ Fill apply error on row {row_index}: {e}")
+        # technician column
+        if plan.tech_col:
+            fill_technician_column(output_ws, row_index, fn, plan.tech_col)
+
+    # conflict among multiple highlights
+    elif len(candidates) > 1:
+        apply_conflict_highlight(output_ws, row_index, col_index)
+        # build 4-tuples for comment
+        comment_entries = [(fn, val, fmt, fill) for fn, val, fmt, fill, _ in candidates]
+        add_conflict_comment(
+            output_ws,
+            row_index,
+            col_index,
+            comment_entries,
+            tech_col_letter=plan.tech_col_letter,
+        )
+
+
+def apply_conflict_highlight(ws, row: int, col: int):
     """Applies a pastel purple background to a cell."""
-    pastel_purple_rgb = (221, 210, 233)  # Hex #DDD2E9
-    cell.color = pastel_purple_rgb
+    ws.set_fill(row, col, CONFLICT_FILL)
 
 
 def add_conflict_comment(
-    cell,
+    output_ws,
+    row: int,
+    col: int,
     conflicts: List[Tuple[str, any, Tuple, any]],
-    output_ws=None,
     tech_col_letter=None,
 ):
     """
@@ -417,26 +572,21 @@ def add_conflict_comment(
         return
 
     # Figure out the "Original" sheet name, if any
-    row_idx = cell.row
     orig_name = "Original"
-    if output_ws and tech_col_letter:
-        tech_val = output_ws.range(f"{tech_col_letter}{row_idx}").value
+    if tech_col_letter:
+        tech_val = output_ws.get_value(row, column_index(tech_col_letter))
         if tech_val:
             orig_name = tech_val
 
     # Build a list of (sheet, value_str, fill_name)
+    # with every fill mapped to its nearest name in one classifier call
+    fill_names = get_classifier().classify_many(
+        [normalize_fill(fill) for _, _, _, fill in conflicts]
+    )
     entries: List[Tuple[str, str, str]] = []
-    for entry in conflicts:
-        # unpack the 4-tuple (filename, val, fmt, fill)
-        fn, val, fmt, fill = entry
+    for (fn, val, _, _), fill_name in zip(conflicts, fill_names):
         name = clean_filename(orig_name if fn == "Original" else fn)
-        val_str = str(val).strip()
-
-        rgb = int_to_rgb(normalize_fill(fill))
-
-        # map to the nearest name
-        fill_name = closest_named_color(rgb)
-        entries.append((name, val_str, fill_name))
+        entries.append((name, str(val).strip(), fill_name))
 
     # figure out which attribute changed
     vals = {v for _, v, _ in entries}
@@ -457,54 +607,23 @@ def add_conflict_comment(
             lines.append(f"{name}: '{v}' | fill={f}")
 
     comment_text = "[Conflict]\n" + "\n".join(lines)
-    print(f"[DEBUG] {name}: raw_fill={fill}, rgb={rgb}, closest={fill_name}")
 
     # log and replace any existing comment
     try:
-        if output_ws:
-            merge_conflict_log.append(output_ws.name)
+        merge_conflict_log.append(output_ws.name)
     except Exception:
         pass
 
     try:
-        # clear old
-        try:
-            cell.api.ClearComments()
-        except Exception as e:
-            print(f"could not clear comment with error {e}. Deleting instead.")
-            if getattr(cell.api, "Comment", None):
-                cell.api.Comment.Delete()
-        # add new
-        cell.api.AddComment(comment_text)
+        output_ws.set_comment(row, col, comment_text)
     except Exception as e:
-        print(f"❌ Failed to add conflict comment on {cell.address}: {e}")
+        print(f"❌ Failed to add conflict comment on {format_address(row, col)}: {e}")
 
 
 def clean_filename(name: str) -> str:
     return name.replace(".xlsx", "").strip()
 
 
-def short_format_description(fmt: Tuple) -> str:
-    bold = "Bold" if fmt[0] else "Regular"
-    fill = fmt[2]
-    fill_str = "No Fill" if fill == "NO_FILL" else "Colored Fill"
-    return f"{bold}, {fill_str}"
-
-
-def format_signature_to_string(fmt: Tuple) -> str:
-    fill_rgb = fmt[2]
-
-    if fill_rgb in ("NO_FILL", None, 0xFFFFFF, -4142):
-        return "No fill"
-
-    try:
-        rgb = int_to_rgb(fill_rgb)
-        return f"{closest_named_color(rgb)} fill"
-    except Exception as e:
-        print(f"⚠️ Failed to interpret fill color: {fill_rgb} → {e}")
-        return "Unknown fill"
-
-
 def insert_or_fill_technician_column(
     output_ws, row_index: int, technician_name: str, col_letter: str
 ):
@@ -512,11 +631,16 @@ def insert_or_fill_technician_column(
     Writes the technician name at the specified row in a target column,
     and hides the column if not already hidden.
     """
-    cell = output_ws.range(f"{col_letter}{row_index}")
-    cell.value = technician_name
+    fill_technician_column(
+        output_ws, row_index, technician_name, column_index(col_letter)
+    )
+
+
+def fill_technician_column(output_ws, row_index: int, technician_name: str, col: int):
+    """insert_or_fill_technician_column for a 1-based column index."""
+    output_ws.set_value(row_index, col, technician_name)
 
-    # Hide the column using the COM API layer
     try:
-        cell.api.EntireColumn.Hidden = True
+        output_ws.hide_column(col)
     except Exception as e:
-        print(f"⚠️ Could not hide column {col_letter}: {e}")
+        print(f"⚠️ Could not hide column {column_letter(col)}: {e}")
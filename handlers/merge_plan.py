@@ -0,0 +1,308 @@
+"""
+Compiled merge plans.
+
+Handler modules describe what to merge as lists of A1 addresses
+(MERGE_CELLS, MERGE_CHECKBOX_GROUPS, their *_BY_PAGE splits,
+MEANINGFUL_ANCHORS, SPECIAL_ROW_RANGES and TECH_COL_LETTER). compile_plan
+turns those into normalised, de-duplicated integer coordinates held in flat
+arrays, so the merge loops never parse address strings. Plans are compiled
+on first use and cached for the life of the process.
+
+Sheets whose pages repeat one layout at fixed row offsets declare a
+PAGE_TEMPLATE instead of enumerating every page:
+
+    PAGE_TEMPLATE = {
+        "row_offsets": [0, 45, 90],     # or "stride": 45, "pages": 3
+        "cells": ["F6", "M17", ...],    # page 1 addresses
+        "checkbox_columns": ["L", "N", "P"],
+        "checkbox_rows": [15, 16, ...],  # one group per row over those columns
+        "checkbox_groups": [["L9", "N9"], ...],  # irregular page 1 groups
+        "anchors": ["K37", "M17"],
+        "special_rows": [{"rows": range(17, 23), "value_col": "M",
+                          "highlight_cols": ["A", "M"]}],
+        "blocks": [{"stride": 40, "cells": ["A9", ...], "anchors": [...]}],
+    }
+
+Every page is page 1 shifted down by its row offset, anchors and special
+rows included. A part of the page that drifts at a different rate goes in
+"blocks": each block is a template of its own (its own "row_offsets" or
+"stride", same keys otherwise) whose pages are appended to the main ones.
+Pages are expanded one at a time while the plan compiles.
+"""
+
+import hashlib
+import importlib
+from array import array
+from functools import lru_cache
+from itertools import zip_longest
+
+from utils.cell_refs import column_index, parse_address
+
+
+class MergePlan:
+    """
+    Array-backed description of one sheet's merge.
+
+    Cells:   cell_rows/cell_cols[i], page_cells[p] = (start, stop) into them
+    Groups:  options of group g are option_rows/option_cols[
+             group_starts[g]:group_starts[g + 1]], page_groups[p] = (start,
+             stop) into the groups
+    Anchors: page_anchors[p] is a tuple of (row, col); an empty tuple means
+             the page is always merged
+    Special: special_rows[row] = (value_col, highlight_cols)
+
+    coords lists every cell the merge reads, sorted; the index of a cell in
+    coords is its plan position (see positions). cell_positions[i] and
+    option_positions[k] are the plan positions of cell i and option k.
+    """
+
+    def __init__(self, name, tech_col=None):
+        self.name = name
+        self.tech_col = tech_col
+        self.tech_col_letter = None
+        self.cell_rows = array("i")
+        self.cell_cols = array("i")
+        self.page_cells = []
+        self.option_rows = array("i")
+        self.option_cols = array("i")
+        self.group_starts = array("i", [0])
+        self.page_groups = []
+        self.page_anchors = []
+        self.special_rows = {}
+        self.coords = []
+        self.positions = {}
+        self.cell_positions = array("i")
+        self.option_positions = array("i")
+
+    @property
+    def page_count(self):
+        return len(self.page_cells)
+
+    @property
+    def cell_count(self):
+        return len(self.cell_rows)
+
+    @property
+    def group_count(self):
+        return len(self.group_starts) - 1
+
+    def group_options(self, g):
+        """Returns the (row, col) options of group g, left to right."""
+        start, stop = self.group_starts[g], self.group_starts[g + 1]
+        return list(zip(self.option_rows[start:stop], self.option_cols[start:stop]))
+
+    def highlight_coords(self):
+        """Special-row cells whose fill matters even without a value."""
+        coords = []
+        for row, (value_col, highlight_cols) in self.special_rows.items():
+            coords.append((row, value_col))
+            coords.extend((row, col) for col in highlight_cols)
+        return coords
+
+    def fingerprint(self):
+        """Hash of the plan's layout; changes whenever what it merges does."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((self.name, self.tech_col)).encode())
+        for values in (
+            self.cell_rows,
+            self.cell_cols,
+            self.option_rows,
+            self.option_cols,
+            self.group_starts,
+        ):
+            digest.update(values.tobytes())
+        digest.update(
+            repr(
+                (
+                    self.page_cells,
+                    self.page_groups,
+                    self.page_anchors,
+                    sorted(self.special_rows.items()),
+                )
+            ).encode()
+        )
+        return digest.hexdigest()
+
+    def read_coords(self):
+        """Every cell the merge reads, sorted; the order defines plan position."""
+        coords = set(zip(self.cell_rows, self.cell_cols))
+        coords.update(zip(self.option_rows, self.option_cols))
+        for anchors in self.page_anchors:
+            coords.update(anchors)
+        coords.update(self.highlight_coords())
+        return sorted(coords)
+
+
+def _coord(ref):
+    return parse_address(ref) if isinstance(ref, str) else tuple(ref)
+
+
+def compile_plan(
+    name,
+    cells_by_page,
+    groups_by_page=None,
+    anchors_by_page=None,
+    special_row_ranges=None,
+    tech_col_letter=None,
+):
+    """
+    Compiles page lists of A1 addresses into a MergePlan. Addresses are
+    upper-cased and de-duplicated (the first occurrence wins); duplicate
+    checkbox groups are dropped the same way.
+    """
+    pages = zip_longest(
+        cells_by_page, groups_by_page or [], anchors_by_page or [], fillvalue=()
+    )
+    return compile_pages(name, pages, special_row_ranges, tech_col_letter)
+
+
+def compile_pages(name, pages, special_row_ranges=None, tech_col_letter=None):
+    """
+    Compiles an iterable of (cells, checkbox_groups, anchors) pages into a
+    MergePlan, consuming it one page at a time. Cells may be given as A1
+    addresses or as (row, col) pairs.
+    """
+    plan = MergePlan(name, column_index(tech_col_letter) if tech_col_letter else None)
+    plan.tech_col_letter = tech_col_letter
+
+    seen_cells = set()
+    seen_groups = set()
+    for cells, groups, anchors in pages:
+        start = len(plan.cell_rows)
+        for ref in cells:
+            coord = _coord(ref)
+            if coord in seen_cells:
+                continue
+            seen_cells.add(coord)
+            plan.cell_rows.append(coord[0])
+            plan.cell_cols.append(coord[1])
+        plan.page_cells.append((start, len(plan.cell_rows)))
+
+        start = plan.group_count
+        for group in groups:
+            options = []
+            for ref in group:
+                coord = _coord(ref)
+                if coord not in options:
+                    options.append(coord)
+            key = tuple(options)
+            if not options or key in seen_groups:
+                continue
+            seen_groups.add(key)
+            for row, col in options:
+                plan.option_rows.append(row)
+                plan.option_cols.append(col)
+            plan.group_starts.append(len(plan.option_rows))
+        plan.page_groups.append((start, plan.group_count))
+
+        plan.page_anchors.append(tuple(_coord(ref) for ref in anchors))
+
+    for special in special_row_ranges or []:
+        value_col = column_index(special["value_col"])
+        highlight_cols = tuple(column_index(c) for c in special["highlight_cols"])
+        for row in special["rows"]:
+            plan.special_rows.setdefault(row, (value_col, highlight_cols))
+
+    plan.coords = plan.read_coords()
+    plan.positions = {coord: i for i, coord in enumerate(plan.coords)}
+    plan.cell_positions = array(
+        "i",
+        (plan.positions[coord] for coord in zip(plan.cell_rows, plan.cell_cols)),
+    )
+    plan.option_positions = array(
+        "i",
+        (plan.positions[coord] for coord in zip(plan.option_rows, plan.option_cols)),
+    )
+    return plan
+
+
+def template_row_offsets(template, pages=None):
+    """
+    Row offset of every page of a PAGE_TEMPLATE (page 1 is 0). pages is the
+    page count of a block whose template doesn't give its own.
+    """
+    if "row_offsets" in template:
+        return list(template["row_offsets"])
+    return [page * template["stride"] for page in range(template.get("pages", pages))]
+
+
+def expand_page_template(template, pages=None):
+    """
+    Yields (cells, checkbox_groups, anchors) for each page of a PAGE_TEMPLATE
+    as (row, col) pairs, the main layout's before its blocks'. Checkbox
+    groups are ordered by row.
+    """
+    cells = [parse_address(ref) for ref in template.get("cells", [])]
+    columns = [column_index(col) for col in template.get("checkbox_columns", [])]
+    groups = [
+        [(row, col) for col in columns] for row in template.get("checkbox_rows", [])
+    ]
+    groups += [
+        [parse_address(ref) for ref in group]
+        for group in template.get("checkbox_groups", [])
+    ]
+    groups.sort()
+    anchors = [parse_address(ref) for ref in template.get("anchors", [])]
+
+    offsets = template_row_offsets(template, pages)
+    blocks = [
+        expand_page_template(block, len(offsets))
+        for block in template.get("blocks", [])
+    ]
+    for offset in offsets:
+        page_cells = [(row + offset, col) for row, col in cells]
+        page_groups = [[(row + offset, col) for row, col in group] for group in groups]
+        page_anchors = [(row + offset, col) for row, col in anchors]
+        for block in blocks:
+            block_cells, block_groups, block_anchors = next(block)
+            page_cells += block_cells
+            page_groups += block_groups
+            page_anchors += block_anchors
+        yield page_cells, page_groups, page_anchors
+
+
+def expand_special_rows(template, pages=None):
+    """Yields the template's SPECIAL_ROW_RANGES entries for every page."""
+    offsets = template_row_offsets(template, pages)
+    for offset in offsets:
+        for special in template.get("special_rows", []):
+            yield {
+                "rows": [row + offset for row in special["rows"]],
+                "value_col": special["value_col"],
+                "highlight_cols": special["highlight_cols"],
+            }
+    for block in template.get("blocks", []):
+        yield from expand_special_rows(block, len(offsets))
+
+
+def compile_module_plan(module):
+    """Compiles the plan declared by a handler module's constants."""
+    template = getattr(module, "PAGE_TEMPLATE", None)
+    if template is not None:
+        return compile_pages(
+            module.__name__,
+            expand_page_template(template),
+            expand_special_rows(template),
+            getattr(module, "TECH_COL_LETTER", None),
+        )
+
+    cells_by_page = getattr(module, "MERGE_CELLS_BY_PAGE", None) or [
+        getattr(module, "MERGE_CELLS", [])
+    ]
+    groups_by_page = getattr(module, "MERGE_CHECKBOX_GROUPS_BY_PAGE", None) or [
+        getattr(module, "MERGE_CHECKBOX_GROUPS", [])
+    ]
+    return compile_plan(
+        module.__name__,
+        cells_by_page,
+        groups_by_page,
+        getattr(module, "MEANINGFUL_ANCHORS", None),
+        getattr(module, "SPECIAL_ROW_RANGES", None),
+        getattr(module, "TECH_COL_LETTER", None),
+    )
+
+
+@lru_cache(maxsize=None)
+def module_plan(module_name):
+    """Returns the cached compiled plan for a handler module."""
+    return compile_module_plan(importlib.import_module(module_name))
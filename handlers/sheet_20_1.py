@@ -1,7 +1,5 @@
-from handlers.handler_base import (
-    merge_cells,
-    merge_checkbox_groups,
-)
+from handlers.handler_base import merge_sheet
+from handlers.merge_plan import module_plan
 
 
 # List of cells/ranges to merge for this sheet
@@ -18,13 +16,13 @@ MERGE_CHECKBOX_GROUPS = [
     ["M34", "Q34"],
 ]
 
+# Column where the contributing technician is recorded (hidden in the output)
+TECH_COL_LETTER = "T"
+
 
 def merge_20_1_report(ws_file_list, output_ws):
     """
     ws_file_list: List of tuples (worksheet, filename)
     output_ws: xlwings sheet where data will be merged
     """
-    merge_cells(ws_file_list, output_ws, MERGE_CELLS, tech_col_letter="T")
-    merge_checkbox_groups(
-        ws_file_list, output_ws, MERGE_CHECKBOX_GROUPS, tech_col_letter="T"
-    )
+    merge_sheet(ws_file_list, output_ws, module_plan(__name__))
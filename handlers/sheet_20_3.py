@@ -1,12 +1,16 @@
-from handlers.handler_base import merge_cells
+from handlers.handler_base import merge_sheet
+from handlers.merge_plan import module_plan
 
 # Cells A6 to A13 need to be merged and checked for conflicts
 MERGE_CELLS = ["A6", "A7", "A8", "A9", "A10", "A11", "A12", "A13"]
 
+# Column where the contributing technician is recorded (hidden in the output)
+TECH_COL_LETTER = "O"
+
 
 def merge_20_3_recommendations(ws_file_list, output_ws):
     """
     Merges the 20.3 | Recommendations sheet from multiple technician workbooks.
     Performs cell-by-cell merging with conflict detection and technician tagging.
     """
-    merge_cells(ws_file_list, output_ws, MERGE_CELLS, tech_col_letter="O")
+    merge_sheet(ws_file_list, output_ws, module_plan(__name__))
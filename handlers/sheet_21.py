@@ -1,4 +1,5 @@
-from handlers.handler_base import merge_cells, merge_checkbox_groups
+from handlers.handler_base import merge_sheet
+from handlers.merge_plan import module_plan
 
 # Placeholder cells to merge (you can update these later)
 MERGE_CELLS = [
@@ -42,6 +43,9 @@ MERGE_CHECKBOX_GROUPS = [
     ["L24", "N24", "P24"],
 ]
 
+# Column where the contributing technician is recorded (hidden in the output)
+TECH_COL_LETTER = "S"
+
 
 def merge_21_documentation(ws_file_list, output_ws):
     """
@@ -49,7 +53,4 @@ def merge_21_documentation(ws_file_list, output_ws):
     Handles cell-by-cell conflicts and exclusive checkbox group conflicts.
     Technician names are tagged in column 'S'.
     """
-    merge_cells(ws_file_list, output_ws, MERGE_CELLS, tech_col_letter="S")
-    merge_checkbox_groups(
-        ws_file_list, output_ws, MERGE_CHECKBOX_GROUPS, tech_col_letter="S"
-    )
+    merge_sheet(ws_file_list, output_ws, module_plan(__name__))
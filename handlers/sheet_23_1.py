@@ -1,6 +1,5 @@
-from handlers.handler_base import (
-    merge_cells,
-)
+from handlers.handler_base import merge_sheet
+from handlers.merge_plan import module_plan
 
 
 # List of cells/ranges to merge for this sheet
@@ -56,10 +55,13 @@ MERGE_CELLS = [
     "N38",
 ]
 
+# Column where the contributing technician is recorded (hidden in the output)
+TECH_COL_LETTER = "Q"
+
 
 def merge_23_1_field_device(ws_file_list, output_ws):
     """
     ws_file_list: List of tuples (worksheet, filename)
     output_ws: xlwings sheet where data will be merged
     """
-    merge_cells(ws_file_list, output_ws, MERGE_CELLS, tech_col_letter="Q")
+    merge_sheet(ws_file_list, output_ws, module_plan(__name__))
@@ -1,4 +1,5 @@
-from handlers.handler_base import merge_cells, merge_checkbox_groups, is_page_meaningful
+from handlers.handler_base import merge_sheet
+from handlers.merge_plan import module_plan
 
 MERGE_CELLS = [
     # Page 1
@@ -110,17 +111,9 @@ MEANINGFUL_ANCHORS = [
     ["F68", "F69"],  # Page 4
 ]
 
+# Column where the contributing technician is recorded (hidden in the output)
+TECH_COL_LETTER = "R"
 
-def merge_23_24_Voice_PS(ws_file_list, output_ws):
-    for i, (merge_cells_page, checkbox_groups_page) in enumerate(
-        zip(MERGE_CELLS_BY_PAGE, MERGE_CHECKBOX_GROUPS_BY_PAGE)
-    ):
-        anchor_cells = MEANINGFUL_ANCHORS[i]
-        if not is_page_meaningful(ws_file_list, anchor_cells):
-            print(f"Page {i + 1} is blank — skipping this and all following pages.")
-            break
 
-        merge_cells(ws_file_list, output_ws, merge_cells_page, tech_col_letter="R")
-        merge_checkbox_groups(
-            ws_file_list, output_ws, checkbox_groups_page, tech_col_letter="R"
-        )
+def merge_23_24_Voice_PS(ws_file_list, output_ws):
+    merge_sheet(ws_file_list, output_ws, module_plan(__name__))
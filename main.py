@@ -1,5 +1,11 @@
 # Entry point for the V8 merger GUI application
 
-if __name__ == '__main__':
+if __name__ == "__main__":
+    # Extraction workers are separate processes; needed for frozen builds
+    from multiprocessing import freeze_support
+
+    freeze_support()
+
     from gui.app_window import launch_app
+
     launch_app()
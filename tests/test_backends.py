@@ -0,0 +1,81 @@
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from backends import open_workbook
+from backends.base import EXCEL_NO_FILL, get_sheet
+from backends.memory_backend import MemorySheet, MemoryWorkbook
+
+SHEET = "22.2"
+AREA = (1, 1, 5, 4)
+
+
+def write(ws):
+    ws.set_value(2, 2, "OK")
+    ws.write_block(3, 2, [[1, "x"], [None, 2.5]])
+    ws.set_font_block(2, 2, 3, 3, bold=True, color=255)
+    ws.set_font(4, 2, color=0xFF0000)  # bold left as it is
+    ws.set_fill_block(3, 2, 4, 3, 0x00FFFF)
+    ws.set_fill(2, 2, 0x00FF00)
+    ws.set_comment(2, 2, "[Conflict]")
+    ws.hide_column(6)
+
+
+def contents(ws):
+    min_row, min_col, max_row, max_col = AREA
+    cells = [
+        (row, col)
+        for row in range(min_row, max_row + 1)
+        for col in range(min_col, max_col + 1)
+    ]
+    return (
+        ws.read_block(*AREA),
+        [ws.get_format(*cell) for cell in cells],
+        [ws.get_fill(*cell) for cell in cells],
+    )
+
+
+def test_memory_sheets_behave_like_saved_openpyxl_sheets(tmp_path):
+    path = str(tmp_path / "out.xlsx")
+    wb = Workbook()
+    wb.active.title = SHEET
+    wb.save(path)
+    file_wb = open_workbook(path, "openpyxl")
+    write(file_wb.sheet(SHEET))
+    file_wb.save()
+    file_wb.close()
+    memory = MemoryWorkbook("out.xlsx").add_sheet(SHEET)
+    write(memory)
+
+    file_wb = open_workbook(path, "openpyxl")
+    assert contents(file_wb.sheet(SHEET)) == contents(memory)
+    file_wb.close()
+    saved = load_workbook(path)[SHEET]
+    assert saved["B2"].comment.text == memory.comments[(2, 2)]
+    assert saved.column_dimensions["F"].hidden and memory.hidden_columns == {6}
+
+
+def test_memory_sheets_take_a1_or_row_col_keys():
+    ws = MemorySheet(
+        SHEET,
+        values={"C2": "OK", (3, 3): 1},
+        fonts={"c2": (True, 255)},
+        fills={"C2": 0x00FFFF},
+        display_fills={"C2": 0xFF0000},
+    )
+
+    assert ws.read_block(2, 3, 3, 3) == [["OK"], [1]]
+    # Conditional formatting shows in get_format, not in get_fill
+    assert ws.get_format(2, 3) == (True, 255, 0xFF0000)
+    assert ws.get_fill(2, 3) == 0x00FFFF
+    assert ws.get_format(3, 3) == (False, 0, EXCEL_NO_FILL)
+
+
+def test_sheets_are_looked_up_by_name():
+    wb = MemoryWorkbook("out.xlsx", [MemorySheet("1.1")])
+    added = wb.add_sheet(SHEET)
+
+    assert wb.sheet_names == ["1.1", SHEET]
+    assert get_sheet(wb, SHEET) is added
+    assert get_sheet(wb, "9.9") is None
+    with pytest.raises(KeyError):
+        wb.sheet("9.9")
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from core.batch import load_manifest, run_site
+
+
+def write_manifest(folder, manifest):
+    path = folder / "sites.json"
+    path.write_text(json.dumps(manifest), encoding="utf-8")
+    return str(path)
+
+
+def touch(folder, *names):
+    for name in names:
+        (folder / name).write_bytes(b"")
+
+
+def test_globs_resolve_next_to_the_manifest_sorted_and_deduplicated(tmp_path):
+    (tmp_path / "north").mkdir()
+    touch(tmp_path / "north", "tech2.xlsx", "tech1.xlsx", "notes.txt")
+    path = write_manifest(
+        tmp_path,
+        {
+            "template": "template.xlsx",
+            "engine": "xlwings",
+            "sites": [
+                {
+                    "inputs": ["north/tech1.xlsx", "north/*.xlsx"],
+                    "output": "out/north.xlsx",
+                }
+            ],
+        },
+    )
+
+    (site,) = load_manifest(path)
+
+    north = tmp_path / "north"
+    assert site["inputs"] == [str(north / "tech1.xlsx"), str(north / "tech2.xlsx")]
+    assert site["output"] == str(tmp_path / "out" / "north.xlsx")
+    assert site["name"] == "north"
+    assert site["template"] == str(tmp_path / "template.xlsx")
+    assert site["engine"] == "xlwings"
+
+
+def test_site_settings_override_the_manifest_defaults(tmp_path):
+    path = write_manifest(
+        tmp_path,
+        {
+            "template": "template.xlsx",
+            "engine": "xlwings",
+            "sites": [
+                {
+                    "name": "South",
+                    "inputs": ["missing.xlsx"],
+                    "output": "south.xlsx",
+                    "template": "other.xlsx",
+                    "engine": "openpyxl",
+                }
+            ],
+        },
+    )
+
+    (site,) = load_manifest(path)
+
+    # A literal path is kept even if it doesn't exist yet
+    assert site["inputs"] == [str(tmp_path / "missing.xlsx")]
+    assert site["name"] == "South"
+    assert site["template"] == str(tmp_path / "other.xlsx")
+    assert site["engine"] == "openpyxl"
+
+
+def test_a_site_whose_globs_match_nothing_fails(tmp_path):
+    touch(tmp_path, "template.xlsx")
+    path = write_manifest(
+        tmp_path,
+        {
+            "template": "template.xlsx",
+            "sites": [{"inputs": ["empty/*.xlsx"], "output": "x.xlsx"}],
+        },
+    )
+
+    (site,) = load_manifest(path)
+    result = run_site(site)
+
+    assert site["inputs"] == []
+    assert result["status"] == "failed"
+    assert result["error"] == "FileNotFoundError: No inputs matched"
+    # The template copy is never made, so no blank output is left behind
+    assert not (tmp_path / "x.xlsx").exists()
+
+
+@pytest.mark.parametrize(
+    "site",
+    [{"output": "x.xlsx"}, {"inputs": [], "output": "x.xlsx"}, {"inputs": ["a"]}],
+)
+def test_sites_need_inputs_and_an_output(tmp_path, site):
+    path = write_manifest(tmp_path, {"template": "t.xlsx", "sites": [site]})
+
+    with pytest.raises(ValueError, match="Site 1"):
+        load_manifest(path)
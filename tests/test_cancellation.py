@@ -0,0 +1,112 @@
+import shutil
+import threading
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+from openpyxl import load_workbook
+
+from benchmarks.synthetic import generate_site, generate_template
+from core.cancellation import (
+    INCOMPLETE_SHEET,
+    CancelToken,
+    MergeCancelled,
+    cancellation_scope,
+    check_cancelled,
+)
+from core.merger import merge
+
+
+@pytest.fixture(scope="module")
+def site(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("site")
+    paths = generate_site(str(directory), technicians=2, pages=1, seed=3)
+    template = generate_template(str(directory / "template.xlsx"))
+    return directory, paths, template
+
+
+def test_a_budget_only_ever_moves_the_deadline_earlier():
+    token = CancelToken(deadline=0)
+
+    assert token.with_budget(60).deadline == 0
+    assert token.reason() == "Merge time budget exceeded"
+    assert CancelToken().with_budget(60).reason() is None
+
+
+def test_a_budgeted_token_shares_the_flag():
+    token = CancelToken()
+    budgeted = token.with_budget(60)
+
+    token.cancel()
+
+    assert budgeted.reason() == "Merge cancelled"
+
+
+def test_checks_consult_the_scope_of_the_current_thread():
+    token = CancelToken()
+    token.cancel()
+    other_thread = []
+
+    with cancellation_scope(token):
+        with pytest.raises(MergeCancelled, match="Merge cancelled"):
+            check_cancelled()
+        thread = threading.Thread(target=lambda: other_thread.append(check_cancelled()))
+        thread.start()
+        thread.join()
+
+    check_cancelled()  # out of scope again
+    assert other_thread == [None]
+
+
+def cancelling_merge(site, name, cancel_on, **options):
+    """Merges the site, cancelling at the first progress message cancel_on."""
+    directory, paths, template = site
+    output = str(directory / name)
+    shutil.copyfile(template, output)
+    token = CancelToken()
+
+    def progress(pct, message):
+        if message.startswith(cancel_on):
+            token.cancel()
+
+    with redirect_stdout(StringIO()), pytest.raises(MergeCancelled) as cancelled:
+        merge(paths, output, progress, engine="openpyxl", cancel=token, **options)
+    return output, cancelled.value
+
+
+@pytest.mark.parametrize("mode", [{"workers": 1}, {"streaming": True}])
+def test_a_discarded_merge_leaves_the_output_untouched(site, mode):
+    _, _, template = site
+
+    output, cancelled = cancelling_merge(site, "discard.xlsx", "Merg", **mode)
+
+    assert not cancelled.partial
+    assert cancelled.metrics.status == "cancelled"
+    with open(output, "rb") as out, open(template, "rb") as original:
+        assert out.read() == original.read()
+
+
+def test_a_partial_merge_lists_what_is_missing(site):
+    output, cancelled = cancelling_merge(
+        site, "partial.xlsx", "Merged sheet", workers=1, on_cancel="partial"
+    )
+
+    assert cancelled.partial
+    lines = [row[0] for row in load_workbook(output)[INCOMPLETE_SHEET].values]
+    assert lines[0].startswith("Merge cancelled")
+    heading = lines.index("Not merged:")
+    merged = lines[lines.index("Merged sheets:") + 1 : heading - 1]
+    missing = lines[heading + 1 :]
+    assert len(merged) == 1
+    assert missing and not set(merged) & set(missing)
+
+
+def test_a_spent_time_budget_cancels_before_any_work(site):
+    directory, paths, template = site
+    output = str(directory / "budget.xlsx")
+    shutil.copyfile(template, output)
+
+    with redirect_stdout(StringIO()), pytest.raises(MergeCancelled) as cancelled:
+        merge(paths, output, engine="openpyxl", workers=1, time_budget=0)
+
+    assert cancelled.value.reason == "Merge time budget exceeded"
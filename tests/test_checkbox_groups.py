@@ -0,0 +1,71 @@
+import numpy as np
+
+from backends.memory_backend import MemorySheet
+from core.snapshot import SheetSnapshot
+from handlers.handler_base import (
+    CONFLICT_FILL,
+    merge_checkbox_groups,
+    merge_conflict_log,
+    stack_checkbox_groups,
+)
+from handlers.merge_plan import compile_plan
+
+GROUPS = [["B2", "C2", "D2"], ["B3", "C3"], ["B4", "C4", "D4"], ["B5", "C5"]]
+
+
+def test_only_true_counts_as_ticked_and_short_groups_are_padded():
+    plan = compile_plan("checks", [], [GROUPS])
+    ws = MemorySheet(
+        "checks",
+        values={"C2": True, "B3": "True", "C3": 1, "B4": False, "D4": True},
+    )
+
+    checked = stack_checkbox_groups([(ws, "tech1.xlsx")], plan, 0, plan.group_count)
+
+    assert checked.shape == (1, 4, 3)
+    assert checked[0].tolist() == [
+        [False, True, False],
+        [False, False, False],
+        [False, False, True],
+        [False, False, False],
+    ]
+    # A snapshot of the plan gives the same tensor
+    snapshot = SheetSnapshot(ws, plan)
+    from_snapshot = stack_checkbox_groups(
+        [(snapshot, "tech1.xlsx")], plan, 0, plan.group_count
+    )
+    assert np.array_equal(from_snapshot, checked)
+
+
+def test_agreement_is_written_and_disagreement_commented():
+    tech1 = MemorySheet(
+        "checks", values={"C2": True, "B3": True, "B5": True, "C5": True}
+    )
+    tech2 = MemorySheet(
+        "checks", values={"C2": True, "C3": True}, fonts={"C2": (True, 255)}
+    )
+    output = MemorySheet("checks")
+    del merge_conflict_log[:]
+
+    merge_checkbox_groups(
+        [(tech1, "tech1.xlsx"), (tech2, "tech2.xlsx")],
+        output,
+        GROUPS,
+        tech_col_letter="F",
+    )
+
+    # Both ticked NO on row 2: the first file's tick and format win
+    assert output.values == {(2, 3): True, (2, 6): "tech1.xlsx"}
+    assert output.hidden_columns == {6}
+    assert output.fonts[(2, 3)] == (False, 0)
+    # Row 3 disagrees across files, row 5 within one file; row 4 is blank
+    assert output.comments == {
+        (3, 2): "[Conflict]\nNO: tech2\nYES: tech1",
+        (3, 3): "[Conflict]\nNO: tech2\nYES: tech1",
+        (5, 2): "[Conflict]\nNO: tech1\nYES: tech1",
+        (5, 3): "[Conflict]\nNO: tech1\nYES: tech1",
+    }
+    assert {
+        cell for cell, fill in output.fills.items() if fill == CONFLICT_FILL
+    } == set(output.comments)
+    assert merge_conflict_log == ["checks"] * 4
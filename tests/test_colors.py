@@ -0,0 +1,80 @@
+import random
+from math import dist
+
+import numpy as np
+import pytest
+
+from utils.colors import NAMED_COLORS, ColorClassifier, rgb_to_lab
+
+
+def brute_force(rgb, metric, threshold):
+    """Nearest NAMED_COLORS name by checking every reference colour."""
+    to_space = (lambda c: rgb_to_lab(np.array([c]))[0]) if metric == "lab" else tuple
+    point = to_space(rgb)
+    best_name, best = None, None
+    for name, colors in NAMED_COLORS.items():
+        for ref in colors:
+            d = dist(point, to_space(ref))
+            if best is None or d < best:
+                best_name, best = name, d
+    return best_name if best <= threshold else f"RGB{tuple(rgb)}"
+
+
+def to_bgr(rgb):
+    r, g, b = rgb
+    return r | (g << 8) | (b << 16)
+
+
+def sample_colors(count=3000, seed=0):
+    rnd = random.Random(seed)
+    colors = [tuple(rnd.randrange(256) for _ in range(3)) for _ in range(count)]
+    # Reference colours, their neighbours and the cube's corners
+    for refs in NAMED_COLORS.values():
+        for r, g, b in refs:
+            for dr in (-1, 0, 1):
+                colors.append((min(max(r + dr, 0), 255), g, b))
+    colors += [(r, g, b) for r in (0, 255) for g in (0, 255) for b in (0, 255)]
+    return colors
+
+
+@pytest.mark.parametrize("metric", ["rgb", "lab"])
+def test_lookup_table_matches_brute_force(metric):
+    classifier = ColorClassifier(metric=metric)
+    colors = sample_colors()
+
+    expected = [brute_force(c, metric, classifier.threshold) for c in colors]
+
+    assert [classifier.classify_rgb(c) for c in colors] == expected
+    assert [classifier.classify(to_bgr(c)) for c in colors] == expected
+    assert classifier.classify_many([to_bgr(c) for c in colors]) == expected
+
+
+def test_lookup_table_matches_brute_force_on_a_dense_grid():
+    classifier = ColorClassifier()
+    axis = np.arange(0, 256, 3)
+    grid = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), -1).reshape(-1, 3)
+
+    refs = [ref for colors in NAMED_COLORS.values() for ref in colors]
+    labels = [
+        label for label, colors in enumerate(NAMED_COLORS.values()) for _ in colors
+    ]
+    distances = np.linalg.norm(grid[:, None, :] - np.array(refs)[None], axis=2)
+    best = distances.argmin(axis=1)
+    expected = np.where(
+        distances[np.arange(len(grid)), best] > classifier.threshold,
+        -1,
+        np.array(labels)[best],
+    )
+
+    bgr = grid[:, 0] | (grid[:, 1] << 8) | (grid[:, 2] << 16)
+    assert np.array_equal(classifier.codes(bgr), expected)
+
+
+def test_no_fill_and_far_colours():
+    classifier = ColorClassifier()
+
+    assert classifier.classify(None) == "No fill"
+    assert classifier.classify_many([None, to_bgr((0, 0, 255))]) == [
+        "No fill",
+        "RGB(0, 0, 255)",
+    ]
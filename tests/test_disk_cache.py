@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pytest
+
+from core.disk_cache import MAGIC, ExtractionCache
+
+DIGEST = "0" * 64
+
+
+class Planted:
+    """Unpickling this creates a folder: proof that an entry was unpickled."""
+
+    def __init__(self, marker):
+        self.marker = marker
+
+    def __reduce__(self):
+        return os.mkdir, (self.marker,)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(
+        str(tmp_path / "cache"), key_path=str(tmp_path / "mine" / "cache.key")
+    )
+
+
+def entry(cache):
+    return cache.entry_path(DIGEST, "openpyxl")
+
+
+def test_an_entry_round_trips(cache):
+    cache.store(DIGEST, "openpyxl", {"22.2": [1, "OK"]})
+
+    assert cache.load(DIGEST, "openpyxl") == {"22.2": [1, "OK"]}
+    assert cache.load(DIGEST, "xlwings") is None
+
+
+def test_a_tampered_entry_is_a_miss(cache):
+    cache.store(DIGEST, "openpyxl", {"22.2": [1, "OK"]})
+    with open(entry(cache), "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+
+    assert cache.load(DIGEST, "openpyxl") is None
+
+
+def test_an_entry_signed_with_another_key_is_never_unpickled(cache, tmp_path):
+    marker = str(tmp_path / "unpickled")
+    theirs = ExtractionCache(
+        cache.directory, key_path=str(tmp_path / "theirs" / "cache.key")
+    )
+    theirs.store(DIGEST, "openpyxl", Planted(marker))
+
+    assert cache.load(DIGEST, "openpyxl") is None
+    assert not os.path.exists(marker)
+    # The same entry under its writer's key does unpickle
+    theirs.load(DIGEST, "openpyxl")
+    assert os.path.exists(marker)
+
+
+def test_an_unsigned_entry_is_a_miss(cache):
+    os.makedirs(cache.directory)
+    with open(entry(cache), "wb") as f:
+        f.write(b"not a cache entry")
+
+    assert cache.load(DIGEST, "openpyxl") is None
+    with open(entry(cache), "wb") as f:
+        f.write(MAGIC)
+
+    assert cache.load(DIGEST, "openpyxl") is None
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+def test_the_key_is_private_to_its_owner(cache):
+    cache.store(DIGEST, "openpyxl", {})
+
+    assert os.stat(cache.key_path).st_mode & 0o077 == 0
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.store("a" * 64, "openpyxl", os.urandom(2000))
+    size = os.path.getsize(cache.entry_path("a" * 64, "openpyxl"))
+    cache.max_bytes = 2 * size + size // 2
+    cache.store("b" * 64, "openpyxl", os.urandom(2000))
+    os.utime(cache.entry_path("a" * 64, "openpyxl"), (0, 0))
+    os.utime(cache.entry_path("b" * 64, "openpyxl"), (1, 1))
+    assert cache.load("a" * 64, "openpyxl") is not None  # hit refreshes "a"
+
+    cache.store("c" * 64, "openpyxl", os.urandom(2000))
+
+    assert cache.load("a" * 64, "openpyxl") is not None
+    assert cache.load("b" * 64, "openpyxl") is None
+    assert cache.load("c" * 64, "openpyxl") is not None
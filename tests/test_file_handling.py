@@ -0,0 +1,67 @@
+import zipfile
+
+import pytest
+from openpyxl import Workbook
+
+from utils.file_handling import is_valid_excel_file, read_sheet_names
+
+WORKBOOK = "xl/workbook.xml"
+
+
+def make_report(path, *names):
+    wb = Workbook()
+    wb.active.title = names[0]
+    for name in names[1:]:
+        wb.create_sheet(name)
+    wb.save(path)
+    return path
+
+
+def patch_workbook_entry(path, flag_bits=0, compress_type=None):
+    """Rewrites the workbook part's zip headers in place."""
+    data = bytearray(path.read_bytes())
+    name = WORKBOOK.encode()
+    # (signature, offset of the flag bits, offset of the file name)
+    for signature, flags, filename in ((b"PK\x03\x04", 6, 30), (b"PK\x01\x02", 8, 46)):
+        start = data.find(signature)
+        while data[start + filename : start + filename + len(name)] != name:
+            start = data.find(signature, start + 1)
+        data[start + flags] |= flag_bits
+        if compress_type is not None:
+            data[start + flags + 2 : start + flags + 4] = compress_type.to_bytes(
+                2, "little"
+            )
+    path.write_bytes(bytes(data))
+
+
+def test_sheet_names_come_in_workbook_order(tmp_path):
+    path = make_report(tmp_path / "report.xlsx", "1.1", "22.2", "9.1")
+
+    assert read_sheet_names(path) == ["1.1", "22.2", "9.1"]
+    assert is_valid_excel_file(path, ["1.1", "22.2", "9.1"])
+    assert not is_valid_excel_file(path, ["1.1", "2.1", "3.1"])
+
+
+def test_a_file_that_is_not_a_zip_is_not_a_report(tmp_path):
+    path = tmp_path / "report.xlsx"
+    path.write_bytes(b"not a workbook")
+
+    assert read_sheet_names(path) is None
+    assert not is_valid_excel_file(path, ["1.1"])
+
+
+@pytest.mark.parametrize(
+    "patch, error",
+    [
+        ({"flag_bits": 0x1}, RuntimeError),  # encrypted
+        ({"compress_type": 99}, NotImplementedError),  # AES / unknown method
+    ],
+)
+def test_unreadable_zip_members_are_not_reports(tmp_path, patch, error):
+    path = make_report(tmp_path / "report.xlsx", "1.1")
+    patch_workbook_entry(path, **patch)
+    with zipfile.ZipFile(path) as archive, pytest.raises(error):
+        archive.read(WORKBOOK)
+
+    assert read_sheet_names(path) is None
+    assert not is_valid_excel_file(path, ["1.1"])
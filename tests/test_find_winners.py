@@ -0,0 +1,79 @@
+import random
+
+import numpy as np
+import pytest
+
+from handlers.handler_base import find_winners, is_meaningful_value
+
+VALUES = [None, "", " ", "false", "FALSE", False, True, "OK", "ok", 1, 1.0, 0, "Fail"]
+FILLS = [-1, -1, 0x00FFFF, 0xFF0000]
+
+
+def legacy_winners(values, bold, font, fill):
+    """
+    The pre-NumPy merge_cells loop for one cell, with the winner fix: the
+    first meaningful value wins; later ones conflict on a different value,
+    bold or font colour, or on a fill of their own that isn't the winner's.
+    Returns (winner file or None, conflicting files).
+    """
+    winner = None
+    conflicts = []
+    for t, value in enumerate(values):
+        if not is_meaningful_value(value):
+            continue
+        if winner is None:
+            winner = t
+            continue
+        if (
+            value != values[winner]
+            or bold[t] != bold[winner]
+            or font[t] != font[winner]
+            or (fill[t] != -1 and fill[t] != fill[winner])
+        ):
+            conflicts.append(t)
+    return winner, conflicts
+
+
+def random_stack(rnd, files, cells):
+    shape = (files, cells)
+    values = np.empty(shape, dtype=object)
+    for t in range(files):
+        for j in range(cells):
+            values[t, j] = rnd.choice(VALUES)
+    bold = np.array([[rnd.choice([-1, 0, 1]) for _ in range(cells)] for _ in values])
+    font = np.array([[rnd.choice([-1, 0, 255]) for _ in range(cells)] for _ in values])
+    fill = np.array([[rnd.choice(FILLS) for _ in range(cells)] for _ in values])
+    meaningful = np.frompyfunc(is_meaningful_value, 1, 1)(values).astype(bool)
+    return values, meaningful, bold, font, fill
+
+
+@pytest.mark.parametrize("files", [1, 2, 5])
+def test_matches_the_legacy_loop(files):
+    rnd = random.Random(files)
+    values, meaningful, bold, font, fill = random_stack(rnd, files, 400)
+
+    has_value, winner, conflict = find_winners(values, meaningful, bold, font, fill)
+
+    for j in range(values.shape[1]):
+        expected_winner, expected_conflicts = legacy_winners(
+            values[:, j], bold[:, j], font[:, j], fill[:, j]
+        )
+        assert has_value[j] == (expected_winner is not None)
+        if expected_winner is not None:
+            assert winner[j] == expected_winner
+        assert list(np.flatnonzero(conflict[:, j])) == expected_conflicts
+
+
+def test_first_meaningful_value_wins_even_without_a_fill():
+    # File 0 is blank, file 1 wins with no fill, file 2 agrees but adds a
+    # fill of its own, file 3 agrees
+    values = np.array([["false"], ["OK"], ["OK"], ["OK"]], dtype=object)
+    meaningful = np.array([[False], [True], [True], [True]])
+    bold = np.zeros((4, 1), dtype=np.int64)
+    font = np.zeros((4, 1), dtype=np.int64)
+    fill = np.array([[-1], [-1], [0x00FFFF], [-1]])
+
+    has_value, winner, conflict = find_winners(values, meaningful, bold, font, fill)
+
+    assert has_value[0] and winner[0] == 1
+    assert list(np.flatnonzero(conflict[:, 0])) == [2]
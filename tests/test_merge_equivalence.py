@@ -0,0 +1,103 @@
+import shutil
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+from openpyxl import load_workbook
+
+from benchmarks.synthetic import generate_site, generate_template
+from config.sheet_definitions import SHEET_MERGE_HANDLERS, get_merge_plan
+from core.merger import merge
+
+MODES = {
+    "workers=1": {"workers": 1},
+    "workers=4": {"workers": 4},
+    "streaming": {"streaming": True},
+}
+
+
+@pytest.fixture(scope="module")
+def site(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("site")
+    paths = generate_site(str(directory), technicians=4, pages=1, seed=7)
+    template = generate_template(str(directory / "template.xlsx"))
+    return directory, paths, template
+
+
+def workbook_contents(path):
+    """Every written value, comment, fill, font and hidden column by sheet."""
+    contents = set()
+    wb = load_workbook(path)
+    for ws in wb.worksheets:
+        for row in ws.iter_rows():
+            for cell in row:
+                fill = cell.fill.fgColor.rgb if cell.fill.fill_type else None
+                comment = cell.comment.text if cell.comment else None
+                if cell.value is not None or comment or fill:
+                    contents.add(
+                        (
+                            ws.title,
+                            cell.coordinate,
+                            repr(cell.value),
+                            comment,
+                            fill,
+                            bool(cell.font.b),
+                        )
+                    )
+        for letter, dimension in ws.column_dimensions.items():
+            if dimension.hidden:
+                contents.add((ws.title, "hidden", letter))
+    return contents
+
+
+@pytest.fixture(scope="module")
+def merged(site):
+    return merge_modes(*site)
+
+
+def merge_modes(directory, paths, template):
+    """(conflicts, contents, pages skipped by sheet) of each mode's merge."""
+    results = {}
+    for mode, options in MODES.items():
+        output = str(directory / f"{mode}.xlsx")
+        shutil.copyfile(template, output)
+        with redirect_stdout(StringIO()):
+            conflicts, metrics = merge(paths, output, engine="openpyxl", **options)
+        assert metrics.status == "ok"
+        skipped = {
+            name: sheet["pages_skipped"] for name, sheet in metrics.sheets.items()
+        }
+        results[mode] = (sorted(conflicts), workbook_contents(output), skipped)
+    return results
+
+
+def test_site_has_conflicts_to_compare(merged):
+    conflicts, contents, skipped = merged["workers=1"]
+    assert conflicts
+    assert sum(skipped.values())
+    comments = [entry[3] for entry in contents if len(entry) == 6 and entry[3]]
+    assert any(comment.startswith("[Conflict]") for comment in comments)
+
+
+@pytest.mark.parametrize("mode", ["workers=4", "streaming"])
+def test_mode_matches_single_process_snapshot(merged, mode):
+    conflicts, contents, skipped = merged[mode]
+    expected_conflicts, expected_contents, expected_skipped = merged["workers=1"]
+
+    assert conflicts == expected_conflicts
+    assert contents == expected_contents
+    assert skipped == expected_skipped
+
+
+def test_only_blank_anchored_pages_count_as_skipped(tmp_path):
+    paths = generate_site(str(tmp_path), technicians=2, pages=0)
+    template = generate_template(str(tmp_path / "template.xlsx"))
+
+    results = merge_modes(tmp_path, paths, template)
+
+    # Single-page sheets have no anchors and aren't counted
+    anchored = {}
+    for name in SHEET_MERGE_HANDLERS:
+        anchored[name] = sum(map(bool, get_merge_plan(name).page_anchors))
+    for mode, (_, _, skipped) in results.items():
+        assert skipped == anchored, mode
@@ -0,0 +1,36 @@
+from handlers.merge_plan import compile_pages, expand_page_template, module_plan
+from utils.cell_refs import parse_address
+
+
+def plan_cells(plan):
+    return set(zip(plan.cell_rows, plan.cell_cols))
+
+
+def test_sheet_22_2_notes_and_anchors_move_40_rows_per_page():
+    plan = module_plan("handlers.sheet_22_2")
+    cells = plan_cells(plan)
+
+    for page in range(4):
+        notes = {(row + 40 * page, 1) for row in range(9, 40)}
+        assert notes <= cells
+        assert plan.page_anchors[page] == ((7 + 40 * page, 6), (8 + 40 * page, 6))
+    assert parse_address("A79") in cells
+    assert parse_address("A48") not in cells
+    # Fields and checkboxes keep the 39-row stride
+    assert {parse_address(ref) for ref in ("F46", "D58", "P144")} <= cells
+    assert len(cells) == 4 * (6 + 31)
+
+
+def test_blocks_are_appended_to_each_page():
+    template = {
+        "row_offsets": [0, 10],
+        "cells": ["B2"],
+        "blocks": [{"stride": 12, "cells": ["A3"], "anchors": ["A1"]}],
+    }
+    pages = list(expand_page_template(template))
+    assert pages == [
+        ([(2, 2), (3, 1)], [], [(1, 1)]),
+        ([(12, 2), (15, 1)], [], [(13, 1)]),
+    ]
+    plan = compile_pages("blocks", pages)
+    assert plan.page_cells == [(0, 2), (2, 4)]
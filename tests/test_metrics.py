@@ -0,0 +1,73 @@
+import json
+import shutil
+from contextlib import redirect_stdout
+from io import StringIO
+
+from benchmarks.synthetic import generate_site, generate_template
+from core.merger import merge
+from core.metrics import MergeMetrics, default_metrics_path
+
+
+def test_sheets_add_up_to_the_totals():
+    metrics = MergeMetrics(file_count=3, engine="openpyxl")
+    with metrics.phase("sheets"):
+        pass
+    with metrics.phase("sheets"):
+        pass
+    metrics.add_reads(100, 40)
+    metrics.add_sheet("2.1", (10, 2), ["2.1", "2.1"], pages_skipped=1)
+    metrics.add_sheet("1.1", (5, 0), [], cached=True)
+    metrics.add_worker_peak(None)
+    metrics.add_worker_peak(2048)
+
+    data = metrics.finish("ok").to_dict()
+
+    assert data["status"] == "ok"
+    assert set(data["phases"]) == {"sheets", "total"}
+    assert (data["cells_read"], data["format_reads"]) == (100, 40)
+    assert (data["cells_written"], data["comments_written"]) == (15, 2)
+    assert (data["conflicts"], data["pages_skipped"]) == (2, 1)
+    assert list(data["sheets"]) == ["1.1", "2.1"]
+    assert data["sheets"]["1.1"]["cached"] is True
+    assert data["worker_peak_memory"] == 2048
+
+
+def test_append_jsonl_adds_one_line_per_run(tmp_path):
+    path = str(tmp_path / "logs" / "metrics.jsonl")
+    MergeMetrics(engine="openpyxl").finish("ok").append_jsonl(path)
+    MergeMetrics(engine="openpyxl").finish("cancelled").append_jsonl(path)
+
+    with open(path, encoding="utf-8") as f:
+        runs = [json.loads(line) for line in f]
+    assert [run["status"] for run in runs] == ["ok", "cancelled"]
+
+
+def test_metrics_path_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv("V8_MERGER_METRICS", "/logs/runs.jsonl")
+    assert default_metrics_path() == "/logs/runs.jsonl"
+    monkeypatch.setenv("V8_MERGER_METRICS", "")
+    assert default_metrics_path() is None
+    monkeypatch.delenv("V8_MERGER_METRICS")
+    assert default_metrics_path().endswith("metrics.jsonl")
+
+
+def test_merge_logs_metrics_that_match_its_result(tmp_path):
+    paths = generate_site(str(tmp_path), technicians=3, pages=1, seed=3)
+    output = str(tmp_path / "merged.xlsx")
+    shutil.copyfile(generate_template(str(tmp_path / "template.xlsx")), output)
+    log = str(tmp_path / "metrics.jsonl")
+
+    with redirect_stdout(StringIO()):
+        conflicts, metrics = merge(
+            paths, output, engine="openpyxl", workers=1, metrics_path=log
+        )
+
+    with open(log, encoding="utf-8") as f:
+        (logged,) = [json.loads(line) for line in f]
+    assert logged == json.loads(json.dumps(metrics.to_dict(), default=str))
+    assert logged["status"] == "ok"
+    assert logged["files"] == 3
+    assert logged["conflicts"] == len(conflicts) > 0
+    assert logged["cells_read"] > 0
+    assert logged["cells_written"] > 0
+    assert {"template", "open", "sheets", "save", "total"} <= set(logged["phases"])
@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+from backends.memory_backend import MemorySheet
+from core.output_buffer import BufferedOutputSheet, coalesce_cells
+
+
+def covered(blocks):
+    """Every cell of the rectangles, counted once per rectangle."""
+    cells = []
+    for min_row, min_col, max_row, max_col in blocks:
+        for row in range(min_row, max_row + 1):
+            cells.extend((row, col) for col in range(min_col, max_col + 1))
+    return cells
+
+
+def test_a_filled_rectangle_is_one_block():
+    cells = [(row, col) for row in range(3, 7) for col in range(2, 5)]
+
+    assert coalesce_cells(cells) == [(3, 2, 6, 4)]
+
+
+def test_the_gap_in_an_l_shape_stays_unwritten():
+    # B2:C2 over B3; C3 was never written
+    blocks = coalesce_cells([(2, 2), (2, 3), (3, 2)])
+
+    assert (3, 3) not in covered(blocks)
+    assert sorted(covered(blocks)) == [(2, 2), (2, 3), (3, 2)]
+
+
+@pytest.mark.parametrize("density", [0.1, 0.5, 0.9])
+def test_blocks_cover_exactly_the_written_cells(density):
+    rnd = random.Random(density)
+    for _ in range(50):
+        cells = {
+            (row, col)
+            for row in range(1, 30)
+            for col in range(1, 8)
+            if rnd.random() < density
+        }
+        if not cells:
+            continue
+
+        cover = covered(coalesce_cells(cells))
+
+        # No unwritten cell, no cell twice
+        assert sorted(cover) == sorted(cells)
+
+
+class RecordingSheet(MemorySheet):
+    """MemorySheet that counts the operations it receives."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    def write_block(self, min_row, min_col, rows):
+        self.calls.append("write_block")
+        super().write_block(min_row, min_col, rows)
+
+    def set_font_block(self, *block, bold=None, color=None):
+        self.calls.append("set_font_block")
+        super().set_font_block(*block, bold=bold, color=color)
+
+    def set_fill_block(self, *args):
+        self.calls.append("set_fill_block")
+        super().set_fill_block(*args)
+
+
+def test_flush_matches_cell_by_cell_writes():
+    direct = MemorySheet("out", values={"C3": "kept"})
+    sheet = RecordingSheet("out", values={"C3": "kept"})
+    buffered = BufferedOutputSheet(sheet)
+    for target in (direct, buffered):
+        for row in (2, 3):
+            target.set_value(row, 2, "OK")
+            target.set_fill(row, 2, 0x00FFFF)
+        target.set_value(2, 3, "Fail")
+        target.set_font(2, 3, bold=True)
+        target.set_comment(2, 3, "[Conflict]")
+        target.hide_column(5)
+
+    # Pending writes are read back before the flush
+    assert buffered.get_value(2, 3) == "Fail"
+    assert buffered.get_value(3, 3) == "kept"
+    assert buffered.pending_counts() == (3, 1)
+    assert sheet.values == {(3, 3): "kept"}
+
+    buffered.flush()
+
+    for attr in ("values", "fonts", "fills", "comments", "hidden_columns"):
+        assert getattr(sheet, attr) == getattr(direct, attr), attr
+    assert sorted(sheet.calls) == [
+        "set_fill_block",
+        "set_font_block",
+        "write_block",
+        "write_block",
+    ]
+    assert buffered.pending_counts() == (0, 0)
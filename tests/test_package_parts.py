@@ -0,0 +1,313 @@
+import posixpath
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.chart import BarChart, Reference
+
+from backends.openpyxl_backend import OpenpyxlWorkbook
+from backends.package_parts import (
+    MAIN_NS,
+    REL_NS,
+    KeptParts,
+    read_rels,
+    sheet_parts,
+)
+
+CTRL_PROP_TYPE = "application/vnd.ms-excel.controlproperties+xml"
+DRAWING_TYPE = "application/vnd.openxmlformats-officedocument.drawing+xml"
+
+ROOT_NAMESPACES = (
+    f'xmlns="{MAIN_NS}" xmlns:r="{REL_NS}" '
+    'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+    'xmlns:xdr="http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing" '
+    'xmlns:x14="http://schemas.microsoft.com/office/spreadsheetml/2009/9/main"'
+)
+
+# A linked checkbox on C2 the way Excel writes it
+CONTROLS = (
+    '<mc:AlternateContent><mc:Choice Requires="x14"><controls>'
+    '<mc:AlternateContent><mc:Choice Requires="x14">'
+    '<control shapeId="1025" r:id="rId3" name="Check Box 1">'
+    '<controlPr defaultSize="0" autoFill="0" autoLine="0" autoPict="0">'
+    '<anchor moveWithCells="1"><from><xdr:col>2</xdr:col><xdr:colOff>0</xdr:colOff>'
+    "<xdr:row>1</xdr:row><xdr:rowOff>0</xdr:rowOff></from>"
+    "<to><xdr:col>3</xdr:col><xdr:colOff>0</xdr:colOff>"
+    "<xdr:row>2</xdr:row><xdr:rowOff>0</xdr:rowOff></to></anchor>"
+    "</controlPr></control></mc:Choice>"
+    '<mc:Fallback><control shapeId="1025" r:id="rId3" name="Check Box 1"/>'
+    "</mc:Fallback></mc:AlternateContent>"
+    "</controls></mc:Choice></mc:AlternateContent>"
+)
+
+CTRL_PROP = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<formControlPr xmlns="http://schemas.microsoft.com/office/spreadsheetml/2009/9/'
+    b'main" objectType="CheckBox" checked="Checked" fmlaLink="$C$2" noThreeD="1"/>'
+)
+
+VML = b"""<xml xmlns:v="urn:schemas-microsoft-com:vml"
+ xmlns:o="urn:schemas-microsoft-com:office:office"
+ xmlns:x="urn:schemas-microsoft-com:office:excel">
+ <o:shapelayout v:ext="edit">
+  <o:idmap v:ext="edit" data="1"/>
+ </o:shapelayout><v:shapetype id="_x0000_t201" coordsize="21600,21600" o:spt="201"
+  path="m,l,21600r21600,l21600,xe">
+  <v:stroke joinstyle="miter"/>
+  <v:path shadowok="f" o:extrusionok="f" strokeok="f" fillok="f" o:connecttype="rect"/>
+  <o:lock v:ext="edit" shapetype="t"/>
+ </v:shapetype><v:shape id="_x0000_s1025" type="#_x0000_t201"
+  style='position:absolute;margin-left:96pt;margin-top:15pt;width:48pt;height:15pt;
+  z-index:1' filled="f" stroked="f" o:insetmode="auto">
+  <v:textbox style='mso-direction-alt:auto' o:singleclick="f">
+   <div style='text-align:left'><font face="Segoe UI" size="160">Yes</font></div>
+  </v:textbox>
+  <x:ClientData ObjectType="Checkbox">
+   <x:Anchor>2, 0, 1, 0, 3, 0, 2, 0</x:Anchor>
+   <x:FmlaLink>$C$2</x:FmlaLink>
+   <x:NoThreeD/>
+  </x:ClientData>
+ </v:shape></xml>"""
+
+DRAWING = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<xdr:wsDr xmlns:xdr="http://schemas.openxmlformats.org/drawingml/2006/'
+    b'spreadsheetDrawing" xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/'
+    b'main"><mc:AlternateContent xmlns:mc="http://schemas.openxmlformats.org/'
+    b'markup-compatibility/2006"><mc:Choice xmlns:a14="http://schemas.microsoft.com/'
+    b'office/drawing/2010/main" Requires="a14"><xdr:twoCellAnchor editAs="oneCell">'
+    b"<xdr:from><xdr:col>2</xdr:col><xdr:colOff>0</xdr:colOff><xdr:row>1</xdr:row>"
+    b"<xdr:rowOff>0</xdr:rowOff></xdr:from><xdr:to><xdr:col>3</xdr:col>"
+    b"<xdr:colOff>0</xdr:colOff><xdr:row>2</xdr:row><xdr:rowOff>0</xdr:rowOff>"
+    b'</xdr:to><xdr:sp macro="" textlink=""><xdr:nvSpPr>'
+    b'<xdr:cNvPr id="1025" name="Check Box 1" hidden="1"><a:extLst>'
+    b'<a:ext uri="{63B3BB69-23CF-44E3-9099-C40C66FF867C}">'
+    b'<a14:compatExt spid="_x0000_s1025"/></a:ext></a:extLst></xdr:cNvPr>'
+    b"<xdr:cNvSpPr/></xdr:nvSpPr><xdr:spPr/></xdr:sp><xdr:clientData/>"
+    b"</xdr:twoCellAnchor></mc:Choice></mc:AlternateContent></xdr:wsDr>"
+)
+
+SHEET_RELS = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="{REL_NS}/drawing" Target="../drawings/drawing1.xml"/>
+<Relationship Id="rId2" Type="{REL_NS}/vmlDrawing"
+ Target="../drawings/vmlDrawing1.vml"/>
+<Relationship Id="rId3" Type="{REL_NS}/ctrlProp" Target="../ctrlProps/ctrlProp1.xml"/>
+</Relationships>"""
+
+
+def add_checkbox(path, sheet_name="22.2"):
+    """
+    Adds an Excel-style form-control checkbox linked to C2 to a sheet. A
+    drawing openpyxl wrote for the sheet (xl/drawings/drawing1.xml) gets
+    the checkbox's hidden shape added.
+    """
+    with zipfile.ZipFile(path) as zf:
+        files = {name: zf.read(name) for name in zf.namelist()}
+    part = sheet_parts(files)[sheet_name]
+    sheet = re.sub(
+        r"<worksheet [^>]*>", f"<worksheet {ROOT_NAMESPACES}>", files[part].decode()
+    )
+    drawing = files.get("xl/drawings/drawing1.xml")
+    if drawing is None:
+        sheet = sheet.replace("</worksheet>", '<drawing r:id="rId1"/></worksheet>')
+        drawing = DRAWING
+    else:
+        anchor = DRAWING[DRAWING.index(b"<mc:AlternateContent") : -len(b"</xdr:wsDr>")]
+        drawing = drawing.replace(
+            b"<wsDr ",
+            b'<wsDr xmlns:xdr="http://schemas.openxmlformats.org/drawingml/2006/'
+            b'spreadsheetDrawing" ',
+            1,
+        )
+        end = drawing.rindex(b"</")
+        drawing = drawing[:end] + anchor + drawing[end:]
+    sheet = sheet.replace(
+        "</worksheet>", '<legacyDrawing r:id="rId2"/>' + CONTROLS + "</worksheet>"
+    )
+    files[part] = sheet.encode()
+    folder, name = posixpath.split(part)
+    files[f"{folder}/_rels/{name}.rels"] = SHEET_RELS.encode()
+    files["xl/ctrlProps/ctrlProp1.xml"] = CTRL_PROP
+    files["xl/drawings/vmlDrawing1.vml"] = VML
+    files["xl/drawings/drawing1.xml"] = drawing
+    files["[Content_Types].xml"] = files["[Content_Types].xml"].replace(
+        b"</Types>",
+        b'<Default Extension="vml" ContentType="application/vnd.openxmlformats-'
+        b'officedocument.vmlDrawing"/>'
+        b'<Override PartName="/xl/ctrlProps/ctrlProp1.xml" ContentType="'
+        + CTRL_PROP_TYPE.encode()
+        + b'"/></Types>',
+    )
+    if b'PartName="/xl/drawings/drawing1.xml"' not in files["[Content_Types].xml"]:
+        files["[Content_Types].xml"] = files["[Content_Types].xml"].replace(
+            b"</Types>",
+            b'<Override PartName="/xl/drawings/drawing1.xml" ContentType="'
+            + DRAWING_TYPE.encode()
+            + b'"/></Types>',
+        )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+
+
+def make_template(path, checkbox=True, chart=False):
+    wb = Workbook()
+    wb.active.title = "1.1"
+    ws = wb.create_sheet("22.2")
+    ws["B2"] = "Smoke detector"
+    ws["C2"] = False
+    if chart:
+        ws.append([1])
+        ws.append([2])
+        bars = BarChart()
+        bars.add_data(Reference(ws, min_col=1, min_row=3, max_row=4))
+        ws.add_chart(bars, "E5")
+    wb.save(path)
+    if checkbox:
+        add_checkbox(path)
+    return str(path)
+
+
+def merge_into(path, comments=(), value=True):
+    wb = OpenpyxlWorkbook(path)
+    ws = wb.sheet("22.2")
+    ws.set_value(2, 3, value)
+    for row, col in comments:
+        ws.set_comment(row, col, f"[Conflict]\nR{row}C{col}")
+    wb.save()
+    wb.close()
+
+
+class Package:
+    """The parts of a saved workbook, resolved for the 22.2 sheet."""
+
+    def __init__(self, path):
+        with zipfile.ZipFile(path) as zf:
+            self.files = {name: zf.read(name) for name in zf.namelist()}
+        self.sheet = sheet_parts(self.files)["22.2"]
+        self.rels = read_rels(self.files, self.sheet)
+        self.root = ET.fromstring(self.files[self.sheet])
+        types = ET.fromstring(self.files["[Content_Types].xml"])
+        self.overrides = {
+            item.get("PartName"): item.get("ContentType")
+            for item in types
+            if item.tag.endswith("Override")
+        }
+
+    def check_links(self):
+        """Every relationship and content type override names a real part."""
+        for name in self.files:
+            if name.endswith(".rels"):
+                folder = posixpath.dirname(posixpath.dirname(name))
+                part = posixpath.join(folder, posixpath.basename(name)[:-5])
+                for _, target, external in read_rels(self.files, part).values():
+                    assert external or target in self.files, (name, target)
+        for part in self.overrides:
+            assert part[1:] in self.files, part
+
+    def children(self):
+        return [child.tag.rsplit("}", 1)[-1] for child in self.root]
+
+    def target(self, element):
+        return self.rels[element.get(f"{{{REL_NS}}}id")][1]
+
+    def controls(self):
+        return [
+            control
+            for control in self.root.iter(f"{{{MAIN_NS}}}control")
+            if control.find(f"{{{MAIN_NS}}}controlPr") is not None
+        ]
+
+    def vml(self):
+        return self.files[self.target(self.root.find(f"{{{MAIN_NS}}}legacyDrawing"))]
+
+
+def test_checkbox_survives_a_save_with_comments(tmp_path):
+    path = make_template(tmp_path / "template.xlsx")
+
+    merge_into(path, comments=[(2, 2), (5, 4), (9, 1)])
+
+    package = Package(path)
+    package.check_links()
+    # Schema order: drawing, legacyDrawing, then the wrapped <controls>
+    assert package.children()[-3:] == ["drawing", "legacyDrawing", "AlternateContent"]
+
+    (control,) = package.controls()
+    ctrl_prop = package.target(control)
+    assert package.files[ctrl_prop] == CTRL_PROP
+    assert package.overrides[f"/{ctrl_prop}"] == CTRL_PROP_TYPE
+
+    drawing = package.target(package.root.find(f"{{{MAIN_NS}}}drawing"))
+    assert b'compatExt spid="_x0000_s1025"' in package.files[drawing]
+    assert package.overrides[f"/{drawing}"] == DRAWING_TYPE
+
+    vml = package.vml()
+    ET.fromstring(vml)
+    ids = re.findall(rb'\bid="_x0000_s(\d+)"', vml)
+    assert ids[0] == b"1025" and len(set(ids)) == len(ids) == 4
+    assert vml.count(b'ObjectType="Checkbox"') == 1
+    assert vml.count(b'ObjectType="Note"') == 3
+    assert b'data="1"' in vml
+
+    ws = load_workbook(path)["22.2"]
+    assert ws["C2"].value is True
+    assert ws["D5"].comment.text == "[Conflict]\nR5C4"
+
+
+def test_vml_is_copied_as_is_without_comments(tmp_path):
+    path = make_template(tmp_path / "template.xlsx")
+
+    merge_into(path)
+
+    package = Package(path)
+    package.check_links()
+    assert package.vml() == VML
+    assert len(package.controls()) == 1
+
+
+def test_saving_again_keeps_a_single_copy(tmp_path):
+    path = make_template(tmp_path / "template.xlsx")
+
+    merge_into(path, comments=[(2, 2)])
+    merge_into(path, comments=[(3, 3)], value=False)
+
+    package = Package(path)
+    package.check_links()
+    assert len(package.controls()) == 1
+    assert [name for name in package.files if "ctrlProp" in name] == [
+        "xl/ctrlProps/ctrlProp1.xml"
+    ]
+    vml = package.vml()
+    assert vml.count(b'ObjectType="Checkbox"') == 1
+    assert vml.count(b'ObjectType="Note"') == 2
+    assert load_workbook(path)["22.2"]["C2"].value is False
+
+
+def test_original_drawing_replaces_the_one_openpyxl_wrote(tmp_path):
+    path = make_template(tmp_path / "template.xlsx", chart=True)
+
+    merge_into(path, comments=[(2, 2)])
+
+    package = Package(path)
+    package.check_links()
+    drawing = package.target(package.root.find(f"{{{MAIN_NS}}}drawing"))
+    assert b"compatExt" in package.files[drawing]
+    (chart,) = [
+        target
+        for _, target, _ in read_rels(package.files, drawing).values()
+        if "/charts/" in target
+    ]
+    assert chart in package.files
+    # openpyxl's own drawing and chart went with it
+    drawings = [name for name in package.files if name.startswith("xl/drawings/d")]
+    charts = [name for name in package.files if name.startswith("xl/charts/")]
+    assert (drawings, charts) == ([drawing], [chart])
+    assert len(package.controls()) == 1
+
+
+def test_workbooks_without_controls_are_left_to_openpyxl(tmp_path):
+    path = make_template(tmp_path / "plain.xlsx", checkbox=False)
+
+    assert KeptParts.read(path) is None
@@ -0,0 +1,221 @@
+import http.client
+import io
+import json
+import os
+import threading
+from http.client import parse_headers
+
+import pytest
+
+import core.service as service_module
+from core.service import MergeRequestHandler, MergeService, MultipartReader, make_server
+
+BOUNDARY = "----v8boundary"
+
+
+def multipart_body(parts, boundary=BOUNDARY):
+    """parts: (name, filename or None, content bytes) in order."""
+    body = b"preamble\r\n"
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename:
+            disposition += f'; filename="{filename}"'
+        body += (
+            f"--{boundary}\r\nContent-Disposition: {disposition}\r\n\r\n".encode()
+            + content
+            + b"\r\n"
+        )
+    return body + f"--{boundary}--\r\n".encode()
+
+
+def read_parts(body, boundary=BOUNDARY):
+    received = []
+
+    def open_part(name, filename):
+        content = bytearray()
+        received.append((name, filename, content))
+        return content.extend, None
+
+    MultipartReader(io.BytesIO(body), len(body), boundary).parts(open_part)
+    return [(name, filename, bytes(content)) for name, filename, content in received]
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 7, 64 * 1024])
+def test_multipart_parts_survive_any_chunking(monkeypatch, chunk):
+    monkeypatch.setattr(service_module, "CHUNK_BYTES", chunk)
+    # Content that almost contains the delimiter must come through untouched
+    tricky = b"PK\x03\x04\r\n--" + BOUNDARY[:-1].encode() + b"\r\n-" * 5
+    parts = [
+        ("inputs", "a.xlsx", tricky),
+        ("inputs", "b.xlsx", b""),
+        ("engine", None, b"openpyxl"),
+    ]
+
+    assert read_parts(multipart_body(parts)) == parts
+
+
+def test_truncated_multipart_body_is_refused():
+    body = multipart_body([("inputs", "a.xlsx", b"data")])[:-20]
+
+    with pytest.raises(ValueError, match="Truncated"):
+        read_parts(body)
+
+
+def test_oversized_multipart_field_is_refused(monkeypatch):
+    monkeypatch.setattr(service_module, "MAX_FIELD_BYTES", 4)
+    body = multipart_body([("engine", None, b"openpyxl")])
+    reader = MultipartReader(io.BytesIO(body), len(body), BOUNDARY)
+
+    with pytest.raises(ValueError, match="too large"):
+        reader.parts(lambda name, filename: (lambda data: None, 4))
+
+
+@pytest.fixture
+def service(tmp_path):
+    template = tmp_path / "template.xlsx"
+    template.write_bytes(b"template")
+    service = MergeService(
+        workers=1,
+        work_dir=str(tmp_path / "work"),
+        template=str(template),
+        output_dir=str(tmp_path / "out"),
+    )
+    yield service
+    service.shutdown()
+
+
+def parse(service, content_type, body, job_id="0" * 32):
+    handler = MergeRequestHandler.__new__(MergeRequestHandler)
+    handler.service = service
+    handler.headers = parse_headers(
+        io.BytesIO(f"Content-Type: {content_type}\r\n\r\n".encode())
+    )
+    handler.rfile = io.BytesIO(body)
+    return handler.parse_job(job_id, len(body))
+
+
+def test_json_job_resolves_paths_fields_and_output(service, tmp_path):
+    tech = tmp_path / "tech.xlsx"
+    tech.write_bytes(b"tech")
+    body = json.dumps(
+        {
+            "inputs": [str(tech)],
+            "output": "site/merged.xlsx",
+            "engine": "openpyxl",
+            "time_budget": 30,
+        }
+    ).encode()
+
+    inputs, template, output, engine, time_budget = parse(
+        service, "application/json", body
+    )
+
+    assert inputs == [str(tech)]
+    assert template == service.template
+    assert output == os.path.join(
+        os.path.realpath(tmp_path / "out"), "site", "merged.xlsx"
+    )
+    assert (engine, time_budget) == ("openpyxl", 30.0)
+
+
+@pytest.mark.parametrize(
+    "request_body, message",
+    [
+        ([], "must be an object"),
+        ("inputs", "must be an object"),
+        ({"inputs": "tech.xlsx"}, "list of paths"),
+        ({"inputs": []}, "No input workbooks"),
+        ({"inputs": ["missing.xlsx"]}, "Input not found"),
+        ({"inputs": ["tech.xlsx"], "engine": "excel97"}, "Unknown merge engine"),
+        ({"inputs": ["tech.xlsx"], "output": 3}, "must be a path"),
+    ],
+)
+def test_bad_json_jobs_are_refused(
+    service, tmp_path, monkeypatch, request_body, message
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "tech.xlsx").write_bytes(b"tech")
+
+    with pytest.raises(ValueError, match=message):
+        parse(service, "application/json", json.dumps(request_body).encode())
+
+
+def test_multipart_job_streams_uploads_into_the_job_folder(service):
+    job_id = "1" * 32
+    body = multipart_body(
+        [
+            ("inputs", "b.xlsx", b"second"),
+            ("inputs", "../a.xlsx", b"first"),
+            ("template", "mine.xlsx", b"own template"),
+            ("time_budget", None, b"12.5"),
+        ]
+    )
+
+    inputs, template, output, engine, time_budget = parse(
+        service, f"multipart/form-data; boundary={BOUNDARY}", body, job_id
+    )
+
+    inputs_dir = os.path.join(service.job_dir(job_id), "inputs")
+    assert inputs == [
+        os.path.join(inputs_dir, "b.xlsx"),
+        os.path.join(inputs_dir, "a.xlsx"),
+    ]
+    assert [open(path, "rb").read() for path in inputs] == [b"second", b"first"]
+    assert open(template, "rb").read() == b"own template"
+    assert output is None
+    assert engine == service_module.DEFAULT_ENGINE
+    assert time_budget == 12.5
+
+
+def test_duplicate_multipart_inputs_are_refused(service):
+    body = multipart_body([("inputs", "a.xlsx", b"1"), ("inputs", "a.xlsx", b"2")])
+
+    with pytest.raises(ValueError, match="Duplicate input"):
+        parse(service, f"multipart/form-data; boundary={BOUNDARY}", body)
+
+
+@pytest.mark.parametrize(
+    "name", ["../escape.xlsx", "/tmp/elsewhere.xlsx", ".", "site/report.csv"]
+)
+def test_output_must_be_an_xlsx_inside_the_output_folder(service, name):
+    with pytest.raises(ValueError):
+        service.output_path(name)
+
+
+def test_output_cannot_escape_through_a_symlink(service, tmp_path):
+    os.makedirs(service.output_dir)
+    os.symlink(tmp_path, os.path.join(service.output_dir, "link"))
+
+    with pytest.raises(ValueError, match="inside"):
+        service.output_path("link/merged.xlsx")
+
+
+def test_output_is_refused_without_an_output_folder(service):
+    service.output_dir = None
+
+    with pytest.raises(ValueError, match="omit 'output'"):
+        service.output_path("merged.xlsx")
+
+
+def test_server_answers_400_to_a_non_object_json_body(tmp_path):
+    template = tmp_path / "template.xlsx"
+    template.write_bytes(b"template")
+    server = make_server(
+        0, workers=1, work_dir=str(tmp_path / "work"), template=str(template)
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+        conn.request("POST", "/merge", b"[1, 2]", {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        reply = json.loads(response.read())
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.shutdown()
+
+    assert response.status == 400
+    assert "must be an object" in reply["error"]
+    assert server.service.in_flight == 0
@@ -0,0 +1,72 @@
+import pickle
+
+from backends.base import EXCEL_NO_FILL
+from backends.memory_backend import MemorySheet
+from config.sheet_definitions import get_merge_plan
+from core.snapshot import SheetSnapshot
+from handlers.handler_base import is_plan_snapshot
+from handlers.merge_plan import module_plan
+
+SHEET = "22.5 | Power Supply(s)"
+
+
+def technician_sheet(plan):
+    """A sheet with a few planned values, formats and a special-row highlight."""
+    values, fonts, fills = {}, {}, {}
+    for n, coord in enumerate(plan.coords[:12]):
+        values[coord] = f"PS-{n}"
+        fonts[coord] = (n % 2 == 0, 255 if n % 3 == 0 else 0)
+        if n % 4 == 0:
+            fills[coord] = 0x00FF00
+    row, (value_col, highlight_cols) = next(iter(plan.special_rows.items()))
+    values[(row, value_col)] = "24V"
+    fills[(row, highlight_cols[0])] = 0xFF0000
+    # Outside the plan: only the live sheet can see it
+    values[(plan.coords[0][0], 200)] = "stray"
+    return MemorySheet(SHEET, values=values, fonts=fonts, fills=fills)
+
+
+def reads(ws, coords):
+    return [
+        (ws.get_value(row, col), ws.get_format(row, col), ws.get_fill(row, col))
+        for row, col in coords
+    ]
+
+
+def test_snapshot_serves_planned_reads_like_the_sheet():
+    plan = get_merge_plan(SHEET)
+    ws = technician_sheet(plan)
+
+    snapshot = SheetSnapshot(ws, plan)
+
+    assert is_plan_snapshot(snapshot, plan)
+    assert reads(snapshot, plan.coords) == reads(ws, plan.coords)
+
+
+def test_a_pickled_snapshot_is_relinked_to_the_cached_plan():
+    plan = get_merge_plan(SHEET)
+    ws = technician_sheet(plan)
+    snapshot = SheetSnapshot(ws, plan)
+
+    loaded = pickle.loads(pickle.dumps(snapshot))
+
+    # positions aren't pickled; they are the module plan's own dict again
+    assert "positions" not in snapshot.__getstate__()
+    assert loaded.positions is module_plan(plan.name).positions
+    assert is_plan_snapshot(loaded, plan)
+    assert loaded.digest() == snapshot.digest()
+    # Every planned value; formats only where they were captured (planned
+    # cells with a value and highlight cells)
+    captured = [coord for i, coord in enumerate(plan.coords) if snapshot.captured[i]]
+    assert len(captured) > 12
+    assert reads(loaded, captured) == reads(ws, captured)
+    assert [loaded.get_value(*c) for c in plan.coords] == [
+        ws.get_value(*c) for c in plan.coords
+    ]
+    # The workbook sheet is left behind: reads outside the plan are blank
+    stray = (plan.coords[0][0], 200)
+    assert snapshot.get_value(*stray) == "stray"
+    assert loaded.get_value(*stray) is None
+    assert loaded.get_format(*stray) == (None, None, EXCEL_NO_FILL)
+    # Pickling doesn't detach the original
+    assert snapshot._ws is ws
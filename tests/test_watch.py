@@ -0,0 +1,132 @@
+import os
+import shutil
+
+import pytest
+
+import core.watch as watch
+from core.watch import RETRY_SECONDS, FolderWatcher
+
+
+class FakeRunSite:
+    """Records run_site calls; fails while self.fail is set."""
+
+    def __init__(self):
+        self.calls = []
+        self.fail = False
+
+    def __call__(self, site, cache_dir=None, cache=None, metrics_path=None):
+        self.calls.append(site)
+        status = "failed" if self.fail else "ok"
+        return {
+            "status": status,
+            "inputs": len(site["inputs"]),
+            "conflicts": 0,
+            "elapsed": 0.0,
+            "error": "output is open" if self.fail else None,
+        }
+
+
+@pytest.fixture
+def run_site(monkeypatch):
+    fake = FakeRunSite()
+    monkeypatch.setattr(watch, "run_site", fake)
+    monkeypatch.setattr(watch, "is_valid_excel_file", lambda path, sheets: True)
+    return fake
+
+
+def make_watcher(root, **options):
+    options.setdefault("settle", 5)
+    options.setdefault("quiet", 300)
+    return FolderWatcher(str(root), template="template.xlsx", **options)
+
+
+def add_files(folder, *names):
+    folder.mkdir(exist_ok=True)
+    for name in names:
+        (folder / name).write_bytes(name.encode())
+
+
+def merged_inputs(call):
+    return [os.path.basename(path) for path in call["inputs"]]
+
+
+def test_site_is_merged_once_expected_files_have_settled(tmp_path, run_site):
+    add_files(tmp_path / "north", "a.xlsx", "~$a.xlsx", "notes.txt")
+    (tmp_path / "north" / "expected.txt").write_text("a.xlsx\nb.xlsx\n")
+    watcher = make_watcher(tmp_path)
+
+    assert watcher.poll(now=0) == []
+    add_files(tmp_path / "north", "b.xlsx")
+    assert watcher.poll(now=3) == []  # b.xlsx hasn't settled yet
+    assert len(watcher.poll(now=8)) == 1
+    assert watcher.poll(now=20) == []  # nothing changed since
+
+    (call,) = run_site.calls
+    assert merged_inputs(call) == ["a.xlsx", "b.xlsx"]
+    assert call["output"] == str(tmp_path / "_merged" / "north.xlsx")
+
+
+def test_site_without_expectation_is_merged_after_quiet(tmp_path, run_site):
+    add_files(tmp_path / "south", "a.xlsx")
+    watcher = make_watcher(tmp_path, quiet=60)
+
+    watcher.poll(now=0)
+    assert watcher.poll(now=59) == []
+    assert len(watcher.poll(now=60)) == 1
+
+
+def test_expected_count_and_remerge_when_files_change(tmp_path, run_site):
+    add_files(tmp_path / "east", "a.xlsx", "b.xlsx")
+    watcher = make_watcher(tmp_path, expect=2)
+
+    watcher.poll(now=0)
+    assert len(watcher.poll(now=5)) == 1
+    add_files(tmp_path / "east", "c.xlsx")
+    watcher.poll(now=10)
+    assert len(watcher.poll(now=15)) == 1
+
+    assert [merged_inputs(call) for call in run_site.calls] == [
+        ["a.xlsx", "b.xlsx"],
+        ["a.xlsx", "b.xlsx", "c.xlsx"],
+    ]
+
+
+def test_failed_merge_is_retried_after_retry_seconds(tmp_path, run_site):
+    add_files(tmp_path / "west", "a.xlsx")
+    watcher = make_watcher(tmp_path, expect=1)
+    run_site.fail = True
+
+    watcher.poll(now=0)
+    assert watcher.poll(now=5)[0]["status"] == "failed"
+    assert watcher.poll(now=5 + RETRY_SECONDS - 1) == []
+    run_site.fail = False
+    assert watcher.poll(now=5 + RETRY_SECONDS)[0]["status"] == "ok"
+    assert watcher.poll(now=10 + RETRY_SECONDS) == []
+    assert len(run_site.calls) == 2
+
+
+def test_vanished_site_folder_is_forgotten(tmp_path, run_site):
+    add_files(tmp_path / "north", "a.xlsx")
+    add_files(tmp_path / "south", "a.xlsx")
+    watcher = make_watcher(tmp_path)
+
+    watcher.poll(now=0)
+    shutil.rmtree(tmp_path / "north")
+    watcher.poll(now=1)
+
+    assert set(watcher.sites) == {"south"}
+
+
+def test_merge_cache_is_released_once_a_merged_site_goes_quiet(tmp_path, run_site):
+    add_files(tmp_path / "north", "a.xlsx")
+    watcher = make_watcher(tmp_path, expect=1, quiet=100)
+    watcher.poll(now=0)
+    watcher.poll(now=5)
+    site = watcher.sites["north"]
+    cleared = []
+    site.cache.clear = lambda: cleared.append(True)
+
+    watcher.poll(now=99)
+    assert cleared == []
+    watcher.poll(now=100)
+    assert cleared == [True]
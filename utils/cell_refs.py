@@ -0,0 +1,32 @@
+import re
+
+_ADDRESS_RE = re.compile(r"^\$?([A-Za-z]{1,3})\$?(\d+)$")
+
+
+def column_index(letters: str) -> int:
+    """Converts a column label ("A", "l", "AB") into a 1-based index."""
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + (ord(ch) - ord("A") + 1)
+    return index
+
+
+def column_letter(index: int) -> str:
+    """Converts a 1-based column index into its label."""
+    letters = ""
+    while index > 0:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+
+def parse_address(address: str):
+    """Parses an A1-style address (case-insensitive) into (row, col)."""
+    match = _ADDRESS_RE.match(address.strip())
+    if not match:
+        raise ValueError(f"Invalid cell address: {address!r}")
+    return int(match.group(2)), column_index(match.group(1))
+
+
+def format_address(row: int, col: int) -> str:
+    return f"{column_letter(col)}{row}"
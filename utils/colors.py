@@ -0,0 +1,219 @@
+"""
+Classification of fill colours into the named highlight colours used in
+conflict reports (red marks a deficiency, green a repair, yellow a note).
+
+ColorClassifier precomputes, once, the answer for every bucket of a
+quantized RGB cube, so classifying a colour is a table lookup instead of a
+distance to every reference colour. Buckets that straddle a decision
+boundary are marked unresolved and answered exactly, so results always
+match a brute-force nearest-colour search.
+"""
+
+from functools import lru_cache
+from math import sqrt
+
+import numpy as np
+
+NAMED_COLORS = {
+    "Red": [(255, 0, 0), (192, 80, 77), (218, 150, 148)],
+    "Green": [(0, 255, 0), (0, 128, 0), (196, 215, 155), (0, 176, 80), (146, 208, 80)],
+    "Yellow": [(255, 255, 0)],
+}
+
+# Distance beyond which a colour is reported as raw RGB instead of a name
+DEFAULT_THRESHOLD = {"rgb": 90, "lab": 25}
+
+# Label codes stored in the table besides a NAMED_COLORS index
+FAR = -1  # further than the threshold from every named colour
+UNRESOLVED = -2  # bucket straddles a boundary; computed exactly
+NO_FILL = -3  # None or negative fill code
+
+
+def bgr_to_rgb_array(colors):
+    """Splits an array of Excel BGR ints into an (n, 3) RGB array."""
+    colors = np.asarray(colors, dtype=np.int64)
+    return np.stack(
+        [colors & 0xFF, (colors >> 8) & 0xFF, (colors >> 16) & 0xFF], axis=-1
+    )
+
+
+def rgb_to_lab(rgb):
+    """Converts an (n, 3) array of sRGB 0-255 colours to CIE Lab (D65)."""
+    c = np.asarray(rgb, dtype=float) / 255.0
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = c @ np.array(
+        [
+            [0.4124564, 0.2126729, 0.0193339],
+            [0.3575761, 0.7151522, 0.1191920],
+            [0.1804375, 0.0721750, 0.9503041],
+        ]
+    )
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return np.stack(
+        [
+            116 * f[:, 1] - 16,
+            500 * (f[:, 0] - f[:, 1]),
+            200 * (f[:, 1] - f[:, 2]),
+        ],
+        axis=-1,
+    )
+
+
+class ColorClassifier:
+    """
+    Maps colours to the nearest NAMED_COLORS label, or to raw RGB when none
+    is within threshold. metric is "rgb" (Euclidean distance in RGB, what
+    the conflict comments have always used) or "lab" (CIE76 distance, closer
+    to how different two highlights look). bits is the table resolution per
+    channel.
+    """
+
+    def __init__(self, named_colors=None, threshold=None, metric="rgb", bits=6):
+        if metric not in DEFAULT_THRESHOLD:
+            raise ValueError(f"Unknown colour metric: {metric!r}")
+        named_colors = NAMED_COLORS if named_colors is None else named_colors
+        self.metric = metric
+        self.threshold = DEFAULT_THRESHOLD[metric] if threshold is None else threshold
+        self.names = list(named_colors)
+
+        refs = [rgb for colors in named_colors.values() for rgb in colors]
+        self._ref_labels = np.array(
+            [
+                label
+                for label, colors in enumerate(named_colors.values())
+                for _ in colors
+            ]
+        )
+        self._refs = self._to_space(np.array(refs, dtype=float))
+
+        self._bits = bits
+        self._shift = 8 - bits
+        step = 1 << self._shift
+        half = (step - 1) / 2
+        centres = np.arange(0, 256, step) + half
+        grid = np.stack(np.meshgrid(centres, centres, centres, indexing="ij"), -1)
+        grid = grid.reshape(-1, 3)
+
+        # How far a colour in a bucket can be from the bucket centre
+        if metric == "rgb":
+            radius = sqrt(3) * half
+        else:
+            centre_space = self._to_space(grid)
+            radius = np.zeros(len(grid))
+            for corner in np.array(np.meshgrid(*[[-half, half]] * 3)).T.reshape(-1, 3):
+                corner_space = self._to_space(grid + corner)
+                radius = np.maximum(
+                    radius, np.linalg.norm(corner_space - centre_space, axis=1)
+                )
+
+        labels, nearest, runner_up = self._nearest(grid)
+        stable = (runner_up - nearest > 2 * radius) & (
+            np.abs(nearest - self.threshold) > radius
+        )
+        table = np.where(nearest > self.threshold, FAR, labels)
+        table[~stable] = UNRESOLVED
+        self._table = table.astype(np.int8)
+        self._lookup = self._table.tolist()
+        self._resolved = {}  # exact answers for colours in unresolved buckets
+
+    def _to_space(self, rgb):
+        return rgb_to_lab(rgb) if self.metric == "lab" else rgb
+
+    def _nearest(self, rgb):
+        """
+        Returns (label, distance to it, distance to the nearest other label)
+        for an (n, 3) array of colours; ties go to the first reference colour.
+        """
+        points = self._to_space(np.asarray(rgb, dtype=float))
+        dist = np.linalg.norm(points[:, None, :] - self._refs[None, :, :], axis=2)
+        best = dist.argmin(axis=1)
+        labels = self._ref_labels[best]
+        nearest = dist[np.arange(len(points)), best]
+        others = np.where(self._ref_labels[None, :] == labels[:, None], np.inf, dist)
+        runner_up = (
+            others.min(axis=1) if len(self.names) > 1 else np.full_like(nearest, np.inf)
+        )
+        return labels, nearest, runner_up
+
+    def _index(self, r, g, b):
+        s, bits = self._shift, self._bits
+        return ((r >> s) << (2 * bits)) | ((g >> s) << bits) | (b >> s)
+
+    def code(self, color):
+        """Returns the label code of one Excel BGR int (None = no fill)."""
+        if color is None or color < 0:
+            return NO_FILL
+        return self.rgb_code(color & 0xFF, (color >> 8) & 0xFF, (color >> 16) & 0xFF)
+
+    def rgb_code(self, r, g, b):
+        code = self._lookup[self._index(r, g, b)]
+        if code == UNRESOLVED:
+            code = self._resolved.get((r, g, b))
+            if code is None:
+                code = int(self._exact(np.array([[r, g, b]]))[0])
+                self._resolved[(r, g, b)] = code
+        return code
+
+    def _exact(self, rgb):
+        labels, nearest, _ = self._nearest(rgb)
+        return np.where(nearest > self.threshold, FAR, labels)
+
+    def codes(self, colors):
+        """label codes for an array of Excel BGR ints (negative = no fill)."""
+        colors = np.asarray(colors, dtype=np.int64)
+        no_fill = colors < 0
+        rgb = bgr_to_rgb_array(np.where(no_fill, 0, colors))
+        codes = self._table[self._index(rgb[..., 0], rgb[..., 1], rgb[..., 2])]
+        codes = codes.astype(np.int64)
+        unresolved = codes == UNRESOLVED
+        if unresolved.any():
+            codes[unresolved] = self._exact(rgb[unresolved])
+        codes[no_fill] = NO_FILL
+        return codes
+
+    def name(self, code, rgb=None):
+        """The display name of a label code; FAR colours show as RGB(r, g, b)."""
+        if code == NO_FILL:
+            return "No fill"
+        if code == FAR:
+            return f"RGB{rgb}"
+        return self.names[code]
+
+    def classify(self, color):
+        """Names one Excel BGR int; None is "No fill"."""
+        if color is None:
+            return "No fill"
+        rgb = (color & 0xFF, (color >> 8) & 0xFF, (color >> 16) & 0xFF)
+        return self.name(self.rgb_code(*rgb), rgb)
+
+    def classify_rgb(self, rgb):
+        """Names an (r, g, b) tuple; None is "No fill"."""
+        if rgb is None:
+            return "No fill"
+        return self.name(self.rgb_code(*rgb), tuple(rgb))
+
+    def classify_many(self, colors):
+        """Names a sequence of Excel BGR ints (None = no fill) in one call."""
+        codes = self.codes([-1 if color is None else color for color in colors])
+        return [
+            self.name(
+                int(code),
+                None
+                if color is None
+                else (color & 0xFF, (color >> 8) & 0xFF, (color >> 16) & 0xFF),
+            )
+            for code, color in zip(codes, colors)
+        ]
+
+
+def get_classifier(threshold=None, metric="rgb"):
+    """Returns the shared classifier for NAMED_COLORS with these settings."""
+    if threshold is None:
+        threshold = DEFAULT_THRESHOLD.get(metric)
+    return _shared_classifier(threshold, metric)
+
+
+@lru_cache(maxsize=None)
+def _shared_classifier(threshold, metric):
+    return ColorClassifier(threshold=threshold, metric=metric)
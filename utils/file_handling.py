@@ -1,12 +1,86 @@
-from openpyxl import load_workbook
+import os
+import posixpath
+import threading
+import zipfile
+from xml.etree import ElementTree
 
+# Where an .xlsx package keeps its workbook part, and how it points to it
+WORKBOOK_PART = "xl/workbook.xml"
+ROOT_RELS_PART = "_rels/.rels"
+OFFICE_DOCUMENT_REL = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+    "officeDocument"
+)
 
-def is_valid_excel_file(path, required_sheets, min_threshold=0.7):
+# abs path -> ((size, mtime_ns), sheet names or None)
+_sheet_name_cache = {}
+_sheet_name_lock = threading.Lock()
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _workbook_part(archive):
+    """Name of the workbook part, from the package relationships."""
     try:
-        wb = load_workbook(path, read_only=True)
-        sheetnames = wb.sheetnames
-        wb.close()
-        found = sum(1 for name in required_sheets if name in sheetnames)
-        return (found / len(required_sheets)) >= min_threshold
+        rels = ElementTree.fromstring(archive.read(ROOT_RELS_PART))
+    except (KeyError, ElementTree.ParseError):
+        return WORKBOOK_PART
+    for rel in rels:
+        if rel.get("Type") == OFFICE_DOCUMENT_REL and rel.get("Target"):
+            return posixpath.normpath(rel.get("Target").lstrip("/"))
+    return WORKBOOK_PART
+
+
+def _read_sheet_names(path):
+    """
+    Sheet names of an .xlsx file, in workbook order, read from the workbook
+    part alone (no styles, shared strings or worksheets are parsed).
+    """
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read(_workbook_part(archive)))
+    return [
+        element.get("name")
+        for element in root.iter()
+        if _local_name(element.tag) == "sheet"
+    ]
+
+
+def read_sheet_names(path):
+    """
+    Sheet names of an .xlsx file, or None if it can't be read as one.
+    Memoized by (path, size, mtime), so re-checking an unchanged file
+    doesn't reopen it.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = os.path.abspath(path)
+    version = (stat.st_size, stat.st_mtime_ns)
+
+    with _sheet_name_lock:
+        cached = _sheet_name_cache.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    try:
+        sheetnames = _read_sheet_names(path)
     except Exception:
+        # Anything unreadable (corrupt, encrypted, unsupported compression)
+        # just isn't a report
+        sheetnames = None
+
+    with _sheet_name_lock:
+        _sheet_name_cache[key] = (version, sheetnames)
+    return sheetnames
+
+
+def is_valid_excel_file(path, required_sheets, min_threshold=0.7):
+    sheetnames = read_sheet_names(path)
+    if sheetnames is None:
         return False
+    sheetnames = set(sheetnames)
+    found = sum(1 for name in required_sheets if name in sheetnames)
+    return (found / len(required_sheets)) >= min_threshold